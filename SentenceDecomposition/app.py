@@ -1,9 +1,23 @@
+import json
+import os
 import traceback
 from collections import defaultdict
-
-from flask import request
-
-from core.SentenceDecomposition_udf import analyze_sentence_dict
+from itertools import islice
+from typing import BinaryIO, List
+
+from flask import g, request, Response
+from spacy.tokens.doc import Doc as SpacyDoc
+
+from core.SentenceDecomposition_udf import analyze_sentence_dict_rows, doc_digest, result_store
+from core.columnarRows import COLUMNAR_MIMETYPES, COLUMNAR_WRITERS, PARQUET_MIMETYPE, available as columnar_available
+from core.compactRows import SentenceRows, limit_rows
+from core.docDecoding import MSGPACK_MIMETYPE, DocDecoder, unpack_sentences
+from core.jsonStream import JsonStreamError, iter_list_items
+from core.microBatching import MicroBatcher
+from core.responseCache import ResponseCache, CachedResponse, make_etag
+from core.responseEncoding import ResponseEncoder, iter_rows_json, rows_json
+from core.responseValidation import ValidationPolicy
+from core.singleFlight import SingleFlight
 from oneforce_common import base_microservice as bm, validateResponseAndReturn
 from oneforce_elasticsearch import (sentence_es_actions, company_profile_es_actions, person_profile_es_actions,
                                     statistic_es_actions)
@@ -25,6 +39,152 @@ logger: OneForceLogger = appData["logger"]
 
 key = 'list'
 
+# 'shared' decodes into the process vocab, 'bounded' into a vocab rotated every SD_VOCAB_MAX_STRINGS strings
+doc_decoder = DocDecoder(mode=os.environ.get('SD_DOC_DECODING', 'shared'),
+                         shared_decode=su.decode_bs64,
+                         max_strings=int(os.environ.get('SD_VOCAB_MAX_STRINGS', 200000)))
+# run_sd responses are cached for SD_RESPONSE_CACHE_TTL seconds, at most SD_RESPONSE_CACHE_SIZE of them and
+# SD_RESPONSE_CACHE_MAX_MB in total; the bodies over SD_RESPONSE_CACHE_MAX_ENTRY_MB aren't cached
+response_cache = ResponseCache(ttl=float(os.environ.get('SD_RESPONSE_CACHE_TTL', 30)),
+                               max_entries=int(os.environ.get('SD_RESPONSE_CACHE_SIZE', 256)),
+                               max_bytes=int(os.environ.get('SD_RESPONSE_CACHE_MAX_MB', 64)) * 1024 ** 2,
+                               max_entry_bytes=int(os.environ.get('SD_RESPONSE_CACHE_MAX_ENTRY_MB', 8)) * 1024 ** 2)
+single_flight = SingleFlight()
+# the responses are compressed if they are SD_COMPRESS_MIN_BYTES or longer; the 'direct' responses of
+# SD_STREAM_MIN_ROWS rows or more are streamed (0 - no streaming)
+response_encoder = ResponseEncoder(min_bytes=int(os.environ.get('SD_COMPRESS_MIN_BYTES', 1024)),
+                                   stream_rows=int(os.environ.get('SD_STREAM_MIN_ROWS', 5000)),
+                                   gzip_level=int(os.environ.get('SD_GZIP_LEVEL', 5)),
+                                   zstd_level=int(os.environ.get('SD_ZSTD_LEVEL', 3)))
+# decomp-json responses validated against the response schema: 'full' - all, 'sampled' - SD_VALIDATION_SAMPLE_RATE
+# of them, 'construction' - none, the rows are checked by the SentenceDecompositionDoc models only
+validation_policy = ValidationPolicy(mode=os.environ.get('SD_RESPONSE_VALIDATION', 'full'),
+                                     sample_rate=float(os.environ.get('SD_VALIDATION_SAMPLE_RATE', 0.01)))
+# decomp-json bodies of SD_STREAM_PARSE_MIN_BYTES or more (or of unknown length) are parsed while they are read and
+# decomposed by SD_STREAM_PARSE_CHUNK elements (0 - always parsed whole)
+STREAM_PARSE_MIN_BYTES = int(os.environ.get('SD_STREAM_PARSE_MIN_BYTES', 1024 ** 2))
+STREAM_PARSE_CHUNK = int(os.environ.get('SD_STREAM_PARSE_CHUNK', 100))
+# 'direct' serializes the output rows of run_sd and run_sd_v2 straight to JSON, 'model' through BaseList
+ROW_SERIALIZATION = os.environ.get('SD_ROW_SERIALIZATION', 'model')
+# the rows of a response beyond SD_MAX_ROWS_PER_REQUEST are dropped (0 - no limit)
+MAX_ROWS_PER_REQUEST = int(os.environ.get('SD_MAX_ROWS_PER_REQUEST', 50000))
+
+
+def decode_and_analyze_sentence(sent_dict: dict) -> SentenceRows:
+    # the sentenceDoc is decoded only if the rows aren't in the result store
+    return analyze_sentence_dict_rows(sent_dict, doc_decoder.decode)
+
+
+def sentence_key(sent_dict: dict) -> str:
+    """
+    Sentence dicts with equal keys give equal output rows, so they are analyzed once per batch. The Doc is keyed
+    by its digest, as in the result store.
+    """
+    return json.dumps(dict(sent_dict, sentenceDoc=doc_digest(sent_dict['sentenceDoc'])), sort_keys=True, default=str)
+
+
+# sentences of the requests coming within SD_BATCH_WINDOW_MS are decoded and analyzed together (0 - no batching)
+# by SD_BATCH_WORKERS threads, as many as the waitress request threads by default
+sentence_batcher = MicroBatcher(decode_and_analyze_sentence, sentence_key,
+                                window=float(os.environ.get('SD_BATCH_WINDOW_MS', 0)) / 1000,
+                                max_batch=int(os.environ.get('SD_BATCH_MAX_SENTENCES', 512)),
+                                workers=int(os.environ.get('SD_BATCH_WORKERS', 4)))
+
+
+def analyze_sentences(sent_dicts: list) -> List[SentenceRows]:
+    return sentence_batcher.run(sent_dicts)
+
+
+def cap_rows(rows_list: List[SentenceRows]) -> List[SentenceRows]:
+    """
+    Drops the rows beyond MAX_ROWS_PER_REQUEST; their number is sent to the client in the X-Rows-Dropped header.
+    """
+    limited = limit_rows(rows_list, MAX_ROWS_PER_REQUEST)
+    if limited is not rows_list:
+        dropped = sum(len(rows) for rows in rows_list) - MAX_ROWS_PER_REQUEST
+        logger.info(f"cap_rows - more than {MAX_ROWS_PER_REQUEST} rows in the response, {dropped} are dropped")
+        g.dropped_rows = g.get('dropped_rows', 0) + dropped
+    return limited
+
+
+@app.after_request
+def add_dropped_rows_header(res: Response) -> Response:
+    if g.get('dropped_rows'):
+        res.headers['X-Rows-Dropped'] = str(g.dropped_rows)
+    return res
+
+
+def rows_response(rows_list: List[SentenceRows], direct: bool = False, output_format: str = 'json'):
+    rows_list = cap_rows(rows_list)
+    if output_format != 'json':
+        return Response(COLUMNAR_WRITERS[output_format](rows_list), mimetype=COLUMNAR_MIMETYPES[output_format])
+    if direct:
+        return Response(rows_json(rows_list), mimetype='application/json')
+    return BaseList([doc for rows in rows_list for doc in rows.to_docs()], SentenceDecompositionDocSchema).json()
+
+
+def encoded_response(body: bytes, mimetype: str) -> Response:
+    """
+    Returns the response with the body compressed with the encoding negotiated from Accept-Encoding.
+    """
+    # the Parquet files are compressed already
+    compressible = len(body) >= response_encoder.min_bytes and mimetype != PARQUET_MIMETYPE
+    encoding = response_encoder.negotiate(request.accept_encodings) if compressible else None
+    res = Response(response_encoder.encode(body, encoding), mimetype=mimetype)
+    if encoding is not None:
+        res.content_encoding = encoding
+    res.vary.add('Accept-Encoding')
+    return res
+
+
+def streamed_rows_response(rows_list: List[SentenceRows]) -> Response:
+    """
+    Returns the 'direct' response of the rows; the large ones are serialized and compressed while they are sent.
+    """
+    rows_list = cap_rows(rows_list)
+    if not response_encoder.should_stream(rows_list):
+        return encoded_response(rows_json(rows_list), 'application/json')
+    encoding = response_encoder.negotiate(request.accept_encodings)
+    res = Response(response_encoder.encode_stream(iter_rows_json(rows_list), encoding), mimetype='application/json')
+    if encoding is not None:
+        res.content_encoding = encoding
+    res.vary.add('Accept-Encoding')
+    return res
+
+
+def attach_doc_bin(resp: dict) -> list:
+    """
+    Returns the sentence dicts of the analyzer response. If the response carries the Docs of its sentences as one
+    DocBin batch ('sentenceDocBin', in the order of 'list'), they are decoded at once and set as the sentenceDoc of
+    the dicts; otherwise every dict keeps its own base64 or binary sentenceDoc.
+    """
+    if resp.get('sentenceDocBin') is None:
+        return resp['list']
+    docs = doc_decoder.decode_bin(resp['sentenceDocBin'])
+    if len(docs) != len(resp['list']):
+        raise ValueError(f"attach_doc_bin - {len(docs)} Docs for {len(resp['list'])} sentences")
+    return [dict(sent_dict, sentenceDoc=doc) for sent_dict, doc in zip(resp['list'], docs)]
+
+
+def exception_text(e: Exception) -> str:
+    return f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+
+
+def decode_sentence_docs(sent_dicts: list) -> list:
+    """
+    Returns the sentence dicts with their sentenceDoc decoded, so that the Docs sent by the client are checked
+    before the analysis. Raises DecompositionError (400) naming the first sentence whose Doc can't be decoded.
+    """
+    decoded = []
+    for i, sent_dict in enumerate(sent_dicts):
+        try:
+            doc = sent_dict['sentenceDoc']
+            decoded.append(dict(sent_dict, sentenceDoc=doc if isinstance(doc, SpacyDoc) else doc_decoder.decode(doc)))
+        except (ValueError, KeyError, TypeError) as e:
+            raise DecompositionError(f"Wrong request. Sentence {i} - wrong sentenceDoc - {exception_text(e)}",
+                                     400) from e
+    return decoded
+
 
 def return_es_actions(ref_type: str):
     if ref_type == 'company':
@@ -49,7 +209,7 @@ def convert_skw_akw_list(skw_akw_list: list):
 
 def get_dict_for_sd(source: dict, _id: str, skw_akw: list, add_info: bool = False) -> dict:
     dict_ = {'skwAkw': convert_skw_akw_list(skw_akw),
-             'sentenceDoc': su.decode_bs64(source['sentenceDoc']),  # TODO: add condition for existence
+             'sentenceDoc': source['sentenceDoc'],  # TODO: add condition for existence; decoded in analyze_sentence
              'section': source['section'],
              'refType': source['refType'],
              'refId': source['refId'],
@@ -98,8 +258,34 @@ def map_profiles_update_sentences(profile_dict: dict, ref_type: str, profile_sen
     return cnt == len(profile_sentence_map[profile_dict['_id']])  # FIX
 
 
-def decompose(ref_type: str, parsed_akw_doc: dict):
-    es_actions = return_es_actions(ref_type)
+class DecompositionError(Exception):
+    def __init__(self, message: str, code: int):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+
+
+class SentencesNotFound(DecompositionError):
+    def __init__(self):
+        super().__init__("Sentences not found", 404)
+
+
+def first_by_ref_id(elements: list, seen: set) -> dict:
+    """
+    Returns the elements by refId; of the elements with the same refId (here or in seen) the first one is used.
+    """
+    parsed_akw_doc_map = {}
+    for elem in elements:
+        if elem['refId'] not in seen:
+            seen.add(elem['refId'])
+            parsed_akw_doc_map[elem['refId']] = elem
+    return parsed_akw_doc_map
+
+
+def decompose(ref_type: str, parsed_akw_doc: dict, direct: bool = False, output_format: str = 'json'):
+    """
+    With direct=True the rows are serialized without the BaseList models.
+    """
     if not isinstance(parsed_akw_doc, dict):
         return bm.error("Wrong request. parsed_akw_doc are not a dict", 400)
     if key not in parsed_akw_doc:
@@ -108,16 +294,62 @@ def decompose(ref_type: str, parsed_akw_doc: dict):
     if not isinstance(parsed_akw_doc_list, list):
         return bm.error("Wrong request. 'list' key must contain a list of data for parsed_akw_doc", 400)
     parsed_akw_doc_map = {elem['refId']: elem for elem in parsed_akw_doc_list}
+    try:
+        rows_list = decompose_rows(ref_type, parsed_akw_doc_map)
+    except DecompositionError as e:
+        return bm.error(e.message, e.code)
+    return rows_response(rows_list, direct, output_format)
+
+
+def decompose_stream(ref_type: str, stream: BinaryIO, direct: bool = False, output_format: str = 'json'):
+    """
+    Decomposes the elements of the 'list' of the request body while the body is being read: the sentences of
+    every STREAM_PARSE_CHUNK elements are fetched and analyzed as soon as the elements are parsed, so the body is
+    never kept in memory whole. As with decompose, the response is 404 only if none of the sentences is found.
+    Unlike decompose, which uses the last of the elements with the same refId, the first one is used here: the
+    later ones may come after the sentences of the first one are analyzed.
+    """
+    rows_list = []
+    seen = set()
+    found = False
+    elements = iter_list_items(stream, key)
+    try:
+        while True:
+            chunk = list(islice(elements, STREAM_PARSE_CHUNK))
+            if not chunk:
+                break
+            parsed_akw_doc_map = first_by_ref_id(chunk, seen)
+            if not parsed_akw_doc_map:
+                continue
+            try:
+                rows_list.extend(decompose_rows(ref_type, parsed_akw_doc_map))
+            except SentencesNotFound:
+                continue
+            found = True
+        if seen and not found:
+            raise SentencesNotFound()
+    except JsonStreamError as e:
+        return bm.error(f"Wrong request. {e}", 400)
+    except DecompositionError as e:
+        return bm.error(e.message, e.code)
+    return rows_response(rows_list, direct, output_format)
+
+
+def decompose_rows(ref_type: str, parsed_akw_doc_map: dict) -> List[SentenceRows]:
+    """
+    Fetches the sentences of the given refIds with their profiles and returns their output rows.
+    """
+    es_actions = return_es_actions(ref_type)
     profile_sentence_map = defaultdict(set)
     docs_generator = sentence_es_actions.get_by_ids(list(parsed_akw_doc_map.keys()), pagination_by=100)
     if isinstance(docs_generator, dict):
-        return bm.error(f"Sentences not found", 404)
+        raise SentencesNotFound()
 
-    sentences = {doc['_id']: convert_sent_dict(doc, parsed_akw_doc_map[doc['_id']], profile_sentence_map) for page in
-                 docs_generator if page for doc in page}
+    sentences = {doc['_id']: convert_sent_dict(doc, parsed_akw_doc_map[doc['_id']], profile_sentence_map)
+                 for page in docs_generator if page for doc in page}
     profiles = es_actions.get_by_ids(list(profile_sentence_map.keys()), pagination_by=100)
     if isinstance(docs_generator, dict):
-        return bm.error(f"Profiles for sentences not found", 404)
+        raise DecompositionError(f"Profiles for sentences not found", 404)
 
     try:
         tmp = {prof_doc['_id']: map_profiles_update_sentences(prof_doc, ref_type, profile_sentence_map,
@@ -126,15 +358,81 @@ def decompose(ref_type: str, parsed_akw_doc: dict):
     except Exception as e:
         logger.error("The ERROR is HERE!!")
         logger.error(traceback.format_exc())
-    out_list = [sent_sd for sent_id, sent_dict in sentences.items() for sent_sd in
-                analyze_sentence_dict(sent_dict)]
-    return BaseList(out_list, SentenceDecompositionDocSchema).json()
+    return analyze_sentences(list(sentences.values()))
+
+
+def request_output_format() -> str:
+    """
+    Returns the output format requested by the format argument or by the Accept header: 'json', 'arrow' (Arrow IPC
+    stream) or 'parquet'.
+    """
+    output_format = request.args.get('format')
+    if output_format is None:
+        best = request.accept_mimetypes.best_match(['application/json'] + list(COLUMNAR_MIMETYPES.values()))
+        output_format = next((fmt for fmt, mimetype in COLUMNAR_MIMETYPES.items() if mimetype == best), 'json')
+    return output_format
+
+
+def output_format_error(output_format: str):
+    if output_format != 'json' and output_format not in COLUMNAR_WRITERS:
+        return bm.error(f"Wrong request. Unknown format: {output_format}", 400)
+    if output_format != 'json' and not columnar_available():
+        return bm.error(f"The {output_format} format is not available, pyarrow is not installed", 406)
+    return None
+
+
+def query_key(ref_type: str, q: str | None, sections: str | None, search_left: bool,
+              output_format: str = 'json') -> tuple:
+    q = ' '.join(q.split()) if q else q
+    sections = ','.join(sorted(s.strip() for s in sections.split(','))) if sections else sections
+    return ref_type, q, sections, search_left, output_format
+
+
+def compute_sd_response(ref_type: str, q: str | None, sections: str | None, search_left: bool,
+                        cache_key: tuple, output_format: str = 'json') -> CachedResponse:
+    resp = sentence_analyzer_client.get_by_user_keyword(ref_type, q, sections, search_left)
+    res = app.make_response(decompose(ref_type, resp, ROW_SERIALIZATION == 'direct', output_format))
+    if res.status_code != 200:
+        return CachedResponse(res.get_data(), res.mimetype, '', 0, res.status_code)
+    body = res.get_data()
+    return response_cache.put(cache_key, body, res.mimetype, make_etag(body, output_format),
+                              g.pop('dropped_rows', 0))
+
+
+def conditional_response(cached: CachedResponse) -> Response:
+    """
+    Returns the cached response, or an empty 304 response if the client already has it (If-None-Match).
+    """
+    if cached.status != 200:
+        return Response(cached.body, status=cached.status, mimetype=cached.mimetype)
+    g.dropped_rows = cached.dropped_rows
+    if request.if_none_match.contains(cached.etag):
+        response_cache.not_modified += 1
+        res = Response(status=304)
+    else:
+        res = encoded_response(cached.body, cached.mimetype)
+    res.set_etag(cached.etag)
+    res.cache_control.no_cache = True
+    return res
 
 
 @app.route(rest_api_prefix + "/<ref_type>/decomp-json", methods=['POST'])
 @statistic.oneforce_stat
 def decomp_json(ref_type: str):
-    return validateResponseAndReturn(sentence_decomposition_response_schema, decompose(ref_type, request.json))
+    output_format = request_output_format()
+    error = output_format_error(output_format)
+    if error is not None:
+        return error
+    # request.json accepts the JSON mimetypes only (415), so does the streaming
+    if request.is_json and 0 < STREAM_PARSE_MIN_BYTES <= (request.content_length or STREAM_PARSE_MIN_BYTES):
+        res = decompose_stream(ref_type, request.stream, output_format=output_format)
+    else:
+        res = decompose(ref_type, request.json, output_format=output_format)
+    if output_format != 'json' or not validation_policy.should_validate():
+        return res
+    status = app.make_response(res).status_code
+    return validation_policy.run(lambda: validateResponseAndReturn(sentence_decomposition_response_schema, res),
+                                 lambda validated: app.make_response(validated).status_code != status)
 
 
 @app.route(rest_api_prefix + "/<ref_type>", methods=['POST'])
@@ -142,21 +440,81 @@ def decomp_json(ref_type: str):
 def run_sd(ref_type: str):
     args = request.args
     search_left = request.args.get('search-left', default='True') == 'True'
-    resp = sentence_analyzer_client.get_by_user_keyword(ref_type, args.get("q"), args.get("sections"), search_left)
-    res = decompose(ref_type, resp)
-    return res  # validateResponseAndReturn(sentence_decomposition_response_schema, res)
+    output_format = request_output_format()
+    error = output_format_error(output_format)
+    if error is not None:
+        return error
+    cache_key = query_key(ref_type, args.get("q"), args.get("sections"), search_left, output_format)
+    cached = response_cache.get(cache_key)
+    if cached is None:
+        # identical concurrent requests wait for the first one and share its response
+        cached = single_flight.do(cache_key, lambda: compute_sd_response(ref_type, args.get("q"), args.get("sections"),
+                                                                         search_left, cache_key, output_format))
+    return conditional_response(cached)  # validateResponseAndReturn(sentence_decomposition_response_schema, res)
+
+
+def sentences_response(sent_dicts: list, output_format: str = 'json') -> Response:
+    """
+    Returns the response with the rows of the sentences of the analyzer response.
+    """
+    rows_list = analyze_sentences([get_dict_for_sd(sent_dict, '', sent_dict['skwAkw'], True)
+                                   for sent_dict in sent_dicts])
+    if output_format != 'json':
+        return encoded_response(COLUMNAR_WRITERS[output_format](cap_rows(rows_list)), COLUMNAR_MIMETYPES[output_format])
+    if ROW_SERIALIZATION == 'direct':
+        return streamed_rows_response(rows_list)
+    return encoded_response(app.make_response(rows_response(rows_list)).get_data(), 'application/json')
 
 
 @app.route(rest_api_prefix_v2 + "/<ref_type>", methods=['POST'])
 @statistic.oneforce_stat
 def run_sd_v2(ref_type: str):
     args = request.args
+    output_format = request_output_format()
+    error = output_format_error(output_format)
+    if error is not None:
+        return error
     resp = sentence_analyzer_client.search_by_user_keywords_v2(ref_type, request.json,
                                                                args.get("search-left", default='True') == 'True',
                                                                args.get('preproc', type=str, default='all'))
-    out_list = [sent_sd for sent_dict in resp['list'] for sent_sd in
-                analyze_sentence_dict(get_dict_for_sd(sent_dict, '', sent_dict['skwAkw'], True))]
-    return BaseList(out_list, SentenceDecompositionDocSchema).json()
+    return sentences_response(attach_doc_bin(resp), output_format)
+
+
+@app.route(rest_api_prefix_v2 + "/<ref_type>/decomp-docs", methods=['POST'])
+@statistic.oneforce_stat
+def decomp_docs(ref_type: str):
+    """
+    Decomposes the sentences of an analyzer response sent in the body, without calling the analyzer. With the
+    application/msgpack body the Docs travel as binary (unpack_sentences), otherwise the body is the JSON response
+    with base64 Docs.
+    """
+    output_format = request_output_format()
+    error = output_format_error(output_format)
+    if error is not None:
+        return error
+    try:
+        resp = unpack_sentences(request.get_data()) if request.mimetype == MSGPACK_MIMETYPE else request.json
+        if (not isinstance(resp, dict) or not isinstance(resp.get(key), list)
+                or not all(isinstance(sent_dict, dict) for sent_dict in resp[key])):
+            return bm.error("Wrong request. The body should contain a list of sentence dicts under the key 'list'",
+                            400)
+        sent_dicts = decode_sentence_docs(attach_doc_bin(resp))
+    except DecompositionError as e:
+        return bm.error(e.message, e.code)
+    except ValueError as e:
+        return bm.error(f"Wrong request. {exception_text(e)}", 400)
+    return sentences_response(sent_dicts, output_format)
+
+
+@app.route(rest_api_prefix + "/metrics", methods=['GET'])
+def metrics():
+    return {'docDecoding': doc_decoder.stats(),
+            'resultStore': result_store.stats() if result_store is not None else None,
+            'responseCache': response_cache.stats(),
+            'singleFlight': single_flight.stats(),
+            'microBatching': sentence_batcher.stats(),
+            'responseEncoding': response_encoder.stats(),
+            'responseValidation': validation_policy.stats()}
 
 
 if __name__ == "__main__":
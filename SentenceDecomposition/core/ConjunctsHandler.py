@@ -1,10 +1,12 @@
 import nltk
 import spacy
-from typing import List
+from typing import Dict, List, Tuple
 nltk.download('omw-1.4')
 from nltk.corpus import wordnet as wn
 import string
 
+from TokenFeatures import TokenFeatures
+
 
 class ConjunctsHandler:
     CONJ_IND = ('and', '&', ',')
@@ -13,7 +15,13 @@ class ConjunctsHandler:
 
     def __init__(self, doc: spacy.tokens.doc.Doc):
         self.sent = doc
+        self.features = TokenFeatures.of(doc)
         self.all_verbs = []
+        # per-Doc tables filled on the first lookup of a token
+        self._conjuncts: Dict[int, Tuple | None] = {}
+        self._verb_chains: Dict[int, List[spacy.tokens.token.Token]] = {}
+        self._chunks: Dict[int, int] = {}
+        self._main_tokens: Dict[int, spacy.tokens.token.Token | None] = {}
 
     def get_conjuncts(self, verb: spacy.tokens.token.Token):
         """
@@ -33,76 +41,109 @@ class ConjunctsHandler:
         input-'strategy', output=(roadmap, [roadmap, strategy])
 
         """
+        found = self.find_conjuncts(verb)
         self.main_verb = verb
+        if found:
+            self.main_verb = found[0]
+            self.all_verbs = list(found[1])
+            return self
+
+    def find_conjuncts(self, verb: spacy.tokens.token.Token) -> Tuple[spacy.tokens.token.Token,
+                                                                      List[spacy.tokens.token.Token]] | None:
+        """
+        Returns the main verb and all the verbs of the row (see get_conjuncts) or None if the verb is not in a row.
+        The result is computed once per verb.
+        """
+        if verb.i not in self._conjuncts:
+            self._conjuncts[verb.i] = self._find_conjuncts(verb)
+        return self._conjuncts[verb.i]
+
+    def _find_conjuncts(self, verb: spacy.tokens.token.Token) -> Tuple[spacy.tokens.token.Token,
+                                                                       List[spacy.tokens.token.Token]] | None:
         if verb.conjuncts:
             if verb.dep_ == 'conj':
                 if self.sent[verb.i - 1].text in self.CONJ_IND or (
                         verb.i > 2 and self.sent[verb.i - 3:verb.i].text == 'as well as'):
                     if (self.sent[verb.i - 2].pos_ == 'VERB'
-                            or self.sent[verb.i - 2].text[-3:] == 'ing'
+                            or self.features.ends_ing[verb.i - 2]
                             or (self.sent[verb.i - 2].text == ','
                                 and (self.sent[verb.i - 3].pos_ == 'VERB'
-                                     or self.sent[verb.i - 2].text[-3:] == 'ing'))):
+                                     or self.features.ends_ing[verb.i - 2]))):
                         for conj in verb.conjuncts:
                             if conj.dep_ != 'conj':
                                 if (conj.pos_ == 'VERB'
-                                    or conj.text[-3:] == 'ing'
-                                        or all(list(map(lambda x: x.text[-3:] == 'ing'
+                                    or self.features.ends_ing[conj.i]
+                                        or all(list(map(lambda x: self.features.ends_ing[x.i]
                                                     and x.i > conj.i, conj.conjuncts)))):
-                                    self.all_verbs = []
+                                    all_verbs = []
                                     for word in conj.conjuncts:
                                         if ((word.pos_ == 'VERB'
-                                            or word.text[-3:] == 'ing')
+                                            or self.features.ends_ing[word.i])
                                                 and word.i < verb.i
                                                 and (self.sent[word.i + 1].text in self.CONJ_IND
                                                      or self.sent[word.i + 1] in conj.conjuncts)):
-                                            self.all_verbs.append(word)
-                                    self.all_verbs.append(verb)
+                                            all_verbs.append(word)
+                                    all_verbs.append(verb)
                                     if (self.sent[conj.i + 1].text in self.CONJ_IND
                                             and (conj.pos_ == 'VERB'
-                                                 or conj.text[-3:] == 'ing')):
-                                        self.main_verb = conj
-                                        self.all_verbs = [self.main_verb] + self.all_verbs
+                                                 or self.features.ends_ing[conj.i])):
+                                        main_verb = conj
+                                        all_verbs = [main_verb] + all_verbs
                                     else:
-                                        self.main_verb = self.all_verbs[0]
-                                    return self  # return self.main_verb, self.all_verbs
+                                        main_verb = all_verbs[0]
+                                    return main_verb, all_verbs
             else:
                 if self.sent[verb.i + 1].text in self.CONJ_IND:
-                    self.all_verbs = [verb]
+                    all_verbs = [verb]
                     for word in verb.conjuncts[:-1]:
-                        if ((word.pos_ == 'VERB' or word.text[-3:] == 'ing')
+                        if ((word.pos_ == 'VERB' or self.features.ends_ing[word.i])
                                 and (self.sent[word.i + 1].text in self.CONJ_IND
                                      or self.sent[word.i + 1] in verb.conjuncts)):
-                            self.all_verbs.append(word)
-                    self.all_verbs.append(verb.conjuncts[-1])
-                    self.main_verb = verb
-                    return self  # verb, self.verbs
+                            all_verbs.append(word)
+                    all_verbs.append(verb.conjuncts[-1])
+                    main_verb = verb
+                    return main_verb, all_verbs
 
         elif (self.sent[verb.i - 1].text in self.CONJ_IND) and (
-                self.sent[verb.i - 2].pos_ == 'VERB' or self.sent[verb.i - 2].text[-3:] == 'ing' or (
+                self.sent[verb.i - 2].pos_ == 'VERB' or self.features.ends_ing[verb.i - 2] or (
                 self.sent[verb.i - 2].text == ',' and (
-                self.sent[verb.i - 3].pos_ == 'VERB' or self.sent[verb.i - 2].text[-3:] == 'ing'))):
+                self.sent[verb.i - 3].pos_ == 'VERB' or self.features.ends_ing[verb.i - 2]))):
             if verb.head == self.sent[verb.i - 3] or verb.head == self.sent[verb.i - 2]:
-                self.main_verb = verb.head
-                self.all_verbs = [self.main_verb, verb]
-                return self  # self.main_verb, self.all_verbs
+                main_verb = verb.head
+                all_verbs = [main_verb, verb]
+                return main_verb, all_verbs
 
     def get_chunks(self, token: spacy.tokens.token.Token) -> spacy.tokens.token.Token:
-        lefts = list(token.lefts)
-        if lefts:
-            if self.sent[lefts[0].i - 1].text in self.CONJ_IND:
-                return (self.get_chunks(self.sent[lefts[0].i - 2])
-                        if self.sent[lefts[0].i - 2].text != ','
-                        else self.get_chunks(self.sent[lefts[0].i - 3]))
-            else:
-                return token
-        else:
-            if self.sent[token.i - 1].text in self.CONJ_IND:
-                return (self.get_chunks(self.sent[token.i - 2])
-                        if self.sent[token.i - 2].text != ','
-                        else self.get_chunks(self.sent[token.i - 3]))
+        """
+
+        Returns the first chunk of the row of chunks separated by 'and', '&', ',' which the token ends.
+        The chain of chunks is followed iteratively and its result is stored for every token on the chain.
+
+        """
+        path = []
+        seen = set()
+        i = token.i
+        while i not in self._chunks:
+            if i in seen:
+                raise RecursionError('get_chunks - cyclic chain of chunks')
+            path.append(i)
+            seen.add(i)
+            prev_chunk = self._prev_chunk(self.sent[i])
+            if prev_chunk is None:
+                self._chunks[i] = i
             else:
-                return token
+                i = prev_chunk.i
+        chunk = self._chunks[i]
+        for j in path:
+            self._chunks[j] = chunk
+        return self.sent[chunk]
+
+    def _prev_chunk(self, token: spacy.tokens.token.Token) -> spacy.tokens.token.Token | None:
+        lefts = list(token.lefts)
+        first = lefts[0] if lefts else token
+        if self.sent[first.i - 1].text in self.CONJ_IND:
+            return self.sent[first.i - 2] if self.sent[first.i - 2].text != ',' else self.sent[first.i - 3]
+        return None
 
     def get_main_token(self, token: spacy.tokens.token.Token,
                        kw_span: spacy.tokens.span.Span) -> spacy.tokens.token.Token:
@@ -114,6 +155,28 @@ class ConjunctsHandler:
 
         Returns the token of the first element of the enumeration which the keyword is part of.
 
+        """
+        path = []
+        seen = set()
+        main_token, i = self._main_token_step(token, kw_span)
+        while i is not None:
+            if i in self._main_tokens:
+                main_token = self._main_tokens[i]
+                break
+            if i in seen:
+                raise RecursionError('get_main_token - cyclic enumeration')
+            path.append(i)
+            seen.add(i)
+            main_token, i = self._main_token_step(self.sent[i], self.sent[i:i + 1])
+        for j in path:
+            self._main_tokens[j] = main_token
+        return main_token
+
+    def _main_token_step(self, token: spacy.tokens.token.Token,
+                         kw_span: spacy.tokens.span.Span) -> Tuple[spacy.tokens.token.Token | None, int | None]:
+        """
+        One step of get_main_token: returns either the main token and None, or None and the index of the token
+        whose main token (as a single-token keyword) is the answer.
         """
         while token.dep_ in self.CONJ_DEPS:
             if token.head.pos_ != 'VERB' and token.head not in kw_span:
@@ -123,7 +186,7 @@ class ConjunctsHandler:
                 break
 
         if token.head.text in self.PREP_MEANS + ['for']:
-            return token
+            return token, None
         if (token.head.text in ('including', 'like')
                 or (token.head.text == 'as'
                     and ('such' in list(map(lambda x: x.text, token.head.lefts))))):
@@ -137,18 +200,16 @@ class ConjunctsHandler:
                     prep = (self.sent[incl.i - 1].head
                             if self.sent[incl.i - 1].head.text == 'for'
                             else self.sent[incl.i - 2].head)
-                    return prep.head
+                    return prep.head, None
                 if incl.i > 1:
                     if self.sent[incl.i - 1].text != ',' and self.sent[incl.i - 1].dep_ in self.CONJ_DEPS:
-                        return self.get_main_token(self.sent[incl.i - 1], self.sent[incl.i - 1:incl.i])
+                        return None, self.sent[incl.i - 1].i
                     elif self.sent[incl.i - 1].text == ',' and self.sent[incl.i - 2].dep_ in self.CONJ_DEPS:
-                        return self.get_main_token(self.sent[incl.i - 2], self.sent[incl.i - 2:incl.i - 1])
+                        return None, self.sent[incl.i - 2].i
                     else:
-                        return self.sent[incl.i - 1] if self.sent[incl.i - 1].text != ',' else self.sent[incl.i - 2]
+                        return (self.sent[incl.i - 1] if self.sent[incl.i - 1].text != ',' else self.sent[incl.i - 2]), None
             else:
-                return (self.get_main_token(incl.head, self.sent[incl.head.i:incl.head.i + 1])
-                        if incl.head != incl
-                        else token)
+                return (None, incl.head.i) if incl.head != incl else (token, None)
         if (token.head.pos_ == 'ADP'
                 and token.head.text not in self.PREP_MEANS
                 and token.head.text != 'for'
@@ -157,9 +218,9 @@ class ConjunctsHandler:
                      or (token.head.text == 'as'
                          and ('such' in list(map(lambda x: x.text, token.head.lefts)))))):
             if self.sent[token.head.head.i - 1].text == 'and' and self.sent[token.head.head.i - 2].pos_ == 'NOUN':
-                return token
+                return token, None
             if token.head.dep_ != 'ROOT' and token.head.head.pos_ not in ['VERB', 'AUX']:
-                return self.get_main_token(token.head.head, self.sent[token.head.head.i:token.head.head.i + 1])
+                return None, token.head.head.i
         elif (token.head.pos_ == 'ADP'
               and token.head.text not in self.PREP_MEANS
               and token.head.text != 'for'
@@ -167,8 +228,7 @@ class ConjunctsHandler:
               and (self.get_chunks(token.head.head.head.head)
                    or token.head.head.head.head.dep_ in self.CONJ_DEPS)
                 and token.head.head.head.head.pos_ not in ['VERB', 'AUX']):
-            return self.get_main_token(token.head.head.head.head,
-                   self.sent[token.head.head.head.head.i:token.head.head.head.head.i + 1])
+            return None, token.head.head.head.head.i
         else:
             lefts = list(token.lefts)
             if lefts:
@@ -177,9 +237,7 @@ class ConjunctsHandler:
                     if (self.sent[token_.i - 1].text in self.CONJ_IND
                             and self.sent[token_.i - 2].pos_ not in ['VERB', 'AUX']
                             and self.sent[token_.i - 3].pos_ not in ['VERB', 'AUX']):
-                        return (self.get_main_token(self.sent[token_.i - 2], self.sent[token_.i - 2:token_.i - 1])
-                                if self.sent[token_.i - 2].text != ','
-                                else self.get_main_token(self.sent[token_.i - 3], self.sent[token_.i - 3:token_.i - 2]))
+                        return (None, token_.i - 2 if self.sent[token_.i - 2].text != ',' else token_.i - 3)
             lefts = list(kw_span[-1].lefts)
             if lefts:
                 if lefts[0].i > 2:
@@ -187,27 +245,22 @@ class ConjunctsHandler:
                     if (self.sent[token_.i - 1].text in self.CONJ_IND
                             and self.sent[token_.i - 2].pos_ not in ['VERB', 'AUX']
                             and self.sent[token_.i - 3].pos_ not in ['VERB', 'AUX']):
-                        return (self.get_main_token(self.sent[token_.i - 2], self.sent[token_.i - 2:token_.i - 1])
-                                if self.sent[token_.i - 2].text != ','
-                                else self.get_main_token(self.sent[token_.i - 3], self.sent[token_.i - 3:token_.i - 2]))
+                        return (None, token_.i - 2 if self.sent[token_.i - 2].text != ',' else token_.i - 3)
             if token.i > 2:
                 if (self.sent[token.i - 1].text in self.CONJ_IND
                         and self.sent[token.i - 2].pos_ not in ['VERB', 'AUX']
                         and self.sent[token.i - 3].pos_ not in ['VERB', 'AUX']):
-                    return (self.get_main_token(self.sent[token.i - 2], self.sent[token.i - 2:token.i - 1])
-                            if self.sent[token.i - 2].text != ','
-                            else self.get_main_token(self.sent[token.i - 3], self.sent[token.i - 3:token.i - 2]))
+                    return (None, token.i - 2 if self.sent[token.i - 2].text != ',' else token.i - 3)
             if kw_span[0].i > 2:
                 token_ = kw_span[0]
                 if (self.sent[token_.i - 1].text in self.CONJ_IND
                         and self.sent[token_.i - 2].pos_ not in ['VERB', 'AUX']
                         and self.sent[token_.i - 3].pos_ not in ['VERB', 'AUX']):
-                    return (self.get_main_token(self.sent[token_.i - 2], self.sent[token_.i - 2:token_.i - 1])
-                            if self.sent[token_.i - 2].text != ','
-                            else self.get_main_token(self.sent[token_.i - 3], self.sent[token_.i - 3:token_.i - 2]))
+                    return (None, token_.i - 2 if self.sent[token_.i - 2].text != ',' else token_.i - 3)
             else:
-                return token
-            return token
+                return token, None
+            return token, None
+        return None, None
 
     def get_main_verb_token(self, verb: spacy.tokens.token.Token):
         """
@@ -219,20 +272,31 @@ class ConjunctsHandler:
         a verb.
 
         """
-        last_verb = verb
-        while verb.dep_ in self.CONJ_DEPS:
-            if verb.head.pos_ == 'VERB':
-                verb = verb.head
-                self.all_verbs.append(verb)
-            else:
-                if self.get_synsets(verb.head) and verb.head.text[-4:] != 'ings':
+        chain = self.find_verb_chain(verb)
+        self.all_verbs += chain + [verb]
+        self.main_verb = chain[-1] if chain else verb
+        return self
+
+    def find_verb_chain(self, verb: spacy.tokens.token.Token) -> List[spacy.tokens.token.Token]:
+        """
+        Returns the verbs which the given verb is a conjunct of, from its head up to the main verb. The result is
+        computed once per verb.
+        """
+        key = verb.i
+        if key not in self._verb_chains:
+            chain = []
+            while verb.dep_ in self.CONJ_DEPS:
+                if verb.head.pos_ == 'VERB':
                     verb = verb.head
-                    self.all_verbs.append(verb)
+                    chain.append(verb)
                 else:
-                    break
-        self.all_verbs += [last_verb]
-        self.main_verb = verb
-        return self
+                    if self.get_synsets(verb.head) and not self.features.ends_ings[verb.head.i]:
+                        verb = verb.head
+                        chain.append(verb)
+                    else:
+                        break
+            self._verb_chains[key] = chain
+        return self._verb_chains[key]
 
     @staticmethod
     def get_synsets(token: spacy.tokens.token.Token) -> List:
@@ -0,0 +1,130 @@
+from typing import Any, Callable, List, NamedTuple, Sequence, Tuple
+
+from spacy.tokens.token import Token as SpacyToken
+
+ROLES = ('action', 'state', 'subject', 'means', 'result', 'indirect engagement', 'benefactive')
+ROLE_BITS = {role: 1 << i for i, role in enumerate(ROLES)}
+ROLE_NAMES = {bit: role for role, bit in ROLE_BITS.items()}
+ACTION, STATE, SUBJECT, MEANS, RESULT, INDIRECT, BENEFACTIVE = ROLE_BITS.values()
+ROLES_MASK = (1 << len(ROLES)) - 1
+WITH_ACTION = 1 << len(ROLES)  # action verbs were found for the first verb ('action+result')
+EXPERTISE = WITH_ACTION << 1
+NO_VERBS = WITH_ACTION << 2
+
+
+class VerbTuple(NamedTuple):
+    """
+    (verb index, verb, additional object, prep, flag or link) - the verb tuple of the rule modules.
+    """
+    indx: int | str
+    verb: str | SpacyToken
+    addobj: str
+    prep: str | SpacyToken
+    link: str | SpacyToken
+
+
+def mask_roles(flag: int) -> List[int]:
+    """
+    Returns the role bits set in the flag, in the order of ROLES.
+    """
+    return [bit for bit in ROLE_NAMES if flag & bit]
+
+
+class LazyList(Sequence):
+    """
+    The list of the given size whose items are computed by compute(index) on the first access.
+    """
+    __slots__ = ('_compute', '_items')
+    _MISSING = object()
+
+    def __init__(self, size: int, compute: Callable[[int], Any]):
+        self._compute = compute
+        self._items = [self._MISSING] * size
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        item = self._items[i]
+        if item is self._MISSING:
+            item = self._items[i] = self._compute(i % len(self._items))
+        return item
+
+
+class KeywordAnalysis:
+    """
+    The result of the verbs and subjects determining for one keyword of the sentence.
+
+    flag is the bitmask of the roles of the found verbs (ACTION, RESULT etc.) together with EXPERTISE, NO_VERBS
+    and WITH_ACTION; parts are the roles of the found verbs in their order. E.g. the verbs flagged as
+    'action+result_result_means' have flag RESULT | MEANS | WITH_ACTION and parts (RESULT, RESULT, MEANS).
+    The verbs of each role are kept in the list indexed by the bit number of the role, None means that the role
+    wasn't assigned.
+    """
+    __slots__ = ('improved_keyword', 'found_keyword', 'expertise', 'akw_indices', 'akw_pos', 'akw_head_text',
+                 'flag', 'parts', 'special', 'verbs', 'subject_tokens', 'subject_types', 'real_verbs')
+
+    def __init__(self, skw_akw: dict):
+        self.improved_keyword = skw_akw['akw_text']
+        self.found_keyword = skw_akw['skw_text']
+        self.expertise = skw_akw['expertise']
+        self.akw_indices = skw_akw['akw_indices']
+        self.akw_pos = skw_akw['akw_pos']
+        self.akw_head_text = skw_akw['akw_head_text']
+        self.flag = 0
+        self.parts: Tuple[int, ...] = ()
+        self.special = None
+        self.verbs: List[List[VerbTuple] | None] = [None] * len(ROLES)
+        self.subject_tokens = []
+        self.subject_types = []
+        self.real_verbs = []
+
+    @property
+    def flag_text(self) -> str:
+        """
+        The flag in the text form ('expertise', 'no-verbs', 'action+result_result'), used in the log messages.
+        """
+        if self.flag & EXPERTISE:
+            return 'expertise'
+        if self.flag & NO_VERBS:
+            return 'no-verbs'
+        parts = [ROLE_NAMES[role] for role in self.parts]
+        if self.flag & WITH_ACTION and parts:
+            parts[0] = 'action+' + parts[0]
+        return '_'.join(parts)
+
+    def with_found_keyword(self, found_keyword: str) -> 'KeywordAnalysis':
+        """
+        Returns the analysis of the same span for another found keyword; the verbs and subjects are shared.
+        """
+        if found_keyword == self.found_keyword:
+            return self
+        kw = KeywordAnalysis.__new__(KeywordAnalysis)
+        for slot in self.__slots__:
+            setattr(kw, slot, getattr(self, slot))
+        kw.found_keyword = found_keyword
+        return kw
+
+    def get_verbs(self, role: int) -> List[VerbTuple]:
+        verbs = self.verbs[role.bit_length() - 1]
+        if verbs is None:
+            raise KeyError(ROLE_NAMES[role])
+        return verbs
+
+    def set_verbs(self, role: int, verbs: List[VerbTuple]):
+        self.verbs[role.bit_length() - 1] = verbs
+
+    def add_part(self, role: int):
+        self.parts += (role,)
+        self.flag |= role
+
+    def first_verbs(self) -> List[VerbTuple]:
+        """
+        Returns the verbs the subjects are determined for: the action verbs if they were found for the first verb,
+        otherwise the verbs of the first role.
+        """
+        if self.flag & WITH_ACTION:
+            return self.get_verbs(ACTION)
+        return self.get_verbs(self.parts[0])
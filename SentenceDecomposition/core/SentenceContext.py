@@ -0,0 +1,85 @@
+from typing import Callable, Dict, FrozenSet, Hashable, List, Tuple
+
+import spacy
+
+from ConjunctsHandler import ConjunctsHandler
+from VerbTypeChecker import VerbTypeChecker
+
+
+def main_tok_from_indices(doc: spacy.tokens.doc.Doc,
+                          indices: List[int]) -> Tuple[spacy.tokens.token.Token, spacy.tokens.span.Span]:
+    token_ = doc[indices[-1]]
+    kw_span = doc[indices[0]:indices[1] + 1]
+    main_tok = token_
+    if kw_span[0] == token_.head:
+        main_tok = kw_span[0]
+    elif kw_span[-1] != token_ and kw_span[-1] == token_.head and kw_span[-1] == kw_span[0].head:
+        main_tok = kw_span[-1]
+    return main_tok, kw_span
+
+
+def get_excluded_indices(main_tok: spacy.tokens.token.Token,
+                         kw_span: spacy.tokens.span.Span) -> Tuple[FrozenSet[int], FrozenSet[int]]:
+    """
+    Returns the indices of the tokens that can't be a part of the objects of the verbs of the keyword: the tokens
+    of the keyword, its main token and the conjuncts of the main token; and the same indices without the main token.
+    """
+    without_main_tok = frozenset(range(kw_span.start, kw_span.end)) | {conj.i for conj in main_tok.conjuncts}
+    return without_main_tok | {main_tok.i}, without_main_tok
+
+
+class SentenceContext:
+    """
+    The context of the sentence analysis. It is created once per sentence in analyze_sentence and passed through
+    all the rule modules, so that the results derived from the sentence Doc (main tokens of the keywords,
+    conjuncts, nearest verbs, other verbs etc.) are computed once and shared by all the keywords of the sentence.
+    """
+
+    def __init__(self, doc: spacy.tokens.doc.Doc):
+        self.doc = doc
+        self.verb_checker = VerbTypeChecker(doc)
+        self.conjuncts_handler = ConjunctsHandler(doc)
+        self._memo: Dict[str, dict] = {}
+
+    def memo(self, name: str, key: Hashable, compute: Callable):
+        """
+        Returns the result of compute() stored under the given name and key, computing it on the first call.
+        """
+        cache = self._memo.get(name)
+        if cache is None:
+            cache = self._memo[name] = {}
+        if key not in cache:
+            cache[key] = compute()
+        return cache[key]
+
+    def main_tok_from_indices(self, indices: List[int]) -> Tuple[spacy.tokens.token.Token, spacy.tokens.span.Span]:
+        return self.memo('main_tok_from_indices', tuple(indices), lambda: main_tok_from_indices(self.doc, indices))
+
+    def main_token(self, token: spacy.tokens.token.Token,
+                   kw_span: spacy.tokens.span.Span) -> spacy.tokens.token.Token:
+        """
+        Returns the token of the first element of the enumeration which the keyword is part of.
+        """
+        return self.memo('main_token', (token.i, kw_span.start, kw_span.end),
+                         lambda: self.conjuncts_handler.get_main_token(token, kw_span))
+
+    def excluded_indices(self, main_tok: spacy.tokens.token.Token,
+                         kw_span: spacy.tokens.span.Span) -> Tuple[FrozenSet[int], FrozenSet[int]]:
+        return self.memo('excluded_indices', (main_tok.i, kw_span.start, kw_span.end),
+                         lambda: get_excluded_indices(main_tok, kw_span))
+
+    def conjuncts(self, verb: spacy.tokens.token.Token) -> Tuple[spacy.tokens.token.Token,
+                                                                  List[spacy.tokens.token.Token]]:
+        """
+        Returns the main verb and all the verbs of the row of verbs found by ConjunctsHandler.get_conjuncts.
+        """
+        found = self.conjuncts_handler.find_conjuncts(verb)
+        return found if found else (verb, [])
+
+    def main_verb_conjuncts(self, verb: spacy.tokens.token.Token) -> Tuple[spacy.tokens.token.Token,
+                                                                            List[spacy.tokens.token.Token]]:
+        """
+        Returns the main verb and all the verbs of the enumeration found by ConjunctsHandler.get_main_verb_token.
+        """
+        chain = self.conjuncts_handler.find_verb_chain(verb)
+        return chain[-1] if chain else verb, chain + [verb]
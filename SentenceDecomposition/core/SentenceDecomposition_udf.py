@@ -1,11 +1,21 @@
+import base64
+import hashlib
+import json
+import os
 import traceback
-from typing import Tuple, Callable, List, Dict, Optional
+from typing import Tuple, Callable, Iterator, List, Dict, Optional
 
-import numpy as np
+from spacy.attrs import DEP, ENT_IOB, ENT_TYPE, HEAD, LEMMA, ORTH, POS, TAG
 from spacy.tokens.doc import Doc as SpacyDoc
 from spacy.tokens.token import Token as SpacyToken
 
-from SubjectTypeDeterminer import SubjectTypeDeterminer
+from KeywordAnalysis import (ACTION, BENEFACTIVE, EXPERTISE, INDIRECT, MEANS, NO_VERBS, RESULT, ROLE_BITS, ROLE_NAMES,
+                             ROLES_MASK, STATE, SUBJECT, WITH_ACTION, KeywordAnalysis, LazyList, VerbTuple,
+                             mask_roles)
+from SentenceContext import SentenceContext
+from TokenFeatures import TokenFeatures
+from compactRows import STATIC_COLS, SentenceRows, compact_row
+from SubjectTypeDeterminer import SentenceSubjectTypes, SubjectTypeDeterminer
 from expertiseIn import ExpertiseChecker
 from getActionsForMeans import getActionsForMeans
 from getActionsForResult import getActionsForResult
@@ -13,10 +23,10 @@ from getActionsforKeyword import getActionsforKeyword
 from oneforce_logger import OneForceLogger
 from processNoVerbs import processNoVerbs
 from oneforce_swagger_docs import SentenceDecompositionDoc
+from resultStore import ResultStore
 
 DictStr = Dict[str, str]
 TupleVb = Tuple[int | str, str, str, str, str]
-DictSL = Dict[str, str | List[str | TupleVb | dict]]
 
 SUBJECT_ERROR_FLAG = 'error-subject-no-verb'
 NO_VERB_INDX = 'error-no-verb-index'
@@ -24,13 +34,13 @@ NO_VERB_INDX = 'error-no-verb-index'
 ExpCheck = ExpertiseChecker()
 sbj_type_det = SubjectTypeDeterminer()
 logger = OneForceLogger('SD-udf')
-
-DATA_FORMAT_COLS = ['foundKeyword', 'improvedKeyword', 'whereFound', 'verb', 'verbPrep', 'additionalObject', 'object',
-                    'resultLink', 'resultVerb', 'resultVerbPrep', 'resultAdditionalObject', 'resultObject', 'meansLink',
-                    'meansVerb', 'meansVerbPrep', 'meansAdditionalObject', 'meansObject', 'indirectLink',
-                    'indirectVerb', 'indirectVerbPrep', 'indirectAdditionalObject', 'indirectObject', 'extractedLink',
-                    'extractedVerb', 'extractedObject', 'benefactive', 'benefactiveLink', 'role', 'subjectToken',
-                    'subjectType', 'isPassive', 'agentInfo', 'improvedKeywordAddInfo']
+result_store = ResultStore.from_env()  # None unless SD_RESULT_STORE_PATH is set
+# the rows of a keyword beyond SD_MAX_ROWS_PER_KEYWORD are dropped (0 - no limit); SD_DEDUP_ROWS=0 keeps the
+# identical rows of a sentence
+MAX_ROWS_PER_KEYWORD = int(os.environ.get('SD_MAX_ROWS_PER_KEYWORD', 1000))
+DEDUP_ROWS = os.environ.get('SD_DEDUP_ROWS', '1') != '0'
+# the token attributes the stored results of the decoded Docs are keyed by
+DOC_DIGEST_ATTRS = [ORTH, LEMMA, POS, TAG, DEP, HEAD, ENT_IOB, ENT_TYPE]
 
 
 # =======================================================
@@ -42,12 +52,12 @@ def get_short_flag(flag: str) -> str:
 
 
 def add_flag_object(dict_: DictStr,
-                    kw_dict: DictSL,
+                    kw: KeywordAnalysis,
                     flag: str) -> DictStr:
     if flag != 'benefactive':
-        dict_[f'{flag}Object'] = kw_dict['improvedKeyword']
+        dict_[f'{flag}Object'] = kw.improved_keyword
     else:
-        dict_['benefactive'] = kw_dict['improvedKeyword']
+        dict_['benefactive'] = kw.improved_keyword
     return dict_
 
 
@@ -83,16 +93,6 @@ def flatten_list(_2d_list: list) -> list:
     return flat_list
 
 
-def fill_dict(dict_: DictStr,
-              keys_: List[str],
-              fill_str: str) -> DictStr:
-    tmp_keys = set(dict_.keys())
-    for k in keys_:
-        if k not in tmp_keys:
-            dict_[k] = fill_str
-    return dict_
-
-
 # =======================================================
 # STEP 1 - EXPERTISE DETERMINING
 # =======================================================
@@ -108,171 +108,136 @@ def check_expertise_in(sentence_doc: SpacyDoc,
 # =======================================================
 def get_actions_for_verb(func_get_action: Callable,
                          verb: TupleVb,
-                         doc: SpacyDoc,
+                         ctx: SentenceContext,
                          akw_indices: list) -> List[TupleVb]:
     if str(verb[1]) == '':
-        cur_action = func_get_action(doc, akw_indices)
+        cur_action = func_get_action(ctx, akw_indices)
     else:
-        cur_action = func_get_action(doc, doc[verb[0]])
+        cur_action = func_get_action(ctx, ctx.doc[verb[0]])
     return cur_action
 
 
 def run_get_actions(func_get_action: Callable,
-                    flag: str,
-                    doc: SpacyDoc,
+                    role: int,
+                    ctx: SentenceContext,
                     akw_indices: list,
-                    cur_verbs: List[TupleVb],
-                    kw_dict: DictSL) -> DictSL:
-    # real_action = []
-    # for v in cur_verbs:
-    #     cur_action = get_actions_for_verb(func_get_action, v, doc, akw_indices)
-    #     real_action.append(cur_action)
-    real_action = [get_actions_for_verb(func_get_action, v, doc, akw_indices) for v in cur_verbs]
-    if len(real_action[-1]) > 0:
-        kw_dict['action'] = real_action[-1]
-        kw_dict[flag] = cur_verbs
-        kw_dict['FLAG'] = f'action+{flag}'
-    else:
-        kw_dict[flag] = cur_verbs
-        kw_dict['FLAG'] = flag
-    return kw_dict
+                    cur_verbs: List[VerbTuple],
+                    kw: KeywordAnalysis) -> KeywordAnalysis:
+    # only the actions of the last verb are used
+    real_action = get_actions_for_verb(func_get_action, cur_verbs[-1], ctx, akw_indices)
+    if len(real_action) > 0:
+        kw.set_verbs(ACTION, [VerbTuple(*v) for v in real_action])
+        kw.flag |= WITH_ACTION
+    kw.set_verbs(role, cur_verbs)
+    kw.add_part(role)
+    return kw
 
 
 def run_get_actions_2(func_get_action: Callable,
-                      cur_verb_flag: str,
-                      cur_flags: List[str],
-                      verb: TupleVb,
-                      doc: SpacyDoc,
+                      cur_verb_flag: int,
+                      verb: VerbTuple,
+                      ctx: SentenceContext,
                       akw_indices: list,
                       # cur_verbs: list,
-                      kw_dict: DictSL) -> Tuple[DictSL, List[str]]:
-    cur_action = get_actions_for_verb(func_get_action, verb, doc, akw_indices)
+                      kw: KeywordAnalysis) -> KeywordAnalysis:
+    """
+    Processes the first verb of the keyword with several verb roles.
+    """
+    cur_action = get_actions_for_verb(func_get_action, verb, ctx, akw_indices)
 
     if len(cur_action) > 0:
-        kw_dict['action'] = cur_action
-        kw_dict[cur_verb_flag].append(verb)
-        cur_flags.append('action+' + cur_verb_flag)
+        kw.set_verbs(ACTION, [VerbTuple(*v) for v in cur_action])
+        kw.get_verbs(cur_verb_flag).append(verb)
+        kw.flag |= WITH_ACTION
     else:
         # kw_dict['action'] = [v]
         # cur_flags.append('action')
-        kw_dict[cur_verb_flag] = [verb]
-        cur_flags.append(cur_verb_flag)
+        kw.set_verbs(cur_verb_flag, [verb])
+    kw.add_part(cur_verb_flag)
 
-    return kw_dict, cur_flags
+    return kw
 
 
-def get_verbs_for_kws(sentence_doc: SpacyDoc,
-                      skw_akw_list: List[DictSL]) -> List[DictSL]:
+def get_verbs_for_kws(ctx: SentenceContext,
+                      skw_akw_list: List[dict]) -> List[KeywordAnalysis]:
     """
     Output params:
     ----------
-        - kws_list: list - list of dicts (kw_dict), containing info about each kw found in the sentence.
-                    kw_dict can be by following structure (key -value):
-                        'improveKeyword' - AKW str
-                        'foundKeyword' - SKW str
-                        'experiseIn' - result of expertise checker
-                        'FLAG' - kw type; possible values:
-                                    -- action/ means/ result/
-                                    -- action+type_1 (in case kw has type type_1 and action verb(s) was found)
-                                    -- action+type1_type2
-                                    -- experise
-                        'REAL_FLAG' - 
-                        'ALL_VERBS' - actions verbs from getActionsforKeyword
-                        'special' - results from processNoVerbs/ EnumProcessing if exist
-                        'action' - action verbs  if exist
-                        'means' - means verbs  if exist
-                        'result' - result verbs  if exist
-                        'action' - action verbs  if exist
+        - kws_list: list - list of KeywordAnalysis records, containing info about each kw found in the sentence:
+                        improved_keyword - AKW str
+                        found_keyword - SKW str
+                        expertise - result of expertise checker
+                        flag - kw type, the bitmask of:
+                                    -- EXPERTISE/ NO_VERBS
+                                    -- the roles of the found verbs: ACTION/ STATE/ SUBJECT/ MEANS/ RESULT/ ...
+                                    -- WITH_ACTION (in case the first verb has a type and action verb(s) was found)
+                        parts - the roles of the found verbs in their order
+                        special - results from processNoVerbs/ EnumProcessing if exist
+                        verbs - the verbs of each role (action, means, result etc.) if exist
     """
     kws_list = []
     if len(skw_akw_list) > 0:
         try:
             for skw_akw in skw_akw_list:
-                kw_dict = {'improvedKeyword': skw_akw['akw_text'],
-                           'foundKeyword': skw_akw['skw_text'],
-                           'expertise': skw_akw['expertise'],
-                           'akw_indices': skw_akw['akw_indices'],
-                           'akw_pos': skw_akw['akw_pos'],
-                           'akw_head_text': skw_akw['akw_head_text'],
-                           }
+                kw = KeywordAnalysis(skw_akw)
 
                 if skw_akw['expertise']:
-                    kw_dict['FLAG'] = 'expertise'
-                    kws_list.append(kw_dict)
+                    kw.flag = EXPERTISE
+                    kws_list.append(kw)
                 else:
-                    cur_verbs = getActionsforKeyword(sentence_doc, skw_akw['akw_indices'])
-                    kw_dict['ALL_VERBS'] = cur_verbs
+                    cur_verbs = [VerbTuple(*v) for v in getActionsforKeyword(ctx, skw_akw['akw_indices'])]
                     if len(cur_verbs) == 0:
                         # (flag,list of verbs string, prep str) or ('', [], '')
-                        tmp = processNoVerbs(sentence_doc, skw_akw['akw_indices'])
-                        kw_dict['special'] = tmp
-                        kw_dict['FLAG'] = 'no-verbs'
-                        kws_list.append(kw_dict)
+                        kw.special = processNoVerbs(ctx, skw_akw['akw_indices'])
+                        kw.flag = NO_VERBS
+                        kws_list.append(kw)
                     else:
-                        flags = set(list(map(lambda x: x[-1], cur_verbs)))
+                        flags = set(verb.link for verb in cur_verbs)
                         flags_list = list(flags)
                         # 1 FLAG
                         if len(flags) == 1:
-                            if flags == {'subject'}:
-                                kw_dict[flags_list[0]] = cur_verbs
-                                kw_dict['FLAG'] = 'subject'
-                            elif flags_list[0] in {'action', 'state'}:
-                                kw_dict[flags_list[0]] = cur_verbs
-                                kw_dict['FLAG'] = flags_list[0]
-                            elif flags_list[0] == 'means':
-                                kw_dict = run_get_actions(getActionsForMeans, 'means', sentence_doc,
-                                                          skw_akw['akw_indices'], cur_verbs, kw_dict)
-                            elif flags_list[0] in {'result', 'indirect engagement', 'benefactive'}:
-                                kw_dict = run_get_actions(getActionsForResult, flags_list[0], sentence_doc,
-                                                          skw_akw['akw_indices'], cur_verbs, kw_dict)
+                            flag = ROLE_BITS.get(flags_list[0])
+                            if flag in (SUBJECT, ACTION, STATE):
+                                kw.set_verbs(flag, cur_verbs)
+                                kw.add_part(flag)
+                            elif flag == MEANS:
+                                kw = run_get_actions(getActionsForMeans, MEANS, ctx,
+                                                     skw_akw['akw_indices'], cur_verbs, kw)
+                            elif flag in (RESULT, INDIRECT, BENEFACTIVE):
+                                kw = run_get_actions(getActionsForResult, flag, ctx,
+                                                     skw_akw['akw_indices'], cur_verbs, kw)
                             else:
                                 logger.error(f'get_verbs_for_kws - unexpected flag; 1 flag: {flags_list[0]}')
                                 return []
                         # 2 FLAGS
                         elif len(flags) == 2:
-                            kw_dict[str(flags_list[0])] = []
-                            kw_dict[str(flags_list[1])] = []
-                            cur_flags = []
-                            real_flags = []
+                            for flag in flags_list:
+                                if flag in ROLE_BITS:
+                                    kw.set_verbs(ROLE_BITS[flag], [])
                             # [(verbIndx, verbToken, prepToken, object,link)] or []
                             for j, verb in enumerate(cur_verbs):
-                                cur_verb_flag = verb[-1]
-                                real_flags.append(cur_verb_flag)
-                                if cur_verb_flag in {'action', 'state'}:
-                                    cur_flags.append(cur_verb_flag)
-                                    kw_dict[cur_verb_flag].append(verb)
-                                elif cur_verb_flag in {'result', 'benefactive', 'indirect engagement'}:
+                                cur_verb_flag = ROLE_BITS.get(verb.link)
+                                if cur_verb_flag in (ACTION, STATE):
+                                    kw.add_part(cur_verb_flag)
+                                    kw.get_verbs(cur_verb_flag).append(verb)
+                                elif cur_verb_flag in (RESULT, BENEFACTIVE, INDIRECT, MEANS):
                                     if j == 0:
-                                        kw_dict, cur_flags = run_get_actions_2(getActionsForResult, cur_verb_flag,
-                                                                               cur_flags, verb, sentence_doc,
-                                                                               skw_akw['akw_indices'],  # cur_verbs,
-                                                                               kw_dict)
-
-                                    else:
-                                        cur_flags.append(cur_verb_flag)
-                                        kw_dict[cur_verb_flag].append(verb)
-
-                                elif cur_verb_flag in {'means'}:
-                                    if j == 0:
-                                        kw_dict, cur_flags = run_get_actions_2(getActionsForMeans, cur_verb_flag,
-                                                                               cur_flags, verb, sentence_doc,
-                                                                               skw_akw['akw_indices'],  # cur_verbs,
-                                                                               kw_dict)
-
+                                        func_get_action = getActionsForMeans if cur_verb_flag == MEANS \
+                                            else getActionsForResult
+                                        kw = run_get_actions_2(func_get_action, cur_verb_flag, verb, ctx,
+                                                               skw_akw['akw_indices'],  # cur_verbs,
+                                                               kw)
                                     else:
-                                        cur_flags.append(cur_verb_flag)
-                                        kw_dict[cur_verb_flag].append(verb)
+                                        kw.add_part(cur_verb_flag)
+                                        kw.get_verbs(cur_verb_flag).append(verb)
                                 else:
                                     logger.error(f'''get_verbs_for_kws - unexpected flag;
                                                     2 flags: {"|".join(flags_list)}''')
                                     return []
-
-                            kw_dict['FLAG'] = '_'.join(cur_flags)
-                            kw_dict['REAL_FLAG'] = '_'.join(real_flags)
                         else:
                             logger.error(f'get_verbs_for_kws - unexpected flag; not 2 flags: {"|".join(flags_list)}')
                             return []
-                        kws_list.append(kw_dict)
+                        kws_list.append(kw)
         except Exception as e:
             logger.error(f"get_verbs_for_kws - unexpected error")
             logger.error(str(e))
@@ -302,40 +267,23 @@ def get_verbs_for_kws(sentence_doc: SpacyDoc,
 #         return []
 
 
-def get_verbs_from_kw_dict(kw_dict: DictSL) -> List[TupleVb]:
-    flags = kw_dict['FLAG'].split('_')
-    verbs = []
-    if len(flags) == 1:
-        if kw_dict['FLAG'] not in {'no-verbs', 'expertise'}:
-            if '+' in kw_dict['FLAG']:
-                verbs = kw_dict[kw_dict['FLAG'].split('+')[0]]
-            else:
-                verbs = kw_dict[kw_dict['FLAG']]
-    elif len(set(flags)) in [2, 3]:
-        if '+' in flags[0]:
-            verbs = kw_dict[flags[0].split('+')[0]]
-        else:
-            verbs = kw_dict[flags[0]]
-    else:
-        logger.error(f'get verbs_from_kw_dict - unexpected flags: {"|".join(flags)}')
-        return []
-    if len(verbs) > 0:
-        return list(map(lambda y: y[0], verbs))
-    else:
+def get_verbs_from_kw(kw: KeywordAnalysis) -> List[int | str]:
+    if kw.flag & (EXPERTISE | NO_VERBS):
         return []
+    return [verb.indx for verb in kw.first_verbs()]
 
 
-def get_all_indx_verbs(skw_akw_list: List[DictSL]) -> List[DictSL]:
-    tmp = list(map(lambda x: get_verbs_from_kw_dict(x), skw_akw_list))
+def get_all_indx_verbs(kws_list: List[KeywordAnalysis]) -> List[int | str]:
+    tmp = list(map(lambda x: get_verbs_from_kw(x), kws_list))
     tmp = list(set(flatten_list(tmp)))
     tmp = list(filter(lambda y: str(y) != '', tmp))
     return tmp
 
 
-def add_empty_sbj(d: DictSL) -> DictSL:
-    d['subjectTokens'] = []
-    d['subjectTypes'] = []
-    return d
+def add_empty_sbj(kw: KeywordAnalysis) -> KeywordAnalysis:
+    kw.subject_tokens = []
+    kw.subject_types = []
+    return kw
 
 
 def process_sbj_type(sbj_type: str, profile_id: str) -> str:
@@ -349,15 +297,16 @@ def process_sbj_type(sbj_type: str, profile_id: str) -> str:
             return tmp[0] + "_MAYBE"
 
 
-def get_sbj_type(sbj_ph: dict | str, sentence_doc: SpacyDoc, NENP_dict: dict,
+def get_sbj_type(sbj_ph: dict | str, subject_types: SentenceSubjectTypes,
                  verb: TupleVb | Dict[str, str | TupleVb | dict],
                  profile_id: str) -> str:
     if isinstance(verb, dict):
         if isinstance(verb['passed'][0], int):
             if isinstance(verb['real'], str):
                 return 'Undefined'
-            return process_sbj_type(sbj_type_det.get_subject_type(sbj_ph['sbj_indx'], sentence_doc,
-                                                                  NENP_dict, verb['real']['phrase_head_in']),
+            return process_sbj_type(sbj_type_det.get_subject_type(sbj_ph['sbj_indx'], subject_types.doc,
+                                                                  subject_types.NENP_dict,
+                                                                  verb['real']['phrase_head_in'], subject_types),
                                     profile_id)
     return SUBJECT_ERROR_FLAG
 
@@ -385,20 +334,41 @@ def get_vb_info(sentence_doc: SpacyDoc,
     return vb
 
 
-def add_sbj_type_update_sbj_tok(d: DictSL, sentence_doc: SpacyDoc,
-                                NENP_dict: dict,
+def add_sbj_type_update_sbj_tok(kw: KeywordAnalysis, sentence_doc: SpacyDoc,
+                                subject_types: SentenceSubjectTypes,
                                 verbs: List[TupleVb | Dict[str, str | TupleVb | dict]],  # dict from preproc info
-                                profile_id: str) -> DictSL:
-    d['subjectTypes'] = [get_sbj_type(sbj_ph, sentence_doc, NENP_dict, verbs[i], profile_id) for i, sbj_ph
-                         in enumerate(d['subjectTokens'])]
-    d['subjectTokens'] = [get_sbj(sentence_doc, sbj_ph) if isinstance(sbj_ph, dict) else str(sbj_ph) for sbj_ph
-                          in d['subjectTokens']]  # dict from preproc info
-    d['realVerbs'] = [get_vb_info(sentence_doc, vb) for vb in d['realVerbs']]
-    return d
+                                profile_id: str) -> KeywordAnalysis:
+    """
+    The subject types, subject tokens and verb infos are computed lazily, only for the verbs of the output rows.
+    """
+    sbj_phrases = kw.subject_tokens
+    real_verbs = kw.real_verbs
+    kw.subject_types = LazyList(len(sbj_phrases),
+                                lambda i: get_sbj_type(sbj_phrases[i], subject_types, verbs[i], profile_id))
+    kw.subject_tokens = LazyList(len(sbj_phrases),
+                                 lambda i: get_sbj(sentence_doc, sbj_phrases[i]) if isinstance(sbj_phrases[i], dict)
+                                 else str(sbj_phrases[i]))  # dict from preproc info
+    kw.real_verbs = LazyList(len(real_verbs), lambda i: get_vb_info(sentence_doc, real_verbs[i]))
+    return kw
+
+
+def get_verb_phrase_index(preproc_verbs: List[dict]) -> List[int]:
+    """
+        Returns the list where the item with index N is the position of the first verb phrase from preprocessing
+        that contains the token N, or -1 if there is no such phrase.
+    """
+    size = max([verb_info['phrase_end'] for verb_info in preproc_verbs], default=0)
+    phrase_index = [-1] * max(size, 0)
+    for i in range(len(preproc_verbs) - 1, -1, -1):
+        start = max(preproc_verbs[i]['phrase_start'], 0)
+        end = preproc_verbs[i]['phrase_end']
+        if start < end:
+            phrase_index[start:end] = [i] * (end - start)
+    return phrase_index
 
 
-def verb_range(verb_info: dict) -> range:
-    return range(verb_info['phrase_start'], verb_info['phrase_end'])
+def find_verb_phrase(phrase_index: List[int], vb_indx: int) -> int:
+    return phrase_index[vb_indx] if 0 <= vb_indx < len(phrase_index) else -1
 
 
 def error_verb_not_found_in_preproc(vb_indx: str | int, preproc_verbs: List[dict]):
@@ -425,60 +395,43 @@ def error_verb_not_found_in_preproc(vb_indx: str | int, preproc_verbs: List[dict
 
 
 def get_subjects_for_kws_verbs(doc: SpacyDoc,
-                               kws_list: List[DictSL],
+                               kws_list: List[KeywordAnalysis],
                                preprocessing_info: dict,
-                               profile_id: str) -> List[DictSL]:
+                               profile_id: str) -> List[KeywordAnalysis]:
     if len(kws_list) == 0:
         return kws_list
     else:
         verbs_indx = get_all_indx_verbs(kws_list)
         if len(verbs_indx) == 0:
-            return [add_empty_sbj(kw_dict) for kw_dict in kws_list]
+            return [add_empty_sbj(kw) for kw in kws_list]
         else:
             # improved_indx, found_kw = get_kw_indx_word(skw_akw_list)
             preproc_vb_sbj = preprocessing_info['verbs_subjects']
-            all_found_verbs = np.array(list(map(verb_range, preproc_vb_sbj['verbs'])))
+            phrase_index = get_verb_phrase_index(preproc_vb_sbj['verbs'])
             verbs_list = []
-            for kw_dict in kws_list:
+            for kw in kws_list:
                 subject_info = []
                 verb_info = []
-                flags = kw_dict['FLAG'].split('_')
-                if len(flags) == 1:
-                    if flags[0] in {'result', 'indirect engagement', 'means', 'action', 'state'}:
-                        kw_verbs = kw_dict[flags[0]]
-                    elif flags[0] == 'subject':
-                        kw_verbs = kw_dict['subject']
-                    elif '+' in flags[0]:
-                        kw_verbs = kw_dict['action']
-                    elif flags[0] in {'no-verbs', 'expertise', 'benefactive'}:
-                        kw_verbs = []
-                    else:  # unexpected flag
-                        logger.error(f'get subjects_for_kws_verbs - unexpected flag: {"|".join(flags)}')
-                        kw_verbs = []
-                elif len(set(flags)) in [2, 3]:
-                    if '+' in flags[0]:
-                        kw_verbs = kw_dict[flags[0].split('+')[0]]
-                    else:
-                        kw_verbs = kw_dict[flags[0]]
-                else:  # unexpected flag
-                    logger.error(f'get subjects_for_kws_verbs - unexpected flags: {"|".join(flags)}')
+                if kw.flag & (EXPERTISE | NO_VERBS) or kw.flag == BENEFACTIVE:
                     kw_verbs = []
+                else:
+                    kw_verbs = kw.first_verbs()
                 for verb in kw_verbs:
                     if isinstance(verb[0], int):
                         # if verb[0] in improved_indx or str(vrb[1]) in found_kw:
                         #     sbj_indxs.append('verb-is-keyword')
-                        indx = np.where([verb[0] in x for x in all_found_verbs])[0]
-                        if len(indx):
+                        indx = find_verb_phrase(phrase_index, verb[0])
+                        if indx >= 0:
                             tmp = {'passed': verb,
-                                   'real': preproc_vb_sbj['verbs'][indx[0]]}
+                                   'real': preproc_vb_sbj['verbs'][indx]}
                             verb_info.append(tmp)
-                            subject_info.append(preproc_vb_sbj['subjects'][indx[0]])
+                            subject_info.append(preproc_vb_sbj['subjects'][indx])
                         else:
-                            if flags[0] == 'subject' and verb[1] == '':
+                            if kw.parts[0] == SUBJECT and not kw.flag & WITH_ACTION and verb[1] == '':
                                 tmp = {'passed': verb,
                                        'real': 'no-verbs'}
                                 verb_info.append(tmp)
-                                subject_info.append(kw_dict['improvedKeyword'])
+                                subject_info.append(kw.improved_keyword)
                             else:
                                 verb_info.append(verb)
                                 err = error_verb_not_found_in_preproc(verb[0], preproc_vb_sbj['verbs'])
@@ -488,28 +441,27 @@ def get_subjects_for_kws_verbs(doc: SpacyDoc,
                         err = f"{NO_VERB_INDX}_{verb[0]}_{verb[1]}"
                         subject_info.append(err)
 
-                kw_dict['subjectTokens'] = subject_info
-                kw_dict['realVerbs'] = verb_info
+                kw.subject_tokens = subject_info
+                kw.real_verbs = verb_info
                 verbs_list.append(verb_info)
-            kws_list = [add_sbj_type_update_sbj_tok(kw_dict, doc, preprocessing_info['ne_np'],
-                                                    verbs_list[i], profile_id)
-                        for i, kw_dict in enumerate(kws_list)]
+            subject_types = SentenceSubjectTypes(doc, preprocessing_info['ne_np'])
+            kws_list = [add_sbj_type_update_sbj_tok(kw, doc, subject_types, verbs_list[i], profile_id)
+                        for i, kw in enumerate(kws_list)]
     return kws_list
 
 
 # =======================================================
 # STEP 4 - OUTPUT DATA FORMAT
 # =======================================================
-def decompose_kw_dict_to_data_format_action_flag(kw_dict: DictSL, flag: str,
-                                                 answer: List[DictStr],
-                                                 improved_keyword_add_info: dict,
-                                                 keys_: List[str]) -> List[DictStr]:
+def decompose_kw_to_data_format_action_flag(kw: KeywordAnalysis, role: int,
+                                            improved_keyword_add_info: dict) -> Iterator[DictStr]:
+    flag = ROLE_NAMES[role]
     out_flag = get_short_flag(flag)
-    for i, v1 in enumerate(kw_dict['action']):
-        if len(kw_dict[flag]) != 0:
-            for j, v2 in enumerate(kw_dict[flag]):
-                dict_ = {'foundKeyword': kw_dict['foundKeyword'],
-                         'improvedKeyword': kw_dict['improvedKeyword'],
+    for i, v1 in enumerate(kw.get_verbs(ACTION)):
+        if len(kw.get_verbs(role)) != 0:
+            for j, v2 in enumerate(kw.get_verbs(role)):
+                dict_ = {'foundKeyword': kw.found_keyword,
+                         'improvedKeyword': kw.improved_keyword,
                          'whereFound': flag, 'verb': decomp_verb_by_part(v1, 'verb'),
                          'verbPrep': decomp_verb_by_part(v1, 'prep'),
                          'additionalObject': decomp_verb_by_part(v1, 'addobj'),
@@ -517,287 +469,430 @@ def decompose_kw_dict_to_data_format_action_flag(kw_dict: DictSL, flag: str,
                          f'{out_flag}Verb': decomp_verb_by_part(v2, 'verb'),
                          f'{out_flag}VerbPrep': decomp_verb_by_part(v2, 'prep'),
                          f'{out_flag}AdditionalObject': decomp_verb_by_part(v2, 'addobj'),
-                         'subjectToken': kw_dict['subjectTokens'][i],
-                         'isPassive': str(kw_dict['realVerbs'][i]['is_passive']),
-                         'agentInfo': str(kw_dict['realVerbs'][i]['agent']),
-                         'subjectType': kw_dict['subjectTypes'][i],
+                         'subjectToken': kw.subject_tokens[i],
+                         'isPassive': str(kw.real_verbs[i]['is_passive']),
+                         'agentInfo': str(kw.real_verbs[i]['agent']),
+                         'subjectType': kw.subject_types[i],
                          'improvedKeywordAddInfo': improved_keyword_add_info}
 
-                dict_ = add_flag_object(dict_, kw_dict, out_flag)
-                dict_ = fill_dict(dict_, keys_, '')
-                answer.append(dict_)
+                dict_ = add_flag_object(dict_, kw, out_flag)
+                yield dict_
         else:
-            dict_ = {'foundKeyword': kw_dict['foundKeyword'],
-                     'improvedKeyword': kw_dict['improvedKeyword'],
+            dict_ = {'foundKeyword': kw.found_keyword,
+                     'improvedKeyword': kw.improved_keyword,
                      'whereFound': flag, f'{out_flag}Link': fix_verb_link(v1[-1]),
                      f'{out_flag}Verb': decomp_verb_by_part(v1, 'verb'),
                      f'{out_flag}VerbPrep': decomp_verb_by_part(v1, 'prep'),
                      f'{out_flag}AdditionalObject': decomp_verb_by_part(v1, 'addobj'),
-                     f'{out_flag}Object': kw_dict['improvedKeyword'],
+                     f'{out_flag}Object': kw.improved_keyword,
+                     'improvedKeywordAddInfo': improved_keyword_add_info}
+            yield dict_
+
+
+def get_expertise_cols(kw: KeywordAnalysis, improved_keyword_add_info: dict) -> Iterator[DictStr]:
+    dict_ = {'foundKeyword': kw.found_keyword,
+             'improvedKeyword': kw.improved_keyword,
+             'whereFound': 'expertise in',
+             'improvedKeywordAddInfo': improved_keyword_add_info}
+    yield dict_
+
+
+def get_no_verbs_cols(kw: KeywordAnalysis, improved_keyword_add_info: dict) -> Iterator[DictStr]:
+    if kw.special[0] != '':
+        if kw.special[0] in {'junk', 'subject', 'role'}:
+            dict_ = {'foundKeyword': kw.found_keyword,
+                     'improvedKeyword': kw.improved_keyword,
+                     'whereFound': kw.special[0],
                      'improvedKeywordAddInfo': improved_keyword_add_info}
-            dict_ = fill_dict(dict_, keys_, '')
-            answer.append(dict_)
-    return answer
+            if kw.special[0] == 'role':
+                dict_['role'] = kw.special[2]
+            if kw.special[0] == 'subject':
+                dict_['subjectToken'] = str(kw.improved_keyword)
+                dict_['subjectType'] = 'undefined'
+            yield dict_
+
+        elif kw.special[0] == 'extracted object':
+            if len(kw.special[1]) > 0:
+                for v in kw.special[1]:
+                    dict_ = {'foundKeyword': kw.found_keyword,
+                             'improvedKeyword': kw.improved_keyword,
+                             'whereFound': kw.special[0],
+                             'extractedVerb': str(v).strip(),
+                             'extractedObject': kw.found_keyword,
+                             'extractedLink': str(kw.special[2]).strip(),
+                             'improvedKeywordAddInfo': improved_keyword_add_info}
+                    yield dict_
+            else:
+                dict_ = {'foundKeyword': kw.found_keyword,
+                         'improvedKeyword': kw.improved_keyword,
+                         'whereFound': kw.special[0],
+                         'extractedVerb': '',
+                         'extractedObject': kw.found_keyword,
+                         'improvedKeywordAddInfo': improved_keyword_add_info}
+                yield dict_
+
+        else:  # unexpected fla
+            logger.error(f"get subjects_for_kws_verbs - unexpected flag: {kw.flag_text}")
+            return
+    else:
+        dict_ = {'foundKeyword': kw.found_keyword,
+                 'improvedKeyword': kw.improved_keyword,
+                 'whereFound': 'no-verbs',
+                 'improvedKeywordAddInfo': improved_keyword_add_info}
+        yield dict_
+
+
+def get_subject_cols(kw: KeywordAnalysis, improved_keyword_add_info: dict) -> Iterator[DictStr]:
+    for i, verb in enumerate(kw.get_verbs(SUBJECT)):
+        dict_ = {'foundKeyword': kw.found_keyword,
+                 'improvedKeyword': kw.improved_keyword,
+                 'whereFound': 'subject',
+                 'verb': decomp_verb_by_part(verb, 'verb'),
+                 'verbPrep': decomp_verb_by_part(verb, 'prep'),
+                 'additionalObject': decomp_verb_by_part(verb, 'addobj'),
+                 'subjectToken': kw.subject_tokens[i],  # improvedKeyword
+                 'subjectType': kw.subject_types[i],
+                 'improvedKeywordAddInfo': improved_keyword_add_info}  # keyword-in-subject'}
+        yield dict_
+
+
+def get_action_cols(kw: KeywordAnalysis, improved_keyword_add_info: dict) -> Iterator[DictStr]:
+    flag = ROLE_NAMES[kw.parts[0]]
+    for i, v in enumerate(kw.get_verbs(kw.parts[0])):
+        if str(v[1]) == '':
+            dict_ = {'foundKeyword': kw.found_keyword,
+                     'improvedKeyword': kw.improved_keyword,
+                     'whereFound': flag,
+                     'object': kw.improved_keyword,
+                     'improvedKeywordAddInfo': improved_keyword_add_info}
+            yield dict_
+            continue
+        dict_ = {'foundKeyword': kw.found_keyword,
+                 'improvedKeyword': kw.improved_keyword,
+                 'whereFound': flag,
+                 'verb': decomp_verb_by_part(v, 'verb'),
+                 'verbPrep': decomp_verb_by_part(v, 'prep'),
+                 'additionalObject': decomp_verb_by_part(v, 'addobj'),
+                 'object': kw.improved_keyword,
+                 'subjectToken': kw.subject_tokens[i],
+                 'isPassive': str(kw.real_verbs[i]['is_passive']),
+                 'agentInfo': str(kw.real_verbs[i]['agent']),
+                 'subjectType': kw.subject_types[i],
+                 'improvedKeywordAddInfo': improved_keyword_add_info}
+        yield dict_
+
+
+def get_action_flag_cols(kw: KeywordAnalysis, improved_keyword_add_info: dict) -> Iterator[DictStr]:
+    return decompose_kw_to_data_format_action_flag(kw, kw.parts[0], improved_keyword_add_info)
+
+
+def get_benefactive_cols(kw: KeywordAnalysis, improved_keyword_add_info: dict) -> Iterator[DictStr]:
+    dict_ = {'foundKeyword': kw.found_keyword,
+             'improvedKeyword': kw.improved_keyword,
+             'whereFound': 'benefactive',
+             'benefactiveLink': '?',
+             'benefactive': kw.improved_keyword,
+             'improvedKeywordAddInfo': improved_keyword_add_info}
+    yield dict_
+
+
+def get_flag_cols(kw: KeywordAnalysis, improved_keyword_add_info: dict) -> Iterator[DictStr]:
+    flag = ROLE_NAMES[kw.parts[0]]
+    flag_0 = get_short_flag(flag)
+    for i, v2 in enumerate(kw.get_verbs(kw.parts[0])):
+        dict_ = {'foundKeyword': kw.found_keyword,
+                 'improvedKeyword': kw.improved_keyword,
+                 'whereFound': flag,
+                 f'{flag_0}Link': fix_verb_link(v2[-1]),
+                 f'{flag_0}Verb': decomp_verb_by_part(v2, 'verb'),
+                 f'{flag_0}AdditionalObject': decomp_verb_by_part(v2, 'addobj'),
+                 f'{flag_0}VerbPrep': decomp_verb_by_part(v2, 'prep'),
+                 'subjectToken': kw.subject_tokens[i],
+                 'isPassive': str(kw.real_verbs[i]['is_passive']),
+                 'agentInfo': str(kw.real_verbs[i]['agent']),
+                 'subjectType': kw.subject_types[i],
+                 'improvedKeywordAddInfo': improved_keyword_add_info}
+        dict_ = add_flag_object(dict_, kw, flag_0)
+        yield dict_
 
 
-def get_data_format_cols(kw_dict: DictSL) -> List[DictStr]:
+def get_two_flags_cols(kw: KeywordAnalysis, improved_keyword_add_info: dict) -> Iterator[DictStr]:
     """
-    return list of keyword decomposed to sentence decomposition's data format:
+    The verbs of two roles without action and state verbs, e.g. 'means_result'.
+    """
+    flag_0 = get_short_flag(ROLE_NAMES[kw.parts[0]])
+    flag_1 = get_short_flag(ROLE_NAMES[kw.parts[1]])
+    for i, v2 in enumerate(kw.get_verbs(kw.parts[0])):
+        for j, v3 in enumerate(kw.get_verbs(kw.parts[1])):
+            dict_ = {'foundKeyword': kw.found_keyword,
+                     'improvedKeyword': kw.improved_keyword,
+                     'whereFound': ROLE_NAMES[kw.parts[1]],
+                     f'{flag_0}Link': fix_verb_link(v2[-2]),
+                     f'{flag_0}Verb': decomp_verb_by_part(v2, 'verb'),
+                     f'{flag_0}AdditionalObject': decomp_verb_by_part(v2, 'addobj'),
+                     f'{flag_0}VerbPrep': decomp_verb_by_part(v2, 'prep'),
+                     f'{flag_1}Verb': decomp_verb_by_part(v3, 'verb'),
+                     f'{flag_1}VerbPrep': decomp_verb_by_part(v3, 'prep'),
+                     f'{flag_1}AdditionalObject': decomp_verb_by_part(v3, 'addobj'),
+                     'subjectToken': kw.subject_tokens[i],
+                     'isPassive': str(kw.real_verbs[i]['is_passive']),
+                     'agentInfo': str(kw.real_verbs[i]['agent']),
+                     'subjectType': kw.subject_types[i],
+                     'improvedKeywordAddInfo': improved_keyword_add_info}
+            dict_ = add_flag_object(dict_, kw, flag_1)
+            yield dict_
+
+
+def get_action_two_flags_cols(kw: KeywordAnalysis, improved_keyword_add_info: dict) -> Iterator[DictStr]:
+    """
+    The action or state verbs and the verbs of another role, e.g. 'action_result'.
+    """
+    role_1 = mask_roles(kw.flag & ROLES_MASK & ~(ACTION | STATE))[0]
+    flag_1 = ROLE_NAMES[role_1]
+    flag_11 = get_short_flag(flag_1)
+    for i, v1 in enumerate(kw.get_verbs(kw.parts[0])):
+        for j, v2 in enumerate(kw.get_verbs(role_1)):
+            dict_ = {'foundKeyword': kw.found_keyword,
+                     'improvedKeyword': kw.improved_keyword,
+                     'whereFound': flag_1,
+                     'verb': decomp_verb_by_part(v1, 'verb'),
+                     'verbPrep': decomp_verb_by_part(v1, 'prep'),
+                     'additionalObject': decomp_verb_by_part(v1, 'addobj'),
+                     f'{flag_11}Link': fix_verb_link(v1[-1]),
+                     f'{flag_11}Verb': decomp_verb_by_part(v2, 'verb'),
+                     f'{flag_11}VerbPrep': decomp_verb_by_part(v2, 'prep'),
+                     f'{flag_11}AdditionalObject': decomp_verb_by_part(v2, 'addobj'),
+                     'subjectToken': kw.subject_tokens[i],
+                     'isPassive': str(kw.real_verbs[i]['is_passive']),
+                     'agentInfo': str(kw.real_verbs[i]['agent']),
+                     'subjectType': kw.subject_types[i],
+                     'improvedKeywordAddInfo': improved_keyword_add_info}
+            dict_ = add_flag_object(dict_, kw, flag_11)
+            yield dict_
+
+
+def get_action_three_flags_cols(kw: KeywordAnalysis, improved_keyword_add_info: dict) -> Iterator[DictStr]:
+    """
+    The action verbs found for the first verb and the verbs of two roles, e.g. 'action+means_result'.
+    """
+    flag_2 = ROLE_NAMES[kw.parts[-1]]
+    flag_22 = get_short_flag(flag_2)
+    flag_11 = get_short_flag(ROLE_NAMES[kw.parts[0]])
+    for i, v1 in enumerate(kw.get_verbs(ACTION)):
+        for j, v2 in enumerate(kw.get_verbs(kw.parts[0])):
+            for k, v3 in enumerate(kw.get_verbs(kw.parts[-1])):
+                dict_ = {'foundKeyword': kw.found_keyword,
+                         'improvedKeyword': kw.improved_keyword,
+                         'whereFound': flag_2,
+                         'verb': decomp_verb_by_part(v1, 'verb'),
+                         'verbPrep': decomp_verb_by_part(v1, 'prep'),
+                         'additionalObject': decomp_verb_by_part(v1, 'addobj'),
+                         f'{flag_11}Link': fix_verb_link(v1[-1]),
+                         f'{flag_11}Verb': decomp_verb_by_part(v2, 'verb'),
+                         f'{flag_11}VerbPrep': decomp_verb_by_part(v2, 'prep'),
+                         f'{flag_11}AdditionalObject': decomp_verb_by_part(v2, 'addobj'),
+                         f'{flag_22}Link': decomp_verb_by_part(v2, 'link'),
+                         f'{flag_22}Verb': decomp_verb_by_part(v3, 'verb'),
+                         f'{flag_22}VerbPrep': decomp_verb_by_part(v3, 'prep'),
+                         f'{flag_22}AdditionalObject': decomp_verb_by_part(v3, 'addobj'),
+                         'subjectToken': kw.subject_tokens[i],
+                         'isPassive': str(kw.real_verbs[i]['is_passive']),
+                         'agentInfo': str(kw.real_verbs[i]['agent']),
+                         'subjectType': kw.subject_types[i],
+                         'improvedKeywordAddInfo': improved_keyword_add_info}
+                dict_ = add_flag_object(dict_, kw, flag_22)
+                yield dict_
+
+
+# the keywords with one verb role by their flag
+ONE_FLAG_COLS = {SUBJECT: get_subject_cols,
+                 ACTION: get_action_cols,
+                 STATE: get_action_cols,
+                 BENEFACTIVE: get_benefactive_cols,
+                 RESULT: get_flag_cols,
+                 MEANS: get_flag_cols,
+                 INDIRECT: get_flag_cols,
+                 WITH_ACTION | RESULT: get_action_flag_cols,
+                 WITH_ACTION | MEANS: get_action_flag_cols,
+                 WITH_ACTION | INDIRECT: get_action_flag_cols,
+                 WITH_ACTION | BENEFACTIVE: get_action_flag_cols}
+
+
+def get_data_format_cols(kw: KeywordAnalysis) -> Iterator[DictStr]:
+    """
+    yields the rows of keyword decomposed to sentence decomposition's data format (only the columns set for the keyword,
+    the other columns are empty):
     ['foundKeyword', 'improvedKeyword', 'whereFound', 'verb', 'verbPrep', 'additionalObject', 'object',
      'resultLink', 'resultVerb', 'resultVerbPrep', 'resultAdditionalObject', 'resultObject', 'meansLink',
      'meansVerb', 'meansVerbPrep', 'meansAdditionalObject', 'meansObject', 'indirectLink', 'indirectVerb',
      'indirectVerbPrep', 'indirectAdditionalObject', 'indirectObject', 'extractedLink', 'extractedVerb',
      'extractedObject', 'benefactive', 'benefactiveLink', 'role', 'subjectToken', 'subjectType']
     """
-    answer = []
-    improved_keyword_add_info = {'akw_pos': kw_dict['akw_pos'], 'akw_head_text': kw_dict['akw_head_text']}
-    if kw_dict['FLAG'] == 'expertise':
-        dict_ = {'foundKeyword': kw_dict['foundKeyword'],
-                 'improvedKeyword': kw_dict['improvedKeyword'],
-                 'whereFound': 'expertise in',
-                 'improvedKeywordAddInfo': improved_keyword_add_info}
-        dict_ = fill_dict(dict_, DATA_FORMAT_COLS, '')
-        answer.append(dict_)
-    elif kw_dict['FLAG'] == 'no-verbs':
-        if kw_dict['special'][0] != '':
-            if kw_dict['special'][0] in {'junk', 'subject', 'role'}:
-                dict_ = {'foundKeyword': kw_dict['foundKeyword'],
-                         'improvedKeyword': kw_dict['improvedKeyword'],
-                         'whereFound': kw_dict['special'][0],
-                         'improvedKeywordAddInfo': improved_keyword_add_info}
-                if kw_dict['special'][0] == 'role':
-                    dict_['role'] = kw_dict['special'][2]
-                if kw_dict['special'][0] == 'subject':
-                    dict_['subjectToken'] = str(kw_dict['improvedKeyword'])
-                    dict_['subjectType'] = 'undefined'
-                dict_ = fill_dict(dict_, DATA_FORMAT_COLS, '')
-                answer.append(dict_)
-
-            elif kw_dict['special'][0] == 'extracted object':
-                if len(kw_dict['special'][1]) > 0:
-                    for v in kw_dict['special'][1]:
-                        dict_ = {'foundKeyword': kw_dict['foundKeyword'],
-                                 'improvedKeyword': kw_dict['improvedKeyword'],
-                                 'whereFound': kw_dict['special'][0],
-                                 'extractedVerb': str(v).strip(),
-                                 'extractedObject': kw_dict['foundKeyword'],
-                                 'extractedLink': str(kw_dict['special'][2]).strip(),
-                                 'improvedKeywordAddInfo': improved_keyword_add_info}
-                        dict_ = fill_dict(dict_, DATA_FORMAT_COLS, '')
-                        answer.append(dict_)
-                else:
-                    dict_ = {'foundKeyword': kw_dict['foundKeyword'],
-                             'improvedKeyword': kw_dict['improvedKeyword'],
-                             'whereFound': kw_dict['special'][0],
-                             'extractedVerb': '',
-                             'extractedObject': kw_dict['foundKeyword'],
-                             'improvedKeywordAddInfo': improved_keyword_add_info}
-                    dict_ = fill_dict(dict_, DATA_FORMAT_COLS, '')
-                    answer.append(dict_)
-
-            else:  # unexpected fla
-                logger.error(f"get subjects_for_kws_verbs - unexpected flag: {kw_dict['FLAG']}")
-                return []
-        else:
-            dict_ = {'foundKeyword': kw_dict['foundKeyword'],
-                     'improvedKeyword': kw_dict['improvedKeyword'],
-                     'whereFound': 'no-verbs',
-                     'improvedKeywordAddInfo': improved_keyword_add_info}
-            dict_ = fill_dict(dict_, DATA_FORMAT_COLS, '')
-            answer.append(dict_)
+    improved_keyword_add_info = {'akw_pos': kw.akw_pos, 'akw_head_text': kw.akw_head_text}
+    if kw.flag & EXPERTISE:
+        get_cols = get_expertise_cols
+    elif kw.flag & NO_VERBS:
+        get_cols = get_no_verbs_cols
+    # (verb id, verb, prep, last_verb_object, link)
+    elif len(kw.parts) == 1:
+        get_cols = ONE_FLAG_COLS.get(kw.flag)
+    elif kw.flag & WITH_ACTION:
+        get_cols = get_action_three_flags_cols
+    elif kw.flag & (ACTION | STATE):
+        get_cols = get_action_two_flags_cols
+    elif kw.parts:
+        get_cols = get_two_flags_cols
     else:
-        # (verb id, verb, prep, last_verb_object, link)
-        flags = kw_dict['FLAG'].split('_')
-        flags_set = set(flags)
-        if len(flags_set) == 1:
-            if flags[0] == 'subject':
-                for i, verb in enumerate(kw_dict['subject']):
-                    dict_ = {'foundKeyword': kw_dict['foundKeyword'],
-                             'improvedKeyword': kw_dict['improvedKeyword'],
-                             'whereFound': flags[0],
-                             'verb': decomp_verb_by_part(verb, 'verb'),
-                             'verbPrep': decomp_verb_by_part(verb, 'prep'),
-                             'additionalObject': decomp_verb_by_part(verb, 'addobj'),
-                             'subjectToken': kw_dict['subjectTokens'][i],  # improvedKeyword
-                             'subjectType': kw_dict['subjectTypes'][i],
-                             'improvedKeywordAddInfo': improved_keyword_add_info}  # keyword-in-subject'}
-                    dict_ = fill_dict(dict_, DATA_FORMAT_COLS, '')
-                    answer.append(dict_)
-            elif flags[0] in {'action', 'state'}:
-                for i, v in enumerate(kw_dict[flags[0]]):
-                    if str(v[1]) == '':
-                        dict_ = {'foundKeyword': kw_dict['foundKeyword'],
-                                 'improvedKeyword': kw_dict['improvedKeyword'],
-                                 'whereFound': flags[0],
-                                 'object': kw_dict['improvedKeyword'],
-                                 'improvedKeywordAddInfo': improved_keyword_add_info}
-                        dict_ = fill_dict(dict_, DATA_FORMAT_COLS, '')
-                        answer.append(dict_)
-                        continue
-                    dict_ = {'foundKeyword': kw_dict['foundKeyword'],
-                             'improvedKeyword': kw_dict['improvedKeyword'],
-                             'whereFound': flags[0],
-                             'verb': decomp_verb_by_part(v, 'verb'),
-                             'verbPrep': decomp_verb_by_part(v, 'prep'),
-                             'additionalObject': decomp_verb_by_part(v, 'addobj'),
-                             'object': kw_dict['improvedKeyword'],
-                             'subjectToken': kw_dict['subjectTokens'][i],
-                             'isPassive': str(kw_dict['realVerbs'][i]['is_passive']),
-                             'agentInfo': str(kw_dict['realVerbs'][i]['agent']),
-                             'subjectType': kw_dict['subjectTypes'][i],
-                             'improvedKeywordAddInfo': improved_keyword_add_info}
-                    dict_ = fill_dict(dict_, DATA_FORMAT_COLS, '')
-                    answer.append(dict_)
-            elif '+' in flags[0]:
-                answer = decompose_kw_dict_to_data_format_action_flag(kw_dict, flags[0].split('+')[1],
-                                                                      answer, improved_keyword_add_info,
-                                                                      DATA_FORMAT_COLS)
-            elif flags[0] == 'benefactive':
-                dict_ = {'foundKeyword': kw_dict['foundKeyword'],
-                         'improvedKeyword': kw_dict['improvedKeyword'],
-                         'whereFound': 'benefactive',
-                         'benefactiveLink': '?',
-                         'benefactive': kw_dict['improvedKeyword'],
-                         'improvedKeywordAddInfo': improved_keyword_add_info}
-                dict_ = fill_dict(dict_, DATA_FORMAT_COLS, '')
-                answer.append(dict_)
-            elif flags[0] in {'result', 'means', 'indirect engagement'}:
-                flag_0 = get_short_flag(flags[0])
-                for i, v2 in enumerate(kw_dict[flags[0]]):
-                    dict_ = {'foundKeyword': kw_dict['foundKeyword'],
-                             'improvedKeyword': kw_dict['improvedKeyword'],
-                             'whereFound': flags[0],
-                             f'{flag_0}Link': fix_verb_link(v2[-1]),
-                             f'{flag_0}Verb': decomp_verb_by_part(v2, 'verb'),
-                             f'{flag_0}AdditionalObject': decomp_verb_by_part(v2, 'addobj'),
-                             f'{flag_0}VerbPrep': decomp_verb_by_part(v2, 'prep'),
-                             'subjectToken': kw_dict['subjectTokens'][i],
-                             'isPassive': str(kw_dict['realVerbs'][i]['is_passive']),
-                             'agentInfo': str(kw_dict['realVerbs'][i]['agent']),
-                             'subjectType': kw_dict['subjectTypes'][i],
-                             'improvedKeywordAddInfo': improved_keyword_add_info}
-                    dict_ = add_flag_object(dict_, kw_dict, flag_0)
-                    dict_ = fill_dict(dict_, DATA_FORMAT_COLS, '')
-                    answer.append(dict_)
-            else:  # unexpected flag
-                logger.error(f"get subjects_for_kws_verbs - unexpected flag: {kw_dict['FLAG']}")
-                return []
-
-        elif len(flags_set) in [2, 3]:
-            if 'action' not in flags_set and '+' not in flags[0] and 'state' not in flags_set:
-                flag_0 = get_short_flag(flags[0])
-                flag_1 = get_short_flag(flags[1])
-                for i, v2 in enumerate(kw_dict[flags[0]]):
-                    for j, v3 in enumerate(kw_dict[flags[1]]):
-                        dict_ = {'foundKeyword': kw_dict['foundKeyword'],
-                                 'improvedKeyword': kw_dict['improvedKeyword'],
-                                 'whereFound': flags[1],
-                                 f'{flag_0}Link': fix_verb_link(v2[-2]),
-                                 f'{flag_0}Verb': decomp_verb_by_part(v2, 'verb'),
-                                 f'{flag_0}AdditionalObject': decomp_verb_by_part(v2, 'addobj'),
-                                 f'{flag_0}VerbPrep': decomp_verb_by_part(v2, 'prep'),
-                                 f'{flag_1}Verb': decomp_verb_by_part(v3, 'verb'),
-                                 f'{flag_1}VerbPrep': decomp_verb_by_part(v3, 'prep'),
-                                 f'{flag_1}AdditionalObject': decomp_verb_by_part(v3, 'addobj'),
-                                 'subjectToken': kw_dict['subjectTokens'][i],
-                                 'isPassive': str(kw_dict['realVerbs'][i]['is_passive']),
-                                 'agentInfo': str(kw_dict['realVerbs'][i]['agent']),
-                                 'subjectType': kw_dict['subjectTypes'][i],
-                                 'improvedKeywordAddInfo': improved_keyword_add_info}
-                        dict_ = add_flag_object(dict_, kw_dict, flag_1)
-                        dict_ = fill_dict(dict_, DATA_FORMAT_COLS, '')
-                        answer.append(dict_)
-            else:
-                if len(flags_set) == 2 and '+' not in flags[0]:
-                    flag_1 = list(set(flags_set) - {'action', 'state'})[0]
-                    flag_11 = get_short_flag(flag_1)
-                    for i, v1 in enumerate(kw_dict[flags[0]]):
-                        for j, v2 in enumerate(kw_dict[flag_1]):
-                            dict_ = {'foundKeyword': kw_dict['foundKeyword'],
-                                     'improvedKeyword': kw_dict['improvedKeyword'],
-                                     'whereFound': flag_1,
-                                     'verb': decomp_verb_by_part(v1, 'verb'),
-                                     'verbPrep': decomp_verb_by_part(v1, 'prep'),
-                                     'additionalObject': decomp_verb_by_part(v1, 'addobj'),
-                                     f'{flag_11}Link': fix_verb_link(v1[-1]),
-                                     f'{flag_11}Verb': decomp_verb_by_part(v2, 'verb'),
-                                     f'{flag_11}VerbPrep': decomp_verb_by_part(v2, 'prep'),
-                                     f'{flag_11}AdditionalObject': decomp_verb_by_part(v2, 'addobj'),
-                                     'subjectToken': kw_dict['subjectTokens'][i],
-                                     'isPassive': str(kw_dict['realVerbs'][i]['is_passive']),
-                                     'agentInfo': str(kw_dict['realVerbs'][i]['agent']),
-                                     'subjectType': kw_dict['subjectTypes'][i],
-                                     'improvedKeywordAddInfo': improved_keyword_add_info}
-                            dict_ = add_flag_object(dict_, kw_dict, flag_11)
-                            dict_ = fill_dict(dict_, DATA_FORMAT_COLS, '')
-                            answer.append(dict_)
-                elif len(flags_set) == 3 or '+' in flags[0]:
-                    flag_2 = flags[-1]
-                    flag_22 = get_short_flag(flag_2)
-                    if '+' in flags[0]:
-                        flag_1 = flags[0].split('+')[1]
-                        flag_11 = get_short_flag(flag_1)
-                    else:
-                        flag_1 = list(flags_set - {'action', flag_2})[0]
-                        flag_11 = get_short_flag(flag_1)
-                    for i, v1 in enumerate(kw_dict['action']):
-                        for j, v2 in enumerate(kw_dict[flag_1]):
-                            for k, v3 in enumerate(kw_dict[flag_2]):
-                                dict_ = {'foundKeyword': kw_dict['foundKeyword'],
-                                         'improvedKeyword': kw_dict['improvedKeyword'],
-                                         'whereFound': flag_2,
-                                         'verb': decomp_verb_by_part(v1, 'verb'),
-                                         'verbPrep': decomp_verb_by_part(v1, 'prep'),
-                                         'additionalObject': decomp_verb_by_part(v1, 'addobj'),
-                                         f'{flag_11}Link': fix_verb_link(v1[-1]),
-                                         f'{flag_11}Verb': decomp_verb_by_part(v2, 'verb'),
-                                         f'{flag_11}VerbPrep': decomp_verb_by_part(v2, 'prep'),
-                                         f'{flag_11}AdditionalObject': decomp_verb_by_part(v2, 'addobj'),
-                                         f'{flag_22}Link': decomp_verb_by_part(v2, 'link'),
-                                         f'{flag_22}Verb': decomp_verb_by_part(v3, 'verb'),
-                                         f'{flag_22}VerbPrep': decomp_verb_by_part(v3, 'prep'),
-                                         f'{flag_22}AdditionalObject': decomp_verb_by_part(v3, 'addobj'),
-                                         'subjectToken': kw_dict['subjectTokens'][i],
-                                         'isPassive': str(kw_dict['realVerbs'][i]['is_passive']),
-                                         'agentInfo': str(kw_dict['realVerbs'][i]['agent']),
-                                         'subjectType': kw_dict['subjectTypes'][i],
-                                         'improvedKeywordAddInfo': improved_keyword_add_info}
-                                dict_ = add_flag_object(dict_, kw_dict, flag_22)
-                                dict_ = fill_dict(dict_, DATA_FORMAT_COLS, '')
-                                answer.append(dict_)
-                else:  # unexpected flag
-                    logger.error(f"get subjects_for_kws_verbs - unexpected flags: {kw_dict['FLAG']}")
-                    return []
-        else:
-            logger.error(f"get subjects_for_kws_verbs- - unexpected flags len: {kw_dict['FLAG']}")
-            return []
-    return answer
+        get_cols = None
+    if get_cols is None:  # unexpected flag
+        logger.error(f"get subjects_for_kws_verbs - unexpected flags: {kw.flag_text}")
+        return
+    yield from get_cols(kw, improved_keyword_add_info)
+
+
+def row_key(row: DictStr) -> tuple | str:
+    key = tuple((col, tuple(value.items()) if type(value) is dict else value) for col, value in row.items())
+    try:
+        hash(key)
+    except TypeError:  # e.g. the lists of the request in improvedKeywordAddInfo
+        return json.dumps(row, sort_keys=True, default=str)
+    return key
+
+
+def get_keyword_rows(kw: KeywordAnalysis, seen: set) -> Iterator[DictStr]:
+    """
+    Yields the compact output rows of the keyword, at most MAX_ROWS_PER_KEYWORD of them (if it is set). The rows
+    are expanded lazily, so the role combinations beyond the limit aren't built. If DEDUP_ROWS is set, the rows
+    equal to the ones already in seen (the keys of the rows of the sentence) are skipped.
+    """
+    count = 0
+    for row in get_data_format_cols(kw):
+        row = compact_row(row)
+        if DEDUP_ROWS:
+            key = row_key(row)
+            if key in seen:
+                continue
+            seen.add(key)
+        if count == MAX_ROWS_PER_KEYWORD > 0:
+            logger.info(f"get_keyword_rows - more than {MAX_ROWS_PER_KEYWORD} rows for keyword "
+                        f"'{kw.found_keyword}' ({kw.flag_text}), the rest are dropped")
+            return
+        count += 1
+        yield row
 
 
 # =======================================================
 # MAIN FUNCTION + ADDITIONAL
 # =======================================================
-def add_static_columns(d: Dict[str, str | int], profile: str, person_name: str, company_name: str, sentence: str,
-                       section: str, order: int, ref_id: str, ref_type: str, sentence_id: str) -> SentenceDecompositionDoc:
-    d['profile'] = profile
-    d['personName'] = person_name
-    d['companyName'] = company_name
-    d['sentence'] = sentence
-    d['section'] = section
-    d['order'] = order
-    d['refId'] = ref_id
-    d['refType'] = ref_type
-    d['sentenceId'] = sentence_id
-    return SentenceDecompositionDoc(**d)
-
-
-def add_expertise(sentence_doc: SpacyDoc, skw_akw: dict) -> dict:
+def add_expertise(ctx: SentenceContext, skw_akw: dict) -> dict:
+    sentence_doc = ctx.doc
     akw_span = sentence_doc[skw_akw['akw_indices'][0]:skw_akw['akw_indices'][2] + 1]
     skw_text = skw_akw['skw_text']
-    skw_akw['expertise'] = ExpCheck.checkExpertise(sentence_doc, akw_span, skw_text)
+    sentence_expertise = ctx.memo('expertise', None, lambda: ExpCheck.analyzeSentence(sentence_doc))
+    skw_akw['expertise'] = ExpCheck.checkExpertise(sentence_doc, akw_span, skw_text, sentence_expertise)
     return skw_akw
 
 
+def span_key(skw_akw: dict) -> tuple | str:
+    """
+    The entries with equal keys differ only by the found keyword, so their verbs and subjects are the same.
+    """
+    key = (tuple(skw_akw['akw_indices']), skw_akw['akw_text'], skw_akw['akw_pos'], skw_akw['akw_head_text'],
+           skw_akw['expertise'])
+    try:
+        hash(key)
+    except TypeError:  # the values of the request that aren't strings, e.g. lists in akw_pos
+        return json.dumps(key, default=str)
+    return key
+
+
+def fan_out_kws(skw_akw_list: List[dict], span_kws: Dict[tuple | str, KeywordAnalysis]) -> List[KeywordAnalysis]:
+    """
+    Returns the analyses of all the entries in their order: the analysis of the entry's span with the entry's found
+    keyword. The entries starting from the first one whose span wasn't analyzed (get_verbs_for_kws failed on it)
+    are dropped.
+    """
+    kws_list = []
+    for skw_akw in skw_akw_list:
+        kw = span_kws.get(span_key(skw_akw))
+        if kw is None:
+            break
+        kws_list.append(kw.with_found_keyword(skw_akw['skw_text']))
+    return kws_list
+
+
+def doc_digest(sentence_doc: SpacyDoc | str | bytes | bytearray | memoryview) -> str:
+    """
+    Returns the hash of the serialized Doc: of the bytes of the base64 string or of the binary Doc as they came in,
+    of its text and token attributes for a decoded Doc (Doc.to_bytes() isn't the same in different processes, it
+    writes the strings of the Doc from a set).
+    """
+    if isinstance(sentence_doc, SpacyDoc):
+        sha = hashlib.sha256(sentence_doc.text.encode())
+        sha.update(sentence_doc.to_array(DOC_DIGEST_ATTRS).tobytes())
+        return sha.hexdigest()
+    if isinstance(sentence_doc, str):
+        data = base64.b64decode(sentence_doc)
+    else:
+        data = sentence_doc
+    return hashlib.sha256(data).hexdigest()
+
+
+def analyze_sentence_rows(sentence_doc: SpacyDoc | str | bytes | bytearray | memoryview,
+                          skw_akw_list: List[dict],
+                          sentence: str,
+                          profile: str,
+                          profile_type: str,
+                          profile_id: str,
+                          sentence_id: str,
+                          person_name: str,
+                          company_name: str,
+                          section: str,
+                          order: int,
+                          preprocessing_info: dict,
+                          decode: Callable[[str | bytes | bytearray | memoryview], SpacyDoc] | None = None
+                          ) -> SentenceRows:
+    """
+    The sentence Doc may be passed serialized together with its decode function; it is decoded only if the rows
+    aren't found in the result store.
+    """
+    store_key = None
+    rows = None
+    if result_store is not None:
+        store_key = result_store.make_key(doc_digest(sentence_doc), skw_akw_list, preprocessing_info, profile_id,
+                                          MAX_ROWS_PER_KEYWORD, DEDUP_ROWS)
+        rows = result_store.get(store_key)
+    if rows is None:
+        if not isinstance(sentence_doc, SpacyDoc):
+            sentence_doc = decode(sentence_doc)
+        ctx = SentenceContext(sentence_doc)
+        try:
+            # 1 - expertise
+            skw_akw_list = [add_expertise(ctx, skw_akw) for skw_akw in skw_akw_list]
+            # the entries of the same span are analyzed once
+            span_entries = {}
+            for skw_akw in skw_akw_list:
+                span_entries.setdefault(span_key(skw_akw), skw_akw)
+            # 2 - verbs
+            kws_list = get_verbs_for_kws(ctx, list(span_entries.values()))
+            # 3 - subjects
+            kws_list = get_subjects_for_kws_verbs(sentence_doc, kws_list, preprocessing_info, profile_id)
+            kws_list = fan_out_kws(skw_akw_list, dict(zip(span_entries, kws_list)))
+            # 4 - output data format
+            seen = set()
+            rows = [row for kw in kws_list for row in get_keyword_rows(kw, seen)]
+        finally:
+            # the features are not serializable and reference the Doc, they don't outlive the analysis
+            TokenFeatures.release(sentence_doc)
+        if store_key is not None:
+            result_store.put(store_key, rows)
+    header = dict(zip(STATIC_COLS, (profile, person_name, company_name, sentence, section, order,
+                                    profile_id, profile_type, sentence_id)))
+
+    logger.debug(f' 4 - output data format: {sentence}')
+    return SentenceRows(header, rows)
+
+
 def analyze_sentence(sentence_doc: SpacyDoc,
                      skw_akw_list: List[dict],
                      sentence: str,
@@ -810,31 +905,28 @@ def analyze_sentence(sentence_doc: SpacyDoc,
                      section: str,
                      order: int,
                      preprocessing_info: dict) -> List[SentenceDecompositionDoc]:
-    # 1 - expertise
-    skw_akw_list = [add_expertise(sentence_doc, skw_akw) for skw_akw in skw_akw_list]
-    # 2 - verbs
-    kws_dict_list = get_verbs_for_kws(sentence_doc, skw_akw_list)
-    # 3 - subjects
-    kws_dict_list = get_subjects_for_kws_verbs(sentence_doc, kws_dict_list, preprocessing_info, profile_id)
-    # 4 - output data format
-    out_list = [add_static_columns(d, profile, person_name, company_name, sentence, section, order,
-                                   profile_id, profile_type, sentence_id)
-                for dict_ in kws_dict_list if dict_ for d in get_data_format_cols(dict_)]
-
-    logger.debug(f' 4 - output data format: {sentence}')
-    return out_list
+    return analyze_sentence_rows(sentence_doc, skw_akw_list, sentence, profile, profile_type, profile_id,
+                                 sentence_id, person_name, company_name, section, order,
+                                 preprocessing_info).to_docs()
+
+
+def analyze_sentence_dict_rows(sentence_dict: Dict[str, SpacyDoc | str | int | list | dict],
+                               decode: Callable[[str | bytes | bytearray | memoryview], SpacyDoc] | None = None
+                               ) -> SentenceRows:
+    return analyze_sentence_rows(sentence_dict['sentenceDoc'],
+                                 sentence_dict['skwAkw'],
+                                 sentence_dict['text'],
+                                 sentence_dict['profileUrl'],
+                                 sentence_dict['refType'],
+                                 sentence_dict['refId'],
+                                 sentence_dict['sentenceId'],
+                                 sentence_dict['personName'],
+                                 sentence_dict['companyName'],
+                                 sentence_dict['section'],
+                                 sentence_dict['order'],
+                                 sentence_dict['preprocessingInfo'],
+                                 decode)
 
 
 def analyze_sentence_dict(sentence_dict: Dict[str, SpacyDoc | str | int | list | dict]) -> List[SentenceDecompositionDoc]:
-    return analyze_sentence(sentence_dict['sentenceDoc'],
-                            sentence_dict['skwAkw'],
-                            sentence_dict['text'],
-                            sentence_dict['profileUrl'],
-                            sentence_dict['refType'],
-                            sentence_dict['refId'],
-                            sentence_dict['sentenceId'],
-                            sentence_dict['personName'],
-                            sentence_dict['companyName'],
-                            sentence_dict['section'],
-                            sentence_dict['order'],
-                            sentence_dict['preprocessingInfo'])
+    return analyze_sentence_dict_rows(sentence_dict).to_docs()
@@ -1,5 +1,9 @@
+from typing import Dict, List, Tuple
+
 import spacy
 
+from TokenFeatures import TokenFeatures
+
 PREDEFINED_SBJ = {'SOMEONE': {'community'},
                   'COMPANY': {'company', 'companies', 'inc', 'llc', 'services', 'platform', 'employees', 'agency',
                               'organization', 'organizations', 'organisation', 'organisations', 'firm', 'firms', 'us',
@@ -15,10 +19,9 @@ PREDEFINED_SBJ = {'SOMEONE': {'community'},
 # --------------
 def get_token_phrase(token_indx: int,
                      doc: spacy.tokens.doc.Doc) -> spacy.tokens.span.Span:
-    token = doc[token_indx]
-    subtree = list(token.subtree)
-    start = subtree[0].i
-    end = subtree[-1].i + 1
+    subtree = TokenFeatures.of(doc).subtree(token_indx)
+    start = subtree[0]
+    end = subtree[-1] + 1
     return doc[start:end]
 
 
@@ -28,14 +31,13 @@ def has_atrr(doc: spacy.tokens.doc.Doc,
     check if verb token has attr dependency and return it, return empty list otherwise.
     """
     t = []  # empty list
-    tok_dep = [t.dep_ for t in verb_token.children]
-    if "attr" in tok_dep:
+    if TokenFeatures.of(doc).has_child(verb_token.i, dep='attr'):
         t = get_token_by_dependency(doc, "attr")
     return t
 
 
 def get_token_by_dependency(doc: spacy.tokens.doc.Doc, dependency: str) -> list:
-    tokens = [tok for tok in doc if tok.dep_ == dependency]
+    tokens = [doc[i] for i in TokenFeatures.of(doc).positions(dep=dependency)]
     return tokens
 
 
@@ -65,9 +67,23 @@ def decompose_entity_type(ent_type: str) -> str:
         return tmp[0]
 
 
+def index_nenp(NENP_dict: dict) -> Dict[int, List[Tuple[str, str | None]]]:
+    """
+    Returns the (phrase, entity type or None) pairs of the noun phrases and entities grouped by their root_index,
+    in the order of NENP_dict.
+    """
+    nenp_index = {}
+    for flag, values in NENP_dict.items():
+        for phrase in values:
+            nenp_index.setdefault(phrase['root_index'], []).append(
+                (phrase['phrase'], phrase['ent_type'] if phrase['ent_type'] != '' else None))
+    return nenp_index
+
+
 def get_full_subject_name_list(sbj_indx: int,
                                NENP_dict: dict,
-                               doc: spacy.tokens.doc.Doc, ) -> list:
+                               doc: spacy.tokens.doc.Doc,
+                               nenp_index: Dict[int, List[Tuple[str, str | None]]] = None) -> list:
     """
     This function takes subj sbj_indx, npne dict,
         and sent doc and returns the subject fullName or the single word subject.
@@ -78,20 +94,14 @@ def get_full_subject_name_list(sbj_indx: int,
                     and the value is a tuple that contains the noun phrases string and another tuple
                     that contains the start and end positions of NP string in the sentence.
         doc : nlp spcay sentence doc
+        nenp_index: NENP_dict indexed by index_nenp; built from NENP_dict if not given
     Returns:
     ----------
         sbj_full_name: A list of tuples where each tuple contains (subject type, entity type)
     """
-    sbj_full_name = []
-    entity_type = None
-
-    for flag, values in NENP_dict.items():
-        for phrase in values:
-            if phrase['root_index'] == sbj_indx:  # to prove
-                if phrase['ent_type'] != '':
-                    sbj_full_name.append((phrase['phrase'], phrase['ent_type']))
-                else:
-                    sbj_full_name.append((phrase['phrase'], None))
+    if nenp_index is None:
+        nenp_index = index_nenp(NENP_dict)
+    sbj_full_name = list(nenp_index.get(sbj_indx, ()))
 
     if len(sbj_full_name) == 0:
         sbj_full_name.append((doc[sbj_indx].text, None))
@@ -121,81 +131,121 @@ def predefined_sbj_process(predefined_subj: dict,
     return subject_field
 
 
-def process_sbj_type(sbj_indx: int,  # or None
-                     predefined_subj: dict,
-                     doc: spacy.tokens.doc.Doc,
-                     NENP_dict: dict,
-                     verb_indx: int) -> list:
-
-    subject_type = "Undefined"
+def get_name_type(predefined_subj: dict,
+                  subject_name: str,
+                  doc: spacy.tokens.doc.Doc,
+                  sbj_indx: int) -> str | None:
+    """
+    Returns the type of the subject that is not an entity by its name and its root token, or None if the type
+    is defined by the related verb (see verb_procedure).
+    """
+    # search subject (full, single) in the company list only
+    subject_field = predefined_sbj_process(predefined_subj, subject_name, ['COMPANY', 'TEAM', 'SOMEONE'])
+    if subject_field is not None:
+        return subject_field
 
-    if sbj_indx is None:
-        return [subject_type]
+    # here if single and/or multi-word subject not found
+    if len(subject_name.split()) > 1:  # subject is simple np
 
-    subject_details_list = []
-    subject_name_list = get_full_subject_name_list(sbj_indx, NENP_dict, doc)
+        # we will search the single noun root here
+        subj_root = doc[sbj_indx]
+        subject_field = predefined_sbj_process(predefined_subj, subj_root.text, ['COMPANY', 'TEAM', 'SOMEONE'])
+        pron_part = subject_name.split()[0].lower()
 
-    # loop through the subject names list
+        if subject_field is not None and pron_part not in ['my', 'her', 'his']:
+            # not our team not my team
+            return subject_field
 
-    for subject_name, entity_type in subject_name_list:
+        elif pron_part in ['my', 'her', 'his']:
+            return 'PERSON'
 
-        if entity_type is not None:
-            subject_type = entity_type
-        else:
-            # NOT ENTITY
-            # search subject (full, single) in the company list only
-            subject_field = predefined_sbj_process(predefined_subj, subject_name, ['COMPANY', 'TEAM', 'SOMEONE'])
-            if subject_field is not None:
-                subject_type = subject_field
+        elif pron_part in ['our']:
+            return 'COMPANY'  # or may be company
 
-            else:
-                # here if single and/or multi-word subject not found
-                if len(subject_name.split()) > 1:  # subject is simple np
+        elif pron_part in ['their', 'its']:
+            return 'SOMEONE'  # or may be company
 
-                    # we will search the single noun root here
-                    subj_root = doc[sbj_indx]
-                    subject_field = predefined_sbj_process(predefined_subj, subj_root.text,
-                                                           ['COMPANY', 'TEAM', 'SOMEONE'])
-                    pron_part = subject_name.split()[0].lower()
+        return None
 
-                    if subject_field is not None and pron_part not in ['my', 'her', 'his']:
-                        # not our team not my team
-                        subject_type = subject_field
+    # subject is a single word
+    subj_pos = doc[sbj_indx].pos_  # maybe noun or pronoun
+    if subj_pos == "PRON":
+        if subject_name.lower() == 'we':
+            return 'COMPANY'
+        subject_field = predefined_sbj_process(predefined_subj, subject_name.lower(), ['CompanyPronoun', 'PERSON'])
+        if subject_field == 'PERSON':
+            return 'PERSON'
+        # subject_field = None or not we. check the related noun
+        return None
 
-                    elif pron_part in ['my', 'her', 'his']:
-                        subject_type = 'PERSON'
+    # single noun was checked in pred-list so here only check if it has attr in pred-list
+    return None
 
-                    elif pron_part in ['our']:
-                        subject_type = 'COMPANY'  # or may be company
 
-                    elif pron_part in ['their', 'its']:
-                        subject_type = 'SOMEONE'  # or may be company
+class SentenceSubjectTypes:
+    """
+    Determines the subject types for one sentence. The noun phrases and entities are indexed by root_index on the
+    first query, the types of the subject names (by name and root token) and the types derived from the verbs
+    (verb_procedure) are memoized, so that the subjects shared by the keywords of the sentence are
+    typed once.
+    """
 
-                    elif subject_field is None and pron_part not in {'our', 'their', 'its', 'my', 'her', 'his'}:
-                        subject_type = verb_procedure(doc, verb_indx, predefined_subj)
+    def __init__(self, doc: spacy.tokens.doc.Doc,
+                 NENP_dict: dict,
+                 predefined_subj: dict = PREDEFINED_SBJ):
+        self.doc = doc
+        self.NENP_dict = NENP_dict
+        self.predefined_subj = predefined_subj
+        self._nenp_index = None
+        self._name_types: Dict[Tuple, str | None] = {}
+        self._verb_types: Dict[int, str] = {}
+
+    def get_verb_type(self, verb_indx: int) -> str:
+        if verb_indx not in self._verb_types:
+            self._verb_types[verb_indx] = verb_procedure(self.doc, verb_indx, self.predefined_subj)
+        return self._verb_types[verb_indx]
+
+    def get_name_type(self, subject_name: str, sbj_indx: int) -> str | None:
+        key = (subject_name, sbj_indx)
+        if key not in self._name_types:
+            self._name_types[key] = get_name_type(self.predefined_subj, subject_name, self.doc, sbj_indx)
+        return self._name_types[key]
+
+    def process(self, sbj_indx: int,  # or None
+                verb_indx: int) -> list:
+        subject_type = "Undefined"
+
+        if sbj_indx is None:
+            return [subject_type]
+
+        if self._nenp_index is None:
+            self._nenp_index = index_nenp(self.NENP_dict)
+        subject_details_list = []
+        subject_name_list = get_full_subject_name_list(sbj_indx, self.NENP_dict, self.doc, self._nenp_index)
+
+        # loop through the subject names list
+
+        for subject_name, entity_type in subject_name_list:
+
+            if entity_type is not None:
+                subject_type = entity_type
+            else:
+                # NOT ENTITY
+                subject_type = self.get_name_type(subject_name, sbj_indx)
+                if subject_type is None:
+                    subject_type = self.get_verb_type(verb_indx)
 
-                else:
-                    # subject is a single word
-                    subj_pos = doc[sbj_indx].pos_  # maybe noun or pronoun
-                    if subj_pos == "PRON":
-                        if subject_name.lower() == 'we':
-                            subject_type = 'COMPANY'
-                        else:
-                            subject_field = predefined_sbj_process(predefined_subj, subject_name.lower(),
-                                                                   ['CompanyPronoun', 'PERSON'])
-                            if subject_field == 'PERSON':
-                                subject_type = 'PERSON'
-                            else:
-                                # subject_field = None or not we. check the related noun
-                                subject_type = verb_procedure(doc, verb_indx, predefined_subj)
+            subject_details_list.append(subject_type)
 
-                    else:
-                        # single noun was checked in pred-list so here only check if it has attr in pred-list
-                        subject_type = verb_procedure(doc, verb_indx, predefined_subj)
+        return subject_details_list
 
-        subject_details_list.append(subject_type)
 
-    return subject_details_list
+def process_sbj_type(sbj_indx: int,  # or None
+                     predefined_subj: dict,
+                     doc: spacy.tokens.doc.Doc,
+                     NENP_dict: dict,
+                     verb_indx: int) -> list:
+    return SentenceSubjectTypes(doc, NENP_dict, predefined_subj).process(sbj_indx, verb_indx)
 
 
 class SubjectTypeDeterminer:
@@ -206,6 +256,9 @@ class SubjectTypeDeterminer:
     def get_subject_type(subject_indx: int,  # or None
                          doc: spacy.tokens.doc.Doc,
                          NENP_dict: dict,
-                         verb_indx: int) -> str:
-        sbj_type = process_sbj_type(subject_indx, PREDEFINED_SBJ, doc, NENP_dict, verb_indx)
+                         verb_indx: int,
+                         subject_types: SentenceSubjectTypes = None) -> str:
+        if subject_types is None:
+            subject_types = SentenceSubjectTypes(doc, NENP_dict)
+        sbj_type = subject_types.process(subject_indx, verb_indx)
         return sbj_type[0]  # decompose_entity_type(sbj_type[0])
@@ -0,0 +1,172 @@
+import re
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import spacy
+from spacy.attrs import DEP, HEAD, LEMMA, ORTH, POS, TAG
+
+ED = re.compile(r'ed\b')
+ING = re.compile(r'ing\b')
+
+
+class TokenFeatures:
+    """
+    The feature matrix of the sentence Doc: the ORTH/LEMMA/POS/TAG/DEP ids and the head index of every token, the
+    left and right edges of the subtrees and the suffix flags used by the rules.
+
+    The predicates over the children of the tokens (e.g. 'the first right child with pos_ ADP') are computed with
+    NumPy for all the tokens of the sentence at once on the first query and then answered by index.
+
+    The subtrees of the tokens are kept as index intervals: token.subtree yields the tokens of a projective subtree
+    in the order of the Doc, so it is range(left, right + 1). The subtrees with non-projective arcs fall back to
+    the indices of token.subtree.
+
+    The features of a Doc are built once and kept in its user_data while it is analyzed, see TokenFeatures.of and
+    TokenFeatures.release.
+    """
+    COLUMNS = {'orth': ORTH, 'lemma': LEMMA, 'pos': POS, 'tag': TAG, 'dep': DEP}
+    USER_DATA_KEY = 'sd_token_features'
+
+    def __init__(self, doc: spacy.tokens.doc.Doc):
+        self.doc = doc
+        self.strings = doc.vocab.strings
+        self.size = len(doc)
+        self.index = np.arange(self.size, dtype=np.int64)
+        array = doc.to_array(list(self.COLUMNS.values()) + [HEAD]).reshape(self.size, len(self.COLUMNS) + 1)
+        self.columns = {name: array[:, k] for k, name in enumerate(self.COLUMNS)}
+        self.heads = self.index + array[:, -1].astype(np.int64)
+        self.left_edges = np.array([token.left_edge.i for token in doc], dtype=np.int64)
+        self.right_edges = np.array([token.right_edge.i for token in doc], dtype=np.int64)
+        self.texts = texts = [token.text for token in doc]
+        self.pos_ = [token.pos_ for token in doc]
+        self.ed = [bool(ED.search(text)) for text in texts]  # re.search(r'ed\b', token.text)
+        self.ing = [bool(ING.search(text)) for text in texts]  # re.search(r'ing\b', token.text)
+        self.ends_ing = [text[-3:] == 'ing' for text in texts]
+        self.ends_ings = [text[-4:] == 'ings' for text in texts]
+        self._first_child: Dict[Tuple, List[int]] = {}
+        self._positions: Dict[Tuple, Tuple[int, ...]] = {}
+        self._projective = None
+        self._first = self._last = None
+        self._subtrees: Dict[int, Sequence[int]] = {}
+        self._left_phrases: Dict[int, Tuple[int, ...]] = {}
+
+    @classmethod
+    def of(cls, doc: spacy.tokens.doc.Doc) -> 'TokenFeatures':
+        features = doc.user_data.get(cls.USER_DATA_KEY)
+        if features is None or features.doc is not doc:
+            features = doc.user_data[cls.USER_DATA_KEY] = cls(doc)
+        return features
+
+    @classmethod
+    def release(cls, doc: spacy.tokens.doc.Doc):
+        """
+        Removes the features from the user_data of the Doc, so it can be serialized again (Doc.to_bytes) and isn't
+        kept in a reference cycle with them.
+        """
+        doc.user_data.pop(cls.USER_DATA_KEY, None)
+
+    def is_(self, i: int, **conditions: str) -> bool:
+        """
+        Whether the token i has all the given attribute values, e.g. is_(i, pos='ADP').
+        """
+        return all(self.columns[name][i] == self.strings[value] for name, value in conditions.items())
+
+    def mask(self, **conditions: str | Tuple[str, ...]) -> np.ndarray:
+        """
+        The boolean array of the tokens that have all the given attribute values; a tuple of values means any of them.
+        """
+        mask = np.ones(self.size, dtype=bool)
+        for name, value in conditions.items():
+            column = self.columns[name]
+            if isinstance(value, tuple):
+                mask &= np.isin(column, np.array([self.strings[v] for v in value], dtype=column.dtype))
+            else:
+                mask &= column == self.strings[value]
+        return mask
+
+    def positions(self, **conditions: str | Tuple[str, ...]) -> Tuple[int, ...]:
+        """
+        Returns the indices of the tokens that have all the given attribute values, e.g. positions(dep='attr').
+        """
+        key = tuple(sorted(conditions.items()))
+        positions = self._positions.get(key)
+        if positions is None:
+            positions = self._positions[key] = tuple(np.flatnonzero(self.mask(**conditions)).tolist())
+        return positions
+
+    def first_child(self, i: int, side: str = 'any', **conditions: str | Tuple[str, ...]) -> int:
+        """
+        Returns the index of the leftmost child of the token i (among its lefts, rights or any children) that has all
+        the given attribute values, or -1 if there is no such child.
+        """
+        key = (side,) + tuple(sorted(conditions.items()))
+        table = self._first_child.get(key)
+        if table is None:
+            table = self._first_child[key] = self._first_child_table(side, conditions)
+        return table[i]
+
+    def _first_child_table(self, side: str, conditions: dict) -> List[int]:
+        mask = self.mask(**conditions) & (self.index != self.heads)
+        if side == 'right':
+            mask &= self.index > self.heads
+        elif side == 'left':
+            mask &= self.index < self.heads
+        children = np.flatnonzero(mask)
+        first = np.full(self.size, self.size, dtype=np.int64)
+        np.minimum.at(first, self.heads[children], children)
+        first[first == self.size] = -1
+        return first.tolist()
+
+    def has_child(self, i: int, side: str = 'any', **conditions: str | Tuple[str, ...]) -> bool:
+        return self.first_child(i, side, **conditions) >= 0
+
+    def subtree(self, i: int) -> Sequence[int]:
+        """
+        Returns the indices of the tokens of doc[i].subtree in the same order.
+        """
+        subtree = self._subtrees.get(i)
+        if subtree is None:
+            if self._projective is None:
+                self._projective = self._projective_table()
+            if self._projective[i]:
+                subtree = range(self._first[i], self._last[i] + 1)
+            else:
+                subtree = [token.i for token in self.doc[i].subtree]
+            self._subtrees[i] = subtree
+        return subtree
+
+    def left_phrase(self, i: int) -> Tuple[int, ...]:
+        """
+        Returns the indices of the tokens of the subtree of the token i up to the token itself, without determiners.
+        """
+        phrase = self._left_phrases.get(i)
+        if phrase is None:
+            phrase = self._left_phrases[i] = tuple(j for j in self.subtree(i) if j <= i and self.pos_[j] != 'DET')
+        return phrase
+
+    def _projective_table(self) -> List[bool]:
+        """
+        Marks the tokens whose subtree and all the subtrees in it are contiguous, i.e. have no non-projective arcs.
+        """
+        heads = self.heads.tolist()
+        depth = [0] * self.size
+        for i in range(self.size):
+            j = i
+            while heads[j] != j:
+                depth[i] += 1
+                j = heads[j]
+        order = sorted(range(self.size), key=depth.__getitem__, reverse=True)
+        sizes = [1] * self.size
+        first = self._first = list(range(self.size))
+        last = self._last = list(range(self.size))
+        for i in order:
+            head = heads[i]
+            if head != i:
+                sizes[head] += sizes[i]
+                first[head] = min(first[head], first[i])
+                last[head] = max(last[head], last[i])
+        projective = [sizes[i] == last[i] - first[i] + 1 for i in range(self.size)]
+        for i in order:
+            if not projective[i] and heads[i] != i:
+                projective[heads[i]] = False
+        return projective
@@ -1,5 +1,8 @@
+from typing import Dict, List
+
 import spacy
-import re
+
+from TokenFeatures import TokenFeatures
 
 
 class VerbTypeChecker:
@@ -15,9 +18,41 @@ class VerbTypeChecker:
     ROLES = {'leader', 'specialist', 'professional', 'strategist', 'manager', 'coordinator', 'intern', 'admin',
              'consultant', 'director', 'marketer', 'officer', 'apprentice', 'associate', 'assistant', 'expert'}
     means_verbs = {'use', 'leverage', 'navigate', 'visit', 'follow', 'subscribe'}
+    # the order in which the verb types are checked by the rules
+    TYPE_METHODS = ('isIndirectEngagement', 'isMeansVerb', 'isResultVerb')
 
     def __init__(self, doc: spacy.tokens.doc.Doc):
         self.doc = doc
+        self.features = TokenFeatures.of(doc)
+        self._type_table = None
+
+    def get_type_table(self) -> Dict[str, List[str | None | Exception]]:
+        """
+        Returns the results of all the TYPE_METHODS for every token of the Doc, computed in one pass on the first call.
+        If a method fails for a token, the exception is stored instead of the result and raised by get_verb_type.
+        """
+        if self._type_table is None:
+            table = {}
+            for name in self.TYPE_METHODS:
+                method = getattr(self, name)
+                column = []
+                for token in self.doc:
+                    try:
+                        column.append(method(token))
+                    except Exception as e:
+                        column.append(e)
+                table[name] = column
+            self._type_table = table
+        return self._type_table
+
+    def get_verb_type(self, method: str, verb: spacy.tokens.token.Token) -> str | None:
+        """
+        Returns the result of the given method (one of TYPE_METHODS) for the verb from the type table.
+        """
+        verb_type = self.get_type_table()[method][verb.i]
+        if isinstance(verb_type, Exception):
+            raise verb_type
+        return verb_type
 
     def isResultVerb(self, verb: spacy.tokens.token.Token) -> str | None:
         if verb.dep_ != 'ROOT':
@@ -53,8 +88,8 @@ class VerbTypeChecker:
                 and verb.dep_ not in ['ROOT', 'conj']):
             if verb.dep_ == 'relcl':
                 return 'indirect engagement'
-            if ((bool(re.search(r'ing\b', verb.text))
-                 or bool(re.search(r'ed\b', verb.text)))
+            if ((self.features.ing[verb.i]
+                 or self.features.ed[verb.i])
                     and verb.dep_ != 'amod'
                     and verb.text != 'using'
                     and self.doc[verb.i + 1].pos_ != 'PUNCT'):
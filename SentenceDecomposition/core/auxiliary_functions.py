@@ -1,10 +1,10 @@
-import re
+from bisect import bisect_left, bisect_right
 from itertools import chain, product
-from typing import Tuple, Callable, List
+from typing import Tuple, FrozenSet, List
 import spacy
 
-from ConjunctsHandler import ConjunctsHandler
-from VerbTypeChecker import VerbTypeChecker
+from SentenceContext import SentenceContext, get_excluded_indices
+from TokenFeatures import TokenFeatures
 
 import nltk
 
@@ -19,8 +19,6 @@ ROLES = {'leader', 'specialist', 'professional', 'strategist', 'manager', 'coord
          'consultant', 'director', 'marketer', 'officer', 'apprentice', 'associate', 'assistant', 'expert'}
 objects_exclude = {'lot', 'plenty', 'variety', 'deal', 'range'}
 verbs_with_ccomps = {'help', 'allow', 'let', 'discover', 'enable'}
-verb_methods = [attribute for attribute in dir(VerbTypeChecker) if callable(getattr(VerbTypeChecker, attribute))
-                and attribute.startswith('__') is False]
 
 
 def print_sentence_decomposition(sentence_doc, print_sentence=True, print_lefts_and_rights=True):
@@ -38,17 +36,28 @@ def print_sentence_decomposition(sentence_doc, print_sentence=True, print_lefts_
             print("{} {:25s} {:10s} {:10s} {:20s}".format(token.i, token.text, token.pos_, token.dep_, token.head.text))
 
 
-def get_nearest_verb(doc: spacy.tokens.doc.Doc,
+def get_nearest_verb(ctx: SentenceContext,
                      word: spacy.tokens.token.Token,
                      kw_span: spacy.tokens.span.Span,
                      go_left: bool = True) -> spacy.tokens.token.Token:
     """
+    Memoized search_nearest_verb: the nearest verb is searched once per sentence for the given word and keyword.
+    """
+    return ctx.memo('nearest_verb', (word.i, kw_span.start, kw_span.end, go_left),
+                    lambda: search_nearest_verb(ctx, word, kw_span, go_left))
+
+
+def search_nearest_verb(ctx: SentenceContext,
+                        word: spacy.tokens.token.Token,
+                        kw_span: spacy.tokens.span.Span,
+                        go_left: bool = True) -> spacy.tokens.token.Token:
+    """
     For sentence processed with spacy, word processed with spacy and root token of the word, finds the nearest verb to the left of the word
 
     Input
     -----
-    doc : Doc
-        sentence processed with spacy
+    ctx : SentenceContext
+        the context of the sentence processed with spacy
     word: Token
         word processed with spacy
     kw_span: Span
@@ -62,63 +71,75 @@ def get_nearest_verb(doc: spacy.tokens.doc.Doc,
         token of the nearest verb to the left of the word
 
     """
+    doc = ctx.doc
+    positions, via_conjuncts = ctx.memo('verb_candidates', None, lambda: get_verb_candidates(doc))
     if go_left:
-        m = -1
-        n = 1
+        # for the first token of the sentence the whole sentence is searched from its end
+        start = bisect_left(positions, word.i) if word.i else len(positions)
+        order = range(start - 1, -1, -1)
     else:
-        m = 1
-        n = -1
-    for token in list(doc)[word.i - n::m]:
-        if token.pos_ in ('VERB', 'AUX') and token not in kw_span:
+        order = range(bisect_right(positions, word.i), len(positions))
+    for k in order:
+        token = doc[positions[k]]
+        if token in kw_span:
+            continue
+        if via_conjuncts[k]:
+            main_verb, all_verbs = ctx.conjuncts(token)
+            if all_verbs:
+                return all_verbs[-2]
+            continue
+        return token
+
+
+def get_verb_candidates(doc: spacy.tokens.doc.Doc) -> Tuple[List[int], List[bool]]:
+    """
+    Returns the sorted positions of the tokens that search_nearest_verb can return if they are not in the keyword,
+    and for each of them whether the verb is a part of a stoplist phrase (e.g. 'need to'), so that the previous verb
+    of its conjuncts is returned instead of it.
+    """
+    features = TokenFeatures.of(doc)
+    positions = []
+    via_conjuncts = []
+    for token in doc:
+        if token.pos_ in ('VERB', 'AUX'):
             if token.dep_ == 'amod' and token.head.dep_ != 'ROOT':
                 continue
             if token.lemma_ in verbs_stoplist:
                 continue
-            # if ',' in str(doc[token.i:word.i]):
-            #   continue
-            if (re.search(r'ed\b', token.text)
+            if (features.ed[token.i]
                     and ((token.head.text in ROLES
                          or (doc[token.i-1].text == ','
                              and doc[token.i-2].pos_ == 'ADJ')
                          or doc[token.i-1].pos_ == 'ADJ')
                          or (token.dep_ in ('conj','appos')
-                         and not re.search(r'ed\b', token.head.text)))):
+                         and not features.ed[token.head.i]))):
                 continue
-            if len(doc) >= token.i+2:
-                if (token.text + ' ' + doc[token.i+1].text) in verbs_stoplist:
-                    cj = ConjunctsHandler(doc)
-                    cj.get_conjuncts(token)
-                    if cj.all_verbs:
-                        return cj.all_verbs[-2]
-                    else:
-                        continue
-                else:
-                    return token
-            # if token in get_kw(doc, kw):
-            #   continue
-            else:
-                return token
-        elif token.pos_ == 'ADJ' and bool(re.search(r'ed\b|ing\b', token.text)) and token.head.dep_ in ('ROOT', 'nsubj') \
-                and token not in kw_span and not (
-                (doc[token.i - 1].text == ',' and doc[token.i - 2].pos_ == 'ADJ') or doc[token.i - 1].pos_ == 'ADJ'):
-            return token
+            positions.append(token.i)
+            via_conjuncts.append(len(doc) >= token.i+2 and (token.text + ' ' + doc[token.i+1].text) in verbs_stoplist)
+        elif token.pos_ == 'ADJ' and (features.ed[token.i] or features.ing[token.i]) and token.head.dep_ in ('ROOT', 'nsubj') \
+                and not ((doc[token.i - 1].text == ',' and doc[token.i - 2].pos_ == 'ADJ') or doc[token.i - 1].pos_ == 'ADJ'):
+            positions.append(token.i)
+            via_conjuncts.append(False)
+    return positions, via_conjuncts
 
 
 def get_prep(token: spacy.tokens.token.Token) -> str:
-    if 'ADP' in list(map(lambda x: x.pos_, list(token.rights))):
-        prep = list(filter(lambda x: x.pos_ == 'ADP', token.rights))[0]
+    i = TokenFeatures.of(token.doc).first_child(token.i, 'right', pos='ADP')
+    if i >= 0:
+        prep = token.doc[i]
 
         return prep if prep else ''
 
 
 def get_dobj(token: spacy.tokens.token.Token) -> spacy.tokens.token.Token:
-    if 'dobj' in list(map(lambda x: x.dep_, list(token.rights))):
-        dobj = list(filter(lambda x: x.dep_ == 'dobj', token.rights))[0]
+    i = TokenFeatures.of(token.doc).first_child(token.i, 'right', dep='dobj')
+    if i >= 0:
+        dobj = token.doc[i]
         return dobj
 
 
 def get_compounds(token: spacy.tokens.token.Token) -> str:
-    if 'compound' in list(map(lambda x: x.dep_, token.lefts)):
+    if TokenFeatures.of(token.doc).has_child(token.i, 'left', dep='compound'):
         comp = [tok.text for tok in token.lefts if tok.dep_ == 'compound']
         return ' '.join(comp) + ' ' + token.lemma_
 
@@ -127,7 +148,8 @@ def get_action_verb_objects(doc: spacy.tokens.doc.Doc,
                             verb: spacy.tokens.token.Token,
                             all_verbs: List[spacy.tokens.token.Token],
                             main_tok: spacy.tokens.token.Token,
-                            kw_span: spacy.tokens.span.Span) -> List[str]:
+                            kw_span: spacy.tokens.span.Span,
+                            excluded: Tuple[FrozenSet[int], FrozenSet[int]] = None) -> List[str]:
     """
     For sentence processed with spacy and verb processed with spacy finds direct objects and prep.phrases of the verb
 
@@ -138,6 +160,8 @@ def get_action_verb_objects(doc: spacy.tokens.doc.Doc,
     verb: Doc
         verb processed with spacy
     ...
+    excluded: tuple
+        the indices of the tokens excluded from the objects, see get_excluded_indices; computed if not given
 
     Output
     ------
@@ -146,12 +170,15 @@ def get_action_verb_objects(doc: spacy.tokens.doc.Doc,
 
     """
     prep = ''
-    if 'dobj' in list(map(lambda x: x.dep_, verb.rights)) or (all_verbs[-1].i < len(doc) - 1 and
-        doc[all_verbs[-1].i + 1].pos_ == 'NOUN' and all_verbs[-1].lemma_ != 'be' and doc[all_verbs[-1].i + 1] != main_tok):
-        if 'dobj' in list(map(lambda x: x.dep_, verb.rights)) and main_tok.i == kw_span[-1].i+1 and \
-                [tok for tok in verb.rights if tok.dep_ == 'dobj'][0] == main_tok:
+    features = TokenFeatures.of(doc)
+    excluded, excluded_but_main_tok = excluded if excluded else get_excluded_indices(main_tok, kw_span)
+    verb_indices = {v.i for v in all_verbs}
+    dobj = features.first_child(verb.i, 'right', dep='dobj')
+    if dobj >= 0 or (all_verbs[-1].i < len(doc) - 1 and
+        features.is_(all_verbs[-1].i + 1, pos='NOUN') and all_verbs[-1].lemma_ != 'be' and doc[all_verbs[-1].i + 1] != main_tok):
+        if dobj >= 0 and main_tok.i == kw_span[-1].i+1 and doc[dobj] == main_tok:
             return []
-        if 'dobj' in list(map(lambda x: x.dep_, verb.rights)):
+        if dobj >= 0:
             objs = [tok for tok in verb.rights if tok.dep_ == 'dobj']
             obj = doc[objs[0].i:objs[-1].i+1]
         else:
@@ -163,72 +190,79 @@ def get_action_verb_objects(doc: spacy.tokens.doc.Doc,
             obj_text = [obj.text]
             if obj[0].conjuncts or obj[-1].conjuncts:
                 conjs = obj[0].conjuncts if obj[0].conjuncts else obj[-1].conjuncts
-                conjs = [doc[conj.i:conj.i+1] for conj in conjs if
-                         conj.i < main_tok.i and conj not in kw_span and conj != main_tok and conj not in main_tok.conjuncts]
+                conjs = [doc[conj.i:conj.i+1] for conj in conjs if conj.i < main_tok.i and conj.i not in excluded]
                 rights += list(chain.from_iterable([list(conj[-1].rights) for conj in conjs]))
                 objs += conjs
                 obj_text += [conj.text for conj in conjs]
             if not obj.text in objects_exclude:
                 for i, obj in enumerate(objs):
-                    lefts = [tok.text for tok in obj[0].subtree if
-                             tok.i < obj[0].i and tok not in all_verbs and tok not in kw_span and tok != main_tok and tok not in main_tok.conjuncts]
+                    lefts = [features.texts[j] for j in features.subtree(obj[0].i) if
+                             j < obj[0].i and j not in verb_indices and j not in excluded]
                     if lefts:
                         obj_text[i] = ' '.join(lefts) + ' ' + obj.text
             if 'ADP' in list(map(lambda x: x.pos_, rights)):
                 prep = list(filter(lambda x: x.pos_ == 'ADP', rights))[0]
                 for i, obj in enumerate(objs):
                     obj_text[i] += ' ' + prep.text
-                if [tok for tok in prep.rights if
-                    tok.dep_ == 'pobj' and tok not in kw_span and tok != main_tok and tok not in main_tok.conjuncts]:
-                    pobj = [tok for tok in prep.rights if
-                            tok.dep_ == 'pobj' and tok not in kw_span and tok != main_tok and tok not in main_tok.conjuncts][
-                        0]
-                    pobj_lefts = [tok.text for tok in pobj.subtree if (
-                                tok.i <= pobj.i or tok.pos_ == 'ADP') and tok not in kw_span and tok != main_tok and tok not in main_tok.conjuncts]
+                pobj = next((tok for tok in prep.rights if tok.dep_ == 'pobj' and tok.i not in excluded), None)
+                if pobj is not None:
+                    pobj_lefts = [features.texts[j] for j in features.subtree(pobj.i) if (
+                                j <= pobj.i or features.pos_[j] == 'ADP') and j not in excluded]
                     for i, obj in enumerate(objs):
                         obj_text[i] += ' ' + ' '.join(pobj_lefts)
             return obj_text
-    if any(list(map(lambda word: word.pos_ == 'ADP', verb.rights))):
-        prep = [word for word in verb.rights if word.pos_ == 'ADP'][0]
+    i = features.first_child(verb.i, 'right', pos='ADP')
+    if i >= 0:
+        prep = doc[i]
         if prep.i < main_tok.i:
-            if [word for word in prep.rights if word.dep_ == 'pobj']:
-                pobj = [word for word in prep.rights if word.dep_ == 'pobj'][0]
-                if pobj not in kw_span and pobj != main_tok and pobj not in main_tok.conjuncts:
+            i = features.first_child(prep.i, 'right', dep='pobj')
+            if i >= 0:
+                pobj = doc[i]
+                if pobj.i not in excluded:
                     rights = list(chain([x for x in verb.rights if x.i > pobj.i], list(pobj.rights)))
                     pobjs = [pobj]
                     pobj_text = [pobj.text]
                     if pobj.conjuncts:
-                        conjs = [conj for conj in pobj.conjuncts if
-                                 conj.i < main_tok.i and conj not in kw_span and conj != main_tok and conj not in main_tok.conjuncts]
+                        conjs = [conj for conj in pobj.conjuncts if conj.i < main_tok.i and conj.i not in excluded]
                         rights += list(chain.from_iterable([list(conj.rights) for conj in conjs]))
                         pobjs += conjs
                         pobj_text += [conj.text for conj in conjs]
                     if not pobj.text in objects_exclude:
                         for i, obj in enumerate(pobjs):
-                            lefts = [tok.text for tok in pobj.subtree if
-                                     tok.i <= pobj.i and tok not in all_verbs and tok not in kw_span and tok != main_tok and tok not in main_tok.conjuncts]
+                            lefts = [features.texts[j] for j in features.subtree(pobj.i) if
+                                     j <= pobj.i and j not in verb_indices and j not in excluded]
                             pobj_text[i] = prep.text + ' ' + ' '.join(lefts)
                     if 'ADP' in list(map(lambda x: x.pos_, rights)):
                         prep2 = list(filter(lambda x: x.pos_ == 'ADP', rights))[0]
                         for i, pobj in enumerate(pobjs):
                             pobj_text[i] += ' ' + prep2.text
-                        if [tok for tok in prep2.rights if
-                            tok.dep_ == 'pobj' and tok not in kw_span and tok != main_tok and tok not in main_tok.conjuncts]:
-                            pobj2 = [tok for tok in prep2.rights if
-                                     tok.dep_ == 'pobj' and tok not in kw_span and tok != main_tok and tok not in main_tok.conjuncts][
-                                0]
-                            pobj_lefts2 = [tok.text for tok in pobj2.subtree if (
-                                        tok.i <= pobj2.i or tok.pos_ == 'ADP') and tok not in kw_span and tok not in main_tok.conjuncts]
+                        pobj2 = next((tok for tok in prep2.rights if tok.dep_ == 'pobj' and tok.i not in excluded), None)
+                        if pobj2 is not None:
+                            pobj_lefts2 = [features.texts[j] for j in features.subtree(pobj2.i) if (
+                                        j <= pobj2.i or features.pos_[j] == 'ADP') and j not in excluded_but_main_tok]
                             for i, pobj in enumerate(pobjs):
                                 pobj_text[i] += ' ' + ' '.join(pobj_lefts2)
                     return pobj_text
 
 
-def get_other_verbs(doc: spacy.tokens.doc.Doc,
+def get_other_verbs(ctx: SentenceContext,
                     main_tok: spacy.tokens.token.Token,
                     kw_span: spacy.tokens.span.Span) -> List[Tuple]:
     '''
 
+    Memoized search_other_verbs. The callers extend the returned list, so each of them gets its own copy.
+
+    '''
+    verbs = ctx.memo('other_verbs', (main_tok.i, kw_span.start, kw_span.end),
+                     lambda: search_other_verbs(ctx, main_tok, kw_span))
+    return list(verbs) if verbs is not None else None
+
+
+def search_other_verbs(ctx: SentenceContext,
+                       main_tok: spacy.tokens.token.Token,
+                       kw_span: spacy.tokens.span.Span) -> List[Tuple]:
+    '''
+
     For the given main token or verb with result/means/benefactive/indirect engagement/state flag, searches for another verb
     that should be non-action verb, so that we get 2 non-action verb tuples for the given keyword.
     The tuple comprises:
@@ -245,26 +279,29 @@ def get_other_verbs(doc: spacy.tokens.doc.Doc,
     For each pair (verb, object) there is a separate tuple.
 
     '''
-    verb2 = get_nearest_verb(doc, main_tok, kw_span)
-    checker = VerbTypeChecker(doc)
+    doc = ctx.doc
+    features = TokenFeatures.of(doc)
+    verb2 = get_nearest_verb(ctx, main_tok, kw_span)
+    checker = ctx.verb_checker
     if verb2:
         flag2 = ''
-        main_verb2, all_verbs2 = get_all_verbs(doc, verb2)
+        main_verb2, all_verbs2 = get_all_verbs(ctx, verb2)
         p = get_prep(verb2)
         prep = p if p else get_prep_2(doc, p, kw_span)
-        for method in verb_methods:
-            flag = getattr(checker, method)(verb2)
+        for method in checker.TYPE_METHODS:
+            flag = checker.get_verb_type(method, verb2)
             if flag:
                 flag2 = flag
-                if not all([getattr(checker, method)(v) == flag for v in all_verbs2]):
+                if not all([checker.get_verb_type(method, v) == flag for v in all_verbs2]):
                     all_verbs2 = [verb2]
         if verb2.lemma_ == 'be':
             flag2 = 'state'
         verbs_text = get_verbs_text(doc, all_verbs2, main_tok)
-        obj_text = get_action_verb_objects(doc, verb2, all_verbs2, main_tok, kw_span)
-        if ((('dobj' in list(map(lambda x: x.dep_, verb2.rights)))
+        obj_text = get_action_verb_objects(doc, verb2, all_verbs2, main_tok, kw_span,
+                                           ctx.excluded_indices(main_tok, kw_span))
+        if ((features.has_child(verb2.i, 'right', dep='dobj')
             or (all_verbs2[-1].i < len(doc) - 1
-                and doc[all_verbs2[-1].i + 1].pos_ == 'NOUN'))
+                and features.is_(all_verbs2[-1].i + 1, pos='NOUN')))
                 and obj_text):
             if flag2: # and flag2 != flag:
                 verbs = [(v[0], v[1], obj, prep, flag2) for (v, obj) in product(verbs_text, obj_text)]
@@ -290,6 +327,7 @@ def get_verbs_text(doc: spacy.tokens.doc.Doc,
         - if the verb is semantic, the auxiliary verb is added if it comes before it
 
     '''
+    features = TokenFeatures.of(doc)
     verbs_text = []
     for v in all_verbs:
         v_text = v.lemma_
@@ -298,30 +336,30 @@ def get_verbs_text(doc: spacy.tokens.doc.Doc,
                 v_text = doc[v.i-2:v.i+1].text
         if v.pos_ == 'AUX' and doc[v.i+1].pos_ == 'VERB' and doc[v.i+1].tag_ == 'VBN':
             verbs_text.append((v.i, v.text + ' ' + doc[v.i + 1].text))
-        elif v.tag_ == 'VBN' and 'AUX' in list(map(lambda x: x.pos_, v.lefts)):
-            aux = [tok for tok in v.lefts if tok.pos_ == 'AUX'][0]
+        elif v.tag_ == 'VBN' and features.has_child(v.i, 'left', pos='AUX'):
+            aux = doc[features.first_child(v.i, 'left', pos='AUX')]
             verbs_text.append((v.i, aux.text + ' ' + v.text))
         elif v.tag_ == 'VBN' and v.conjuncts:
             aux = ''
             for conj in v.conjuncts:
-                if 'AUX' in list(map(lambda x: x.pos_, conj.lefts)):
-                    aux = [tok for tok in conj.lefts if tok.pos_ == 'AUX'][0]
+                if features.has_child(conj.i, 'left', pos='AUX'):
+                    aux = doc[features.first_child(conj.i, 'left', pos='AUX')]
             if aux:
                 verbs_text.append((v.i, aux.text + ' ' + v.text))
             else:
                 verbs_text.append((v.i, v_text))
         elif v.lemma_ == 'be' and (
-                'ADJ' in list(map(lambda x: x.pos_, v.rights))):  # or 'NOUN' in list(map(lambda x: x.pos_, v.rights))):
-            adj = [tok for tok in v.rights if tok.pos_ in ('ADJ', 'NOUN')][0]
+                features.has_child(v.i, 'right', pos='ADJ')):  # or features.has_child(v.i, 'right', pos='NOUN')):
+            adj = doc[features.first_child(v.i, 'right', pos=('ADJ', 'NOUN'))]
             p = get_prep(adj)
             prep = ' ' + str(p) if p else ''
             verbs_text.append((v.i, v.text + ' ' + adj.text + prep))
-        elif v.lemma_ == 'be' and 'one' in list(map(lambda x: x.text, v.rights)):
-            one = list(filter(lambda x: x.text == 'one', v.rights))[0]
-            if 'of' in list(map(lambda x: x.text, one.rights)):
-                of = list(filter(lambda x: x.text == 'of', one.rights))[0]
-                if 'NOUN' in list(map(lambda x: x.pos_, of.rights)):
-                    noun = list(filter(lambda x: x.pos_ == 'NOUN', of.rights))[0]
+        elif v.lemma_ == 'be' and features.has_child(v.i, 'right', orth='one'):
+            one = doc[features.first_child(v.i, 'right', orth='one')]
+            if features.has_child(one.i, 'right', orth='of'):
+                of = doc[features.first_child(one.i, 'right', orth='of')]
+                if features.has_child(of.i, 'right', pos='NOUN'):
+                    noun = doc[features.first_child(of.i, 'right', pos='NOUN')]
                     if noun != main_tok:
                         compound = get_compounds(noun)
                         if compound:
@@ -336,8 +374,8 @@ def get_verbs_text(doc: spacy.tokens.doc.Doc,
                     verbs_text.append((v.i, v_text))
             else:
                 verbs_text.append((v.i, v_text))
-        elif v.lemma_ == 'be' and 'NOUN' in list(map(lambda x: x.pos_, v.rights)):
-            noun = list(filter(lambda x: x.pos_ == 'NOUN', v.rights))[0]
+        elif v.lemma_ == 'be' and features.has_child(v.i, 'right', pos='NOUN'):
+            noun = doc[features.first_child(v.i, 'right', pos='NOUN')]
             if noun != main_tok:
                 compound = get_compounds(noun)
                 if compound:
@@ -353,35 +391,41 @@ def get_verbs_text(doc: spacy.tokens.doc.Doc,
     return verbs_text
 
 
-def check_verb_type(method: Callable,
+def check_verb_type(method: str,
                     flag: str,
-                    doc: spacy.tokens.doc.Doc,
+                    ctx: SentenceContext,
                     verb: spacy.tokens.token.Token,
                     main_verb: spacy.tokens.token.Token,
                     all_verbs: List[spacy.tokens.token.Token],
                     kw_span: spacy.tokens.span.Span) -> Tuple[str, List[Tuple], spacy.tokens.token.Token,
                                                             List[spacy.tokens.token.Token]]:
     verbs = []
-    verb_type = method(verb)
+    checker = ctx.verb_checker
+    verb_type = checker.get_verb_type(method, verb)
     if verb_type:
         flag = verb_type
-        if not all([method(v) == flag for v in all_verbs]):
+        if not all([checker.get_verb_type(method, v) == flag for v in all_verbs]):
             all_verbs = [verb]
             main_verb = verb
-        other_verbs = get_other_verbs(doc, main_verb, kw_span)
+        other_verbs = get_other_verbs(ctx, main_verb, kw_span)
         if other_verbs:
             verbs = other_verbs
     return flag, verbs, main_verb, all_verbs
 
 
-def get_all_verbs(doc: spacy.tokens.doc.Doc,
+def get_all_verbs(ctx: SentenceContext,
                   verb: spacy.tokens.token.Token) -> Tuple[spacy.tokens.token.Token, List[spacy.tokens.token.Token]]:
-    cj = ConjunctsHandler(doc)
-    cj.get_conjuncts(verb)
-    if verb.dep_ == 'conj' and not cj.all_verbs:
-        cj.get_main_verb_token(verb)
-    if cj.main_verb and cj.all_verbs:
-        return cj.main_verb, cj.all_verbs
+    main_verb, all_verbs = ctx.memo('all_verbs', verb.i, lambda: search_all_verbs(ctx, verb))
+    return main_verb, list(all_verbs)
+
+
+def search_all_verbs(ctx: SentenceContext,
+                     verb: spacy.tokens.token.Token) -> Tuple[spacy.tokens.token.Token, List[spacy.tokens.token.Token]]:
+    main_verb, all_verbs = ctx.conjuncts(verb)
+    if verb.dep_ == 'conj' and not all_verbs:
+        main_verb, all_verbs = ctx.main_verb_conjuncts(verb)
+    if main_verb and all_verbs:
+        return main_verb, all_verbs
     return verb, [verb]
 
 
@@ -410,10 +454,12 @@ def get_objects_text(doc: spacy.tokens.doc.Doc,
                      main_tok: spacy.tokens.token.Token,
                      kw: spacy.tokens.token.Token,
                      kw_span: spacy.tokens.span.Span,
-                     all_verbs: List[spacy.tokens.token.Token]) -> dict:
+                     all_verbs: List[spacy.tokens.token.Token],
+                     excluded: Tuple[FrozenSet[int], FrozenSet[int]] = None) -> dict:
     obj_text = {}
+    excluded = excluded if excluded else get_excluded_indices(main_tok, kw_span)
     for v in all_verbs:
-        obj = get_action_verb_objects(doc, v, all_verbs, main_tok, kw_span)
+        obj = get_action_verb_objects(doc, v, all_verbs, main_tok, kw_span, excluded)
         if obj:
             if kw.dep_ == 'pobj':
                 obj = [o + ' ' + doc[kw_span[0].i-2:kw_span[0].i].text if (doc[kw_span[0].i-2].text not in o
@@ -432,7 +478,7 @@ def get_verbs_vbz_vbd(doc: spacy.tokens.doc.Doc,
     this verb is not a meaningful verb or does not refer to any agent
 
     '''
-    if verb.tag_ == 'VBZ' and list(filter(lambda x: x.text == 'it' and x.dep_ == 'nsubj', verb.children)):
+    if verb.tag_ == 'VBZ' and TokenFeatures.of(doc).has_child(verb.i, orth='it', dep='nsubj'):
         return []
     if verb.tag_ == 'VBD':  # verb ends in '-ed'
         if main_verb.dep_ == 'amod':
@@ -461,7 +507,7 @@ def form_verb_object_tuples(verbs: List[Tuple],
     return verbs
 
 
-def get_action_verb_tuples(doc: spacy.tokens.doc.Doc,
+def get_action_verb_tuples(ctx: SentenceContext,
                            main_tok: spacy.tokens.token.Token,
                            kw: spacy.tokens.token.Token,
                            verb: spacy.tokens.token.Token,
@@ -487,33 +533,36 @@ def get_action_verb_tuples(doc: spacy.tokens.doc.Doc,
     For each pair (verb, object) there is a separate tuple.
 
     """
-    checker = VerbTypeChecker(doc)
+    doc = ctx.doc
+    checker = ctx.verb_checker
     verbs = []
     prep = get_prep_2(doc, prep, kw_span)
-    main_verb, all_verbs = get_all_verbs(doc, verb)
+    main_verb, all_verbs = get_all_verbs(ctx, verb)
 
     flag = get_subject_state(main_tok, verb, flag)
     if flag == 'action':
-        for method in verb_methods:
-            flag, verbs, main_verb, all_verbs = check_verb_type(getattr(checker, method), flag, doc, verb, main_verb,
+        for method in checker.TYPE_METHODS:
+            flag, verbs, main_verb, all_verbs = check_verb_type(method, flag, ctx, verb, main_verb,
                                                                 all_verbs, kw_span)
 
     verbs_text = get_verbs_text(doc, all_verbs, main_tok)
-    obj_text = get_objects_text(doc, main_tok, kw, kw_span, all_verbs)
+    obj_text = get_objects_text(doc, main_tok, kw, kw_span, all_verbs, ctx.excluded_indices(main_tok, kw_span))
 
     verbs = form_verb_object_tuples(verbs, verbs_text, obj_text, prep, flag)
     verbs = get_verbs_vbz_vbd(doc, verbs, verb, main_verb)
     return verbs
 
 
-def get_other_result_tuple(doc: spacy.tokens.doc.Doc,
+def get_other_result_tuple(ctx: SentenceContext,
                            verb: spacy.tokens.token.Token,
                            main_verb: spacy.tokens.token.Token,
                            all_verbs: List[spacy.tokens.token.Token],
                            prep: str,
                            kw_span: spacy.tokens.span.Span) -> List[Tuple]:
-    checker = VerbTypeChecker(doc)
-    verb2 = get_nearest_verb(doc, main_verb, kw_span)
+    doc = ctx.doc
+    features = TokenFeatures.of(doc)
+    checker = ctx.verb_checker
+    verb2 = get_nearest_verb(ctx, main_verb, kw_span)
     if verb2:
         link_verb = main_verb.head.text if main_verb.head.pos_ != 'VERB' else ''
         link = ' '.join(
@@ -521,28 +570,28 @@ def get_other_result_tuple(doc: spacy.tokens.doc.Doc,
         objects = get_verb_objects(doc, verb2)
         obj = ' ' + objects[0] if objects else ''
         verbs_text2 = []
-        if verb2.tag_ == 'VBZ' and list(filter(lambda x: x.text == 'it' and x.dep_ == 'nsubj', verb2.children)):
+        if verb2.tag_ == 'VBZ' and features.has_child(verb2.i, orth='it', dep='nsubj'):
             action_phrases = []
         else:
-            if checker.isResultVerb(main_verb):
-                if verb2.lemma_ == 'be' and 'ADJ' in list(map(lambda x: x.pos_, verb2.rights)):
-                    adj = [tok.text for tok in verb2.rights if tok.pos_ == 'ADJ'][0]
+            if checker.get_verb_type('isResultVerb', main_verb):
+                if verb2.lemma_ == 'be' and features.has_child(verb2.i, 'right', pos='ADJ'):
+                    adj = doc[features.first_child(verb2.i, 'right', pos='ADJ')].text
                     verbs_text2.extend(
                         [(verb2.i, verb2.text + ' ' + adj + obj + ' to ' + main_verb.lemma_) for v in all_verbs])
-                elif verb2.tag_ == 'VBN' and 'AUX' in list(map(lambda x: x.pos_, verb2.lefts)):
-                    aux = [tok for tok in verb2.lefts if tok.pos_ == 'AUX'][0]
+                elif verb2.tag_ == 'VBN' and features.has_child(verb2.i, 'left', pos='AUX'):
+                    aux = doc[features.first_child(verb2.i, 'left', pos='AUX')]
                     verbs_text2.extend(
                         [(verb2.i, aux.text + ' ' + verb2.text + obj + ' to ' + main_verb.lemma_) for v in all_verbs])
                 else:
                     verbs_text2.extend([(verb2.i, verb2.text + obj + ' to ' + main_verb.lemma_) for v in all_verbs])
             else:
-                if verb2.lemma_ == 'be' and 'ADJ' in list(map(lambda x: x.pos_, verb2.rights)):
-                    adj = [tok.text for tok in verb2.rights if tok.pos_ == 'ADJ'][0]
+                if verb2.lemma_ == 'be' and features.has_child(verb2.i, 'right', pos='ADJ'):
+                    adj = doc[features.first_child(verb2.i, 'right', pos='ADJ')].text
                     verbs_text2.extend(
                         [(verb2.i, verb2.text + ' ' + adj + obj + ' ' + main_verb.head.text + ' ' + main_verb.lemma_)
                          for v in all_verbs])
-                elif verb2.tag_ == 'VBN' and 'AUX' in list(map(lambda x: x.pos_, verb2.lefts)):
-                    aux = [tok for tok in verb2.lefts if tok.pos_ == 'AUX'][0]
+                elif verb2.tag_ == 'VBN' and features.has_child(verb2.i, 'left', pos='AUX'):
+                    aux = doc[features.first_child(verb2.i, 'left', pos='AUX')]
                     verbs_text2.extend([(verb2.i,
                                          aux.text + ' ' + verb2.text + obj + ' ' + main_verb.head.text + ' ' + main_verb.lemma_)
                                         for v in all_verbs])
@@ -596,32 +645,35 @@ def get_verb_objects(doc: spacy.tokens.doc.Doc,
 
     """
     answer = []
-    if any(list(map(lambda word: word.dep_ == 'dobj', verb.rights))):
-        obj = [word for word in verb.rights if word.dep_ == 'dobj'][0]
-        obj_lefts = [w.text for w in obj.subtree if w.i <= obj.i and w.pos_ != 'DET']
+    features = TokenFeatures.of(doc)
+    if features.has_child(verb.i, 'right', dep='dobj'):
+        obj = doc[features.first_child(verb.i, 'right', dep='dobj')]
+        obj_lefts = [features.texts[j] for j in features.left_phrase(obj.i)]
         if obj.pos_ != 'NOUN':
-            if [w for w in obj.subtree if w.pos_ == 'NOUN']:
-                obj = [w for w in obj.subtree if w.pos_ == 'NOUN'][0]
+            noun = next((j for j in features.subtree(obj.i) if features.pos_[j] == 'NOUN'), None)
+            if noun is not None:
+                obj = doc[noun]
                 obj_lefts = [w.text for w in doc[verb.i + 1:obj.i + 1] if w.pos_ != 'DET']
         # if obj != kw_root:
         answer.append(' '.join(obj_lefts))
         if obj.conjuncts:
             other_objects = list(obj.conjuncts)
             if other_objects:
-                answer.extend([' '.join([w.text for w in word.subtree if w.i <= word.i and w.pos_ != 'DET']) for word in
+                answer.extend([' '.join([features.texts[j] for j in features.left_phrase(word.i)]) for word in
                                other_objects])
                 obj = other_objects[-1]
         # if any(list(map(lambda word: (word.pos_ == 'ADP') and (word.i == obj.i + 1), list(obj.rights)+list(verb.rights)))):
         #   answer[-1] += ' ' + [word.text for word in list(obj.rights)+list(verb.rights) if (word.pos_ == 'ADP') and (word.i == obj.i + 1)][0]
 
-    elif any(list(map(lambda word: word.pos_ == 'ADP', verb.rights))):
-        prep = [word for word in verb.rights if word.pos_ == 'ADP'][0]
-        if [word for word in prep.rights if word.dep_ == 'pobj']:
-            pobj = [word for word in prep.rights if word.dep_ == 'pobj'][0]
-            pobj_lefts = [w.text for w in pobj.subtree if w.i <= pobj.i and w.pos_ != 'DET']
+    elif features.has_child(verb.i, 'right', pos='ADP'):
+        prep = doc[features.first_child(verb.i, 'right', pos='ADP')]
+        if features.has_child(prep.i, 'right', dep='pobj'):
+            pobj = doc[features.first_child(prep.i, 'right', dep='pobj')]
+            pobj_lefts = [features.texts[j] for j in features.left_phrase(pobj.i)]
             if pobj.pos_ != 'NOUN':
-                if [w for w in pobj.subtree if w.pos_ == 'NOUN']:
-                    pobj = [w for w in pobj.subtree if w.pos_ == 'NOUN'][0]
+                noun = next((j for j in features.subtree(pobj.i) if features.pos_[j] == 'NOUN'), None)
+                if noun is not None:
+                    pobj = doc[noun]
                     pobj_lefts = [w.text for w in doc[verb.i + 2:pobj.i + 1] if w.pos_ != 'DET']
             # if pobj != kw_root:
             answer.append(prep.text + ' ' + ' '.join(pobj_lefts))
@@ -629,7 +681,7 @@ def get_verb_objects(doc: spacy.tokens.doc.Doc,
                 other_pobjects = list(pobj.conjuncts)
                 if other_pobjects:
                     answer.extend(
-                        [prep.text + ' ' + ' '.join([w.text for w in word.subtree if w.i <= word.i and w.pos_ != 'DET'])
+                        [prep.text + ' ' + ' '.join([features.texts[j] for j in features.left_phrase(word.i)])
                          for word in other_pobjects])
                     obj = other_pobjects[-1]
             # if any(list(map(lambda word: (word.pos_ == 'ADP') and (word.i == pobj.i + 1), list(pobj.rights)+list(verb.rights)))):
@@ -647,7 +699,7 @@ def get_verb_objects(doc: spacy.tokens.doc.Doc,
     return answer
 
 
-def get_ccomps(doc: spacy.tokens.doc.Doc,
+def get_ccomps(ctx: SentenceContext,
                verb: spacy.tokens.token.Token) -> Tuple[List[spacy.tokens.token.Token], List[Tuple]]:
     all_verbs = []
     verbs_text = []
@@ -655,11 +707,10 @@ def get_ccomps(doc: spacy.tokens.doc.Doc,
         if tok.dep_ in ('ccomp', 'conj'):
             all_verbs.append(tok)
             verbs_text.append((verb.i, verb.lemma_ + ' to ' + tok.text))
-            cj = ConjunctsHandler(doc)
-            cj.get_conjuncts(tok)
-            if cj.all_verbs:
-                all_verbs.extend(cj.all_verbs)
-                verbs_text.extend([(verb.i, verb.lemma_ + ' to ' + conj.text) for conj in cj.all_verbs])
+            main_verb, conj_verbs = ctx.conjuncts(tok)
+            if conj_verbs:
+                all_verbs.extend(conj_verbs)
+                verbs_text.extend([(verb.i, verb.lemma_ + ' to ' + conj.text) for conj in conj_verbs])
             if 'conj' in list(map(lambda x: x.dep_, tok.rights)):
                 conjs = [x for x in tok.rights if x.dep_ == 'conj']
                 all_verbs.extend(conjs)
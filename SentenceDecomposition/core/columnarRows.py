@@ -0,0 +1,73 @@
+import json
+from typing import Dict, List
+
+from compactRows import DATA_FORMAT_COLS, INTERNED_COLS, STATIC_COLS, SentenceRows
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+PARQUET_MIMETYPE = 'application/vnd.apache.parquet'
+COLUMNAR_MIMETYPES = {'arrow': ARROW_MIMETYPE, 'parquet': PARQUET_MIMETYPE}
+# the columns with a few distinct values, dictionary-encoded
+DICTIONARY_COLS = INTERNED_COLS | {'profile', 'personName', 'companyName', 'sentence', 'section', 'refId',
+                                   'refType', 'sentenceId'}
+_DATA_COLS = set(DATA_FORMAT_COLS)
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def _column(name: str, values: list) -> 'pa.Array':
+    try:
+        array = pa.array(values) if values else pa.array([], pa.string())
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # the columns of mixed types (e.g. improvedKeywordAddInfo dicts with different values) are stored as JSON
+        array = pa.array([value if value is None or isinstance(value, str) else json.dumps(value, default=str)
+                          for value in values], pa.string())
+    if name in DICTIONARY_COLS and pa.types.is_string(array.type):
+        array = array.dictionary_encode()
+    return array
+
+
+def rows_table(sentence_rows: List[SentenceRows]) -> 'pa.Table':
+    """
+    Returns the Arrow table with the full rows of the given sentences: the columns of DATA_FORMAT_COLS ('' if
+    empty), the other columns found in the rows and the static columns of STATIC_COLS.
+    """
+    extra_cols = list(dict.fromkeys(col for rows in sentence_rows for row in rows.rows for col in row
+                                    if col not in _DATA_COLS))
+    columns: Dict[str, list] = {col: [] for col in DATA_FORMAT_COLS + extra_cols + STATIC_COLS}
+    for rows in sentence_rows:
+        for col in DATA_FORMAT_COLS + extra_cols:
+            columns[col].extend([row.get(col, '') for row in rows.rows])
+        for col in STATIC_COLS:
+            columns[col].extend([rows.header.get(col)] * len(rows))
+    return pa.table({col: _column(col, values) for col, values in columns.items()})
+
+
+def rows_arrow(sentence_rows: List[SentenceRows]) -> bytes:
+    """
+    Returns the rows as an Arrow IPC stream.
+    """
+    table = rows_table(sentence_rows)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def rows_parquet(sentence_rows: List[SentenceRows]) -> bytes:
+    """
+    Returns the rows as a Parquet file.
+    """
+    sink = pa.BufferOutputStream()
+    pq.write_table(rows_table(sentence_rows), sink, compression='zstd')
+    return sink.getvalue().to_pybytes()
+
+
+COLUMNAR_WRITERS = {'arrow': rows_arrow, 'parquet': rows_parquet}
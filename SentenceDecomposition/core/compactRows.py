@@ -0,0 +1,67 @@
+import sys
+from typing import Dict, List
+
+from oneforce_swagger_docs import SentenceDecompositionDoc
+
+DATA_FORMAT_COLS = ['foundKeyword', 'improvedKeyword', 'whereFound', 'verb', 'verbPrep', 'additionalObject', 'object',
+                    'resultLink', 'resultVerb', 'resultVerbPrep', 'resultAdditionalObject', 'resultObject', 'meansLink',
+                    'meansVerb', 'meansVerbPrep', 'meansAdditionalObject', 'meansObject', 'indirectLink',
+                    'indirectVerb', 'indirectVerbPrep', 'indirectAdditionalObject', 'indirectObject', 'extractedLink',
+                    'extractedVerb', 'extractedObject', 'benefactive', 'benefactiveLink', 'role', 'subjectToken',
+                    'subjectType', 'isPassive', 'agentInfo', 'improvedKeywordAddInfo']
+STATIC_COLS = ['profile', 'personName', 'companyName', 'sentence', 'section', 'order', 'refId', 'refType',
+               'sentenceId']
+# the columns with a few distinct values repeated in many rows
+INTERNED_COLS = {'whereFound', 'resultLink', 'meansLink', 'indirectLink', 'extractedLink', 'benefactiveLink',
+                 'subjectType', 'isPassive', 'role'}
+
+_COLS = {sys.intern(col): sys.intern(col) for col in DATA_FORMAT_COLS}
+_EMPTY_ROW = dict.fromkeys(DATA_FORMAT_COLS, '')
+
+
+def compact_row(row: Dict) -> Dict:
+    """
+    Returns the row without the empty columns of DATA_FORMAT_COLS; the column names and the repeated values are
+    interned.
+    """
+    return {_COLS.get(col, col): sys.intern(value) if col in INTERNED_COLS and type(value) is str else value
+            for col, value in row.items() if not (type(value) is str and value == '' and col in _COLS)}
+
+
+class SentenceRows:
+    """
+    The output rows of one sentence: the static columns shared by all the rows of the sentence and the compact
+    rows with the non-empty data columns only. The full rows (every column of DATA_FORMAT_COLS, '' if empty) are
+    built on output, see to_dicts and to_docs.
+    """
+    __slots__ = ('header', 'rows')
+
+    def __init__(self, header: Dict, rows: List[Dict]):
+        self.header = header
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def to_dicts(self) -> List[Dict]:
+        return [{**_EMPTY_ROW, **row, **self.header} for row in self.rows]
+
+    def to_docs(self) -> List[SentenceDecompositionDoc]:
+        return [SentenceDecompositionDoc(**dict_) for dict_ in self.to_dicts()]
+
+
+def limit_rows(sentence_rows: List[SentenceRows], max_rows: int) -> List[SentenceRows]:
+    """
+    Returns the rows of the given sentences, at most max_rows rows in total (0 - no limit).
+    """
+    if max_rows <= 0 or sum(len(rows) for rows in sentence_rows) <= max_rows:
+        return sentence_rows
+    limited = []
+    for rows in sentence_rows:
+        if len(rows) >= max_rows:
+            limited.append(SentenceRows(rows.header, rows.rows[:max_rows]))
+            break
+        limited.append(rows)
+        max_rows -= len(rows)
+    return limited
+
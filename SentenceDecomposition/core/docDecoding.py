@@ -0,0 +1,120 @@
+import base64
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List
+
+import srsly
+from spacy.tokens import DocBin
+from spacy.tokens.doc import Doc as SpacyDoc
+from spacy.vocab import Vocab
+
+from oneforce_logger import OneForceLogger
+
+logger = OneForceLogger('SD-doc-decoding')
+
+SHARED_MODE = 'shared'
+BOUNDED_MODE = 'bounded'
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+
+def unpack_sentences(data: bytes | memoryview) -> dict:
+    """
+    Reads the msgpack container of the sentences: the analyzer response ({'list': [...]}) with the sentenceDoc of
+    the elements, or one 'sentenceDocBin' for all of them, as msgpack bin values instead of base64 strings.
+    Raises ValueError if the data isn't valid msgpack.
+    """
+    return srsly.msgpack_loads(data)
+
+
+class DocDecoder:
+    """
+    Decodes base64 sentence Docs and keeps track of the size of the StringStore they are decoded into.
+
+    In the 'shared' mode every Doc is decoded with the given shared decoder (the process-wide vocab), so every
+    string seen in the LinkedIn texts stays interned for the life of the worker.
+    In the 'bounded' mode the Docs are decoded into a vocab owned by the decoder, which is replaced with an empty
+    one as soon as its StringStore grows over max_strings. The serialized Doc carries its own strings, so token
+    attributes (text, lemma_, pos_, dep_, tag_) are resolved correctly in any vocab, and the retired vocab is
+    freed together with the last Doc that references it.
+
+    Besides the base64 strings, the Docs are accepted as raw binary (bytes, bytearray or memoryview of
+    Doc.to_bytes, read without copying) and as DocBin batches sharing one string table (decode_bin). The binary
+    Docs are decoded into the decoder's vocab in both modes; in the 'shared' mode it is never replaced.
+    """
+
+    def __init__(self, mode: str = SHARED_MODE,
+                 shared_decode: Callable[[str], SpacyDoc] | None = None,
+                 max_strings: int = 200000,
+                 sample_interval: float = 60.0,
+                 max_samples: int = 1440):
+        if mode not in (SHARED_MODE, BOUNDED_MODE):
+            raise ValueError(f"DocDecoder - wrong mode: {mode}")
+        if mode == SHARED_MODE and shared_decode is None:
+            raise ValueError("DocDecoder - shared mode requires a shared decoder")
+        self.mode = mode
+        self.shared_decode = shared_decode
+        self.max_strings = max_strings
+        self.sample_interval = sample_interval
+        self._lock = threading.Lock()
+        self._vocab = Vocab()
+        self._strings_size = 0
+        self._decoded = 0
+        self._formats = {'base64': 0, 'binary': 0, 'docBin': 0}
+        self._rotations = 0
+        self._last_sample = 0.0
+        self._samples = deque(maxlen=max_samples)
+
+    def decode(self, data: str | bytes | bytearray | memoryview) -> SpacyDoc:
+        if not isinstance(data, str):
+            doc = SpacyDoc(self._current_vocab()).from_bytes(memoryview(data))
+            self._formats['binary'] += 1
+        elif self.mode == SHARED_MODE:
+            doc = self.shared_decode(data)
+            self._formats['base64'] += 1
+        else:
+            doc = SpacyDoc(self._current_vocab()).from_bytes(base64.b64decode(data))
+            self._formats['base64'] += 1
+        self._track(doc.vocab)
+        return doc
+
+    def decode_bin(self, data: str | bytes | bytearray | memoryview) -> List[SpacyDoc]:
+        """
+        Decodes the Docs of a DocBin.to_bytes batch, raw or base64. Raises ValueError if the data isn't a DocBin.
+        """
+        if isinstance(data, str):
+            data = base64.b64decode(data)
+        docs = list(DocBin().from_bytes(memoryview(data)).get_docs(self._current_vocab()))
+        for doc in docs:
+            self._track(doc.vocab)
+        self._formats['docBin'] += len(docs)
+        return docs
+
+    def _current_vocab(self) -> Vocab:
+        vocab = self._vocab
+        if self.mode == BOUNDED_MODE and len(vocab.strings) > self.max_strings:
+            with self._lock:
+                if self._vocab is vocab:
+                    self._vocab = Vocab()
+                    self._rotations += 1
+                    logger.info(f"DocDecoder - vocab rotated at {len(vocab.strings)} strings, "
+                                f"rotations: {self._rotations}")
+                vocab = self._vocab
+        return vocab
+
+    def _track(self, vocab: Vocab):
+        self._decoded += 1
+        self._strings_size = len(vocab.strings)
+        now = time.time()
+        if now - self._last_sample >= self.sample_interval:
+            self._last_sample = now
+            self._samples.append((round(now), self._strings_size))
+
+    def stats(self) -> Dict[str, str | int | List]:
+        return {'mode': self.mode,
+                'decodedDocs': self._decoded,
+                'decodedFormats': dict(self._formats),
+                'stringStoreSize': self._strings_size,
+                'maxStrings': self.max_strings if self.mode == BOUNDED_MODE else None,
+                'vocabRotations': self._rotations,
+                'stringStoreHistory': list(self._samples)}
@@ -1,4 +1,56 @@
-import re
+from collections import deque
+from typing import FrozenSet, Iterable, NamedTuple
+
+
+class ExpertisePhraseAutomaton:
+    """
+    Aho-Corasick automaton over a set of phrases: finds all the phrase occurrences in a text in one pass.
+    """
+
+    def __init__(self, phrases: Iterable[str]):
+        self.goto = [{}]
+        self.is_end = [False]
+        for phrase in phrases:
+            node = 0
+            for char in phrase:
+                if char not in self.goto[node]:
+                    self.goto.append({})
+                    self.is_end.append(False)
+                    self.goto[node][char] = len(self.goto) - 1
+                node = self.goto[node][char]
+            self.is_end[node] = True
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                fail = self.fail[node]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[child] = self.goto[fail].get(char, 0)
+                self.is_end[child] = self.is_end[child] or self.is_end[self.fail[child]]
+                queue.append(child)
+
+    def findEnds(self, text: str) -> FrozenSet[int]:
+        """
+        Returns the set of the positions in the text right after the end of any phrase occurrence.
+        """
+        ends = []
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            if self.is_end[node]:
+                ends.append(i + 1)
+        return frozenset(ends)
+
+
+class SentenceExpertise(NamedTuple):
+    # the positions in the sentence text right after the expertise phrases
+    phraseEnds: FrozenSet[int]
+    # whether one of the first tokens of the sentence is an expertise phrase
+    atStart: bool
 
 
 class ExpertiseChecker:
@@ -31,10 +83,36 @@ class ExpertiseChecker:
 
         self.expertiseWords = set(expertiseWords1 + expertiseWords2 + expertiseWords3)
         self.expertiseWords = self.expertiseWords.union({x.replace(' ', '_') for x in self.expertiseWords})
-        self.expertise_pattern = re.compile(
-            "|".join([r"\b" + item + r"\b" for item in sorted(self.expertiseWords, key=len, reverse=True)]))
+        self.matcher = ExpertisePhraseAutomaton(self.expertiseWords)
+
+    def analyzeSentence(self, sentenceDoc) -> SentenceExpertise:
+        """
+        Finds everything checkExpertise needs from the sentence regardless of the keyword, so that it is done once
+        for all the keywords of the sentence.
+        """
+        len_ = len(sentenceDoc)
+        atStart = bool(((len_ > 1) and (sentenceDoc[0].text in self.expertiseWords)) or ((len_ > 2) and (
+                sentenceDoc[1].text in self.expertiseWords or sentenceDoc[0].text + ' ' + sentenceDoc[
+            1].text in self.expertiseWords)) \
+                or ((len_ > 3) and (
+                sentenceDoc[2].text in self.expertiseWords or sentenceDoc[1].text + ' ' + sentenceDoc[
+            2].text in self.expertiseWords or sentenceDoc[0].text + ' ' + sentenceDoc[1].text in self.expertiseWords)))
+        return SentenceExpertise(self.matcher.findEnds(sentenceDoc.text), atStart)
 
-    def checkExpertise(self, sentenceDoc, keywordSpan, originalKeyword):
+    @staticmethod
+    def followsPhrase(text: str, phraseEnds: FrozenSet[int], keywordText: str) -> bool:
+        """
+        Whether the keyword text occurs in the text right after one of the phrases and a space, i.e.
+        any([x + ' ' + keywordText in text for x in phrases]).
+        """
+        start = text.find(keywordText, 1)
+        while start != -1:
+            if text[start - 1] == ' ' and start - 1 in phraseEnds:
+                return True
+            start = text.find(keywordText, start + 1)
+        return False
+
+    def checkExpertise(self, sentenceDoc, keywordSpan, originalKeyword, sentenceExpertise=None):
         """
         Function for checking if a particular keyword have 'expertise in' role in sentence
 
@@ -46,6 +124,8 @@ class ExpertiseChecker:
             Spacy span of improved keyword
         originalKeyword: str, required
             Original keyword (str!)
+        sentenceExpertise: SentenceExpertise, optional
+            The result of analyzeSentence for the sentence, if it's already computed
 
         Output
         ------
@@ -66,7 +146,10 @@ class ExpertiseChecker:
             # check for 'improvedKeyword <smth from expertiseWords>' in sentence
             return True
 
-        if any([x + ' ' + keywordSpan.text in sentenceDoc.text for x in self.expertiseWords]):
+        if sentenceExpertise is None:
+            sentenceExpertise = self.analyzeSentence(sentenceDoc)
+
+        if self.followsPhrase(sentenceDoc.text, sentenceExpertise.phraseEnds, keywordSpan.text):
             return True
 
         token = keywordToken
@@ -76,13 +159,7 @@ class ExpertiseChecker:
         if (token.text in self.expertiseWords) and (keywordSpan.text not in self.expertiseWords):
             return True
 
-        len_ = len(sentenceDoc)
-        if ((len_ > 1) and (sentenceDoc[0].text in self.expertiseWords)) or ((len_ > 2) and (
-                sentenceDoc[1].text in self.expertiseWords or sentenceDoc[0].text + ' ' + sentenceDoc[
-            1].text in self.expertiseWords)) \
-                or ((len_ > 3) and (
-                sentenceDoc[2].text in self.expertiseWords or sentenceDoc[1].text + ' ' + sentenceDoc[
-            2].text in self.expertiseWords or sentenceDoc[0].text + ' ' + sentenceDoc[1].text in self.expertiseWords)):
+        if sentenceExpertise.atStart:
             return True
 
         real_head1 = token.head
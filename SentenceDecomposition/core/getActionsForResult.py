@@ -1,30 +1,23 @@
+import re
+
 from auxiliary_functions import *
-from VerbTypeChecker import VerbTypeChecker
 
 
-def getActionsForResult(doc: spacy.tokens.doc.Doc,
+def getActionsForResult(ctx: SentenceContext,
                        token: spacy.tokens.token.Token) -> List[Tuple]:
-    checker = VerbTypeChecker(doc)
+    doc = ctx.doc
+    checker = ctx.verb_checker
     action_phrases = []
     verb = ''
     link = ''
     if isinstance(token, list):
-        token_ = doc[token[-1]]
-        kw_span = doc[token[0]:token[1] + 1]
-        main_tok = token_
-        # if all(map(lambda x: x in token_.subtree, kw_span)):
-        #     main_tok = token_
-        if kw_span[0] == token_.head:
-            main_tok = kw_span[0]
-        elif kw_span[-1] != token_ and kw_span[-1] == token_.head and kw_span[-1] == kw_span[0].head:
-            main_tok = kw_span[-1]
+        main_tok, kw_span = ctx.main_tok_from_indices(token)
     else:
         main_tok = token
         kw_span = doc[token.i:token.i + 1]
 
     if main_tok.pos_ != 'VERB':
-        cj = ConjunctsHandler(doc)
-        main_tok = cj.get_main_token(main_tok, kw_span)
+        main_tok = ctx.main_token(main_tok, kw_span)
 
     if main_tok.head.lemma_ == 'include':
         main_tok = main_tok.head
@@ -46,7 +39,7 @@ def getActionsForResult(doc: spacy.tokens.doc.Doc,
             link = doc[main_tok.i - 2]
             if doc[main_tok.i - 2].head.pos_ in ('VERB', 'AUX'):
                 verb = doc[main_tok.i - 2].head
-    nearest_verb = get_nearest_verb(doc, main_tok, kw_span)
+    nearest_verb = get_nearest_verb(ctx, main_tok, kw_span)
     if (main_tok.head.pos_ in ('VERB', 'AUX')
         and main_tok.dep_ not in ('conj','appos','ROOT')
         and main_tok.head.text not in verbs_stoplist
@@ -58,7 +51,7 @@ def getActionsForResult(doc: spacy.tokens.doc.Doc,
     if verb:
         p = get_prep(verb)
         prep = p if p else get_prep_2(doc, p, kw_span)
-        main_verb, all_verbs = get_all_verbs(doc, verb)
+        main_verb, all_verbs = get_all_verbs(ctx, verb)
         if main_verb.i > 0:
             if doc[main_verb.i - 1].text in ['to', 'for']:
                 link = doc[main_verb.i-1]
@@ -69,19 +62,19 @@ def getActionsForResult(doc: spacy.tokens.doc.Doc,
                 link = doc[main_tok.i-2]
         verbs_text = get_verbs_text(doc, all_verbs, main_tok)
         if main_verb.lemma_ in verbs_with_ccomps:
-            ccomps = get_ccomps(doc, main_verb)
+            ccomps = get_ccomps(ctx, main_verb)
             if ccomps and main_tok not in ccomps[0]:
                 all_verbs, verbs_text = ccomps
         verb = all_verbs[-1]
         if verb.tag_ == 'VBZ' and list(filter(lambda x: x.text == 'it' and x.dep_ == 'nsubj', verb.children)):
             action_phrases = []
-        if (checker.isResultVerb(main_verb)
+        if (checker.get_verb_type('isResultVerb', main_verb)
             or (verb.tag_ == 'VBD'
             and main_verb.dep_ == 'amod'
             and (doc[main_verb.i - 1].pos_ == 'ADP'
             or (main_verb.head.pos_ == 'VERB'
             and main_verb.dep_ not in ('ROOT', 'conj'))))):
-            other_result_tuple = get_other_result_tuple(doc, verb, main_verb, all_verbs, prep, kw_span)
+            other_result_tuple = get_other_result_tuple(ctx, verb, main_verb, all_verbs, prep, kw_span)
             if other_result_tuple:
                 action_phrases = other_result_tuple
             else:
@@ -1,23 +1,14 @@
+import re
+
 from auxiliary_functions import *
 from ConjunctsHandler import ConjunctsHandler
 from typing import Tuple, List
 
 
-def main_tok_from_indices(doc: spacy.tokens.doc.Doc,
-                          indices: List[int]) -> Tuple[spacy.tokens.token.Token, spacy.tokens.span.Span]:
-    token_ = doc[indices[-1]]
-    kw_span = doc[indices[0]:indices[1] + 1]
-    main_tok = token_
-    if kw_span[0] == token_.head:
-        main_tok = kw_span[0]
-    elif kw_span[-1] != token_ and kw_span[-1] == token_.head and kw_span[-1] == kw_span[0].head:
-        main_tok = kw_span[-1]
-    return main_tok, kw_span
-
-
-def get_benefactive(doc: spacy.tokens.doc.Doc,
+def get_benefactive(ctx: SentenceContext,
                     main_tok: spacy.tokens.token.Token,
                     kw_span: spacy.tokens.span.Span) -> List[Tuple]:
+    doc = ctx.doc
     verbs = []
     benef_candidates = [main_tok.head, doc[main_tok.i-1]]
     if list(main_tok.lefts):
@@ -25,7 +16,7 @@ def get_benefactive(doc: spacy.tokens.doc.Doc,
     for cand in benef_candidates:
         if cand.text.lower() == 'for' and cand.i != 0:
             flag = 'benefactive'
-            other_verbs = get_other_verbs(doc, cand, kw_span)
+            other_verbs = get_other_verbs(ctx, cand, kw_span)
             if other_verbs:
               verbs = other_verbs
             verbs += [(main_tok.i, '', '', '', flag)]
@@ -60,7 +51,7 @@ def means_condition(doc: spacy.tokens.doc.Doc,
             return True
 
 
-def get_subject_verbs(doc: spacy.tokens.doc.Doc,
+def get_subject_verbs(ctx: SentenceContext,
                         main_tok: spacy.tokens.token.Token,
                         kw: spacy.tokens.token.Token,
                         kw_span: spacy.tokens.span.Span) -> List[Tuple]:
@@ -68,26 +59,26 @@ def get_subject_verbs(doc: spacy.tokens.doc.Doc,
     if main_tok.head.pos_ in ('VERB', 'AUX') and main_tok.head not in kw_span:
         verb = main_tok.head
         if verb.text in verbs_stoplist:
-            nearest_verb = get_nearest_verb(doc, main_tok, kw_span, go_left=False)
+            nearest_verb = get_nearest_verb(ctx, main_tok, kw_span, go_left=False)
             if nearest_verb:
                 verb = nearest_verb
             else:
                 return [(main_tok.i, '', '', '', flag)]
-    nearest_verb = get_nearest_verb(doc, main_tok, kw_span, go_left=False)
+    nearest_verb = get_nearest_verb(ctx, main_tok, kw_span, go_left=False)
     if nearest_verb:
         verb = nearest_verb
     else:
         return [(main_tok.i, '', '', '', flag)]
-    verbs = get_action_verb_tuples(doc, main_tok, kw, verb, kw_span)
+    verbs = get_action_verb_tuples(ctx, main_tok, kw, verb, kw_span)
     return verbs
 
 
-def getActionsforKeyword(doc: spacy.tokens.doc.Doc,
+def getActionsforKeyword(ctx: SentenceContext,
                          indices: List[int]) -> List[Tuple]:
     """
 
     Args:
-        doc: the sentence processed with spacy
+        ctx: the context of the sentence processed with spacy
         indices:
             - the index of the first token in the keyword;
             - the index of the KW token before the main (rightmost) token of the KW;
@@ -114,18 +105,17 @@ def getActionsforKeyword(doc: spacy.tokens.doc.Doc,
     For each pair (verb, object) there is a separate tuple.
 
     """
-    main_tok, kw_span = main_tok_from_indices(doc, indices)
+    doc = ctx.doc
+    main_tok, kw_span = ctx.main_tok_from_indices(indices)
     verbs = []
     flag = 'action'
     prep = ''
     obj = ''
     kw = main_tok
-    cj = ConjunctsHandler(doc)
     if main_tok.pos_ == 'VERB':
-        cj.get_main_verb_token(main_tok)
-        main_tok = cj.main_verb
+        main_tok = ctx.main_verb_conjuncts(main_tok)[0]
     else:
-        main_tok = cj.get_main_token(main_tok, kw_span)
+        main_tok = ctx.main_token(main_tok, kw_span)
     if main_tok.head.lemma_ == 'include':
         main_tok = main_tok.head
         if main_tok.dep_ == 'ROOT':
@@ -136,53 +126,52 @@ def getActionsforKeyword(doc: spacy.tokens.doc.Doc,
         main_tok = main_tok.head.head
 
     if main_tok.dep_ == 'nsubj' or (main_tok.dep_ == 'ROOT' and main_tok.pos_ != 'VERB'):
-        return get_subject_verbs(doc, main_tok, kw, kw_span)
+        return get_subject_verbs(ctx, main_tok, kw, kw_span)
 
     if means_condition(doc, main_tok, kw_span):
         flag = 'means'
-        other_verbs = get_other_verbs(doc, main_tok, kw_span)
+        other_verbs = get_other_verbs(ctx, main_tok, kw_span)
         if other_verbs:
           verbs = other_verbs
         verbs += [(main_tok.i, '', '', '', flag)]
         return verbs
 
-    verbs = get_benefactive(doc, main_tok, kw_span)
+    verbs = get_benefactive(ctx, main_tok, kw_span)
     if verbs:
         return verbs
 
     if verb_parent_condition(doc, main_tok, kw_span) and main_tok.dep_ not in ('ROOT', 'conj'):
         verb = main_tok.head
         if verb.i > main_tok.i or verb.text in verbs_stoplist:
-            nearest_verb = get_nearest_verb(doc, main_tok, kw_span)
+            nearest_verb = get_nearest_verb(ctx, main_tok, kw_span)
             if nearest_verb:
                 verb = nearest_verb
             else:
                 return []
-        verbs = get_action_verb_tuples(doc, main_tok, kw, verb, kw_span)
+        verbs = get_action_verb_tuples(ctx, main_tok, kw, verb, kw_span)
         return verbs
 
     elif main_tok.dep_ == 'dobj' and main_tok.head not in kw_span:
-        cj = ConjunctsHandler(doc)
-        if cj.get_synsets(main_tok.head):
+        if ConjunctsHandler.get_synsets(main_tok.head):
             verb = main_tok.head
-            verbs = get_action_verb_tuples(doc, main_tok, kw, verb, kw_span)
+            verbs = get_action_verb_tuples(ctx, main_tok, kw, verb, kw_span)
             return verbs
 
     elif main_tok.head.pos_ == 'ADP' and verb_parent_condition(doc, main_tok.head, kw_span):
         prep = main_tok.head
         verb = prep.head
         if verb.text in verbs_stoplist:
-            nearest_verb = get_nearest_verb(doc, main_tok, kw_span)
+            nearest_verb = get_nearest_verb(ctx, main_tok, kw_span)
             if nearest_verb:
                 verb = nearest_verb
             else:
                 return []
-        verbs = get_action_verb_tuples(doc, main_tok, kw, verb, kw_span, prep=prep)
+        verbs = get_action_verb_tuples(ctx, main_tok, kw, verb, kw_span, prep=prep)
         return verbs
 
-    nearest_verb = get_nearest_verb(doc, main_tok, kw_span)
+    nearest_verb = get_nearest_verb(ctx, main_tok, kw_span)
     if nearest_verb:
-        verbs = get_action_verb_tuples(doc, main_tok, kw, nearest_verb, kw_span)
+        verbs = get_action_verb_tuples(ctx, main_tok, kw, nearest_verb, kw_span)
         return verbs
 
     else:
@@ -0,0 +1,166 @@
+import codecs
+import json
+import re
+from typing import Any, BinaryIO, Iterator
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+NOT_A_DICT = "parsed_akw_doc are not a dict"
+NO_KEY = "parsed_akw_doc should contain key '{key}' "
+NOT_A_LIST = "'{key}' key must contain a list of data for parsed_akw_doc"
+
+_decoder = json.JSONDecoder()
+_NUMBER_TAIL = re.compile(r'[0-9.eE+-]*')
+
+
+class JsonStreamError(ValueError):
+    pass
+
+
+def iter_list_items(stream: BinaryIO, key: str = 'list', read_size: int = 65536) -> Iterator[Any]:
+    """
+    Yields the elements of the list under the key of the JSON object read from the binary stream, each one as soon
+    as it is read, so only the current element is kept in memory. Raises JsonStreamError if the body isn't an
+    object with a list under the key or isn't valid JSON. Uses ijson if it is installed.
+    """
+    if ijson is not None:
+        return ijson.items(_checked_events(ijson.parse(_Stream(stream), buf_size=read_size, use_float=True), key),
+                           key + '.item')
+    return _iter_decoded_items(_Reader(stream, read_size), key)
+
+
+def _checked_events(events: Iterator[tuple], key: str) -> Iterator[tuple]:
+    found = False
+    first = True
+    list_value_next = False
+    try:
+        for prefix, event, value in events:
+            if first and event != 'start_map':
+                raise JsonStreamError(NOT_A_DICT)
+            first = False
+            if list_value_next:
+                if event != 'start_array':
+                    raise JsonStreamError(NOT_A_LIST.format(key=key))
+                list_value_next = False
+                found = True
+            elif prefix == '' and event == 'map_key' and value == key:
+                list_value_next = True
+            yield prefix, event, value
+    except ijson.JSONError as e:
+        raise JsonStreamError(f"malformed JSON: {e}") from e
+    if not found:
+        raise JsonStreamError(NO_KEY.format(key=key))
+
+
+class _Stream:
+    """
+    The binary stream for ijson, which probes it with read(0) - werkzeug's request stream takes an empty read for
+    a client disconnect.
+    """
+
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+
+    def read(self, size: int = -1) -> bytes:
+        return self.stream.read(size) if size else b''
+
+
+class _Reader:
+    """
+    The text buffer over the binary stream for decoding the JSON values one by one with JSONDecoder.raw_decode.
+
+    A value that isn't read whole yet is decoded again after the next read, so the reads for it are at least as
+    long as its part already in the buffer: the value is decoded O(log(length)) times, not once per read_size.
+    """
+
+    def __init__(self, stream: BinaryIO, read_size: int):
+        self.stream = stream
+        self.read_size = read_size
+        self.utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ''
+        self.pos = 0
+        self.offset = 0  # the characters of the stream before buf
+        self.eof = False
+
+    def fill(self):
+        data = self.stream.read(max(self.read_size, len(self.buf) - self.pos))
+        if not data:
+            self.eof = True
+        self.offset += self.pos
+        self.buf = self.buf[self.pos:] + self.utf8.decode(data, final=self.eof)
+        self.pos = 0
+
+    def error(self, message: str, pos: int) -> JsonStreamError:
+        return JsonStreamError(f"malformed JSON: {message} at char {self.offset + pos}")
+
+    def peek(self) -> str:
+        """
+        Returns the next non-whitespace character without consuming it, '' at the end of the stream.
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos:self.pos + 1]
+            self.fill()
+
+    def take(self, expected: str) -> str:
+        ch = self.peek()
+        if ch == '' or ch not in expected:
+            raise self.error(f"expected one of '{expected}'", self.pos)
+        self.pos += 1
+        return ch
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise self.error(e.msg, e.pos) from e
+                self.fill()
+                continue
+            if not self.eof and type(obj) in (int, float) and _NUMBER_TAIL.fullmatch(self.buf, end):
+                self.fill()  # the number may continue in the next chunk
+                continue
+            self.pos = end
+            return obj
+
+
+def _iter_decoded_items(reader: _Reader, key: str) -> Iterator[Any]:
+    if reader.peek() != '{':
+        raise JsonStreamError(NOT_A_DICT)
+    reader.take('{')
+    found = False
+    if reader.peek() == '}':
+        reader.take('}')
+    else:
+        while True:
+            if reader.peek() != '"':
+                raise reader.error("expected a key", reader.pos)
+            name = reader.value()
+            reader.take(':')
+            if name == key:
+                if reader.peek() != '[':
+                    raise JsonStreamError(NOT_A_LIST.format(key=key))
+                found = True
+                reader.take('[')
+                if reader.peek() == ']':
+                    reader.take(']')
+                else:
+                    while True:
+                        yield reader.value()
+                        if reader.take(',]') == ']':
+                            break
+            else:
+                reader.value()
+            if reader.take(',}') == '}':
+                break
+    if reader.peek() != '':
+        raise reader.error("extra data after the object", reader.pos)
+    if not found:
+        raise JsonStreamError(NO_KEY.format(key=key))
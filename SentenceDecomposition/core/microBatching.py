@@ -0,0 +1,143 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List
+
+from oneforce_logger import OneForceLogger
+
+logger = OneForceLogger('SD-micro-batching')
+
+
+class _Job:
+    __slots__ = ('items', 'keys', 'results', 'error', 'event', 'submitted')
+
+    def __init__(self, items: list):
+        self.items = items
+        self.keys = None
+        self.results = None
+        self.error = None
+        self.event = threading.Event()
+        self.submitted = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Gathers the items submitted by concurrent requests during a short window and processes them as one batch on
+    a pool of worker threads. Items with the same key are processed once and their result is sent back to every
+    request that submitted them. The requests of a batch are answered in the order they came, each one as soon as
+    its own items are done.
+
+    With window <= 0 the items are processed in the calling thread, one by one.
+    """
+
+    def __init__(self, process: Callable[[Any], Any], key: Callable[[Any], Hashable],
+                 window: float = 0.0, max_batch: int = 512, workers: int = 1):
+        self.process = process
+        self.key = key
+        self.window = window
+        self.max_batch = max_batch
+        self.workers = workers
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pool = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.items = 0
+        self.unique_items = 0
+        self.wait_seconds = 0.0
+
+    def run(self, items: list) -> List[Any]:
+        """
+        Returns the results of the given items in the same order. If processing of any item failed, its exception
+        is raised.
+        """
+        if self.window <= 0 or not items:
+            return [self.process(item) for item in items]
+        self._ensure_worker()
+        job = _Job(items)
+        self._queue.put(job)
+        job.event.wait()
+        if job.error is not None:
+            raise job.error
+        return job.results
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    if self.workers > 1:
+                        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='sd-batch-worker')
+                    self._thread = threading.Thread(target=self._loop, name='sd-micro-batcher', daemon=True)
+                    self._thread.start()
+
+    def _loop(self):
+        while True:
+            jobs = [self._queue.get()]
+            size = len(jobs[0].items)
+            deadline = time.perf_counter() + self.window
+            while size < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    job = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                jobs.append(job)
+                size += len(job.items)
+            try:
+                self._run_batch(jobs)
+            except Exception as e:
+                logger.error(f"MicroBatcher - batch failed: {e}")
+                for job in jobs:
+                    if not job.event.is_set():
+                        job.error = e
+                        job.event.set()
+
+    def _run_batch(self, jobs: List[_Job]):
+        start = time.perf_counter()
+        futures = {}
+        for job in jobs:
+            job.keys = [self.key(item) for item in job.items]
+            if self._pool is not None:
+                self._submit(job, futures)
+        self.batches += 1
+        self.requests += len(jobs)
+        self.items += sum(len(job.items) for job in jobs)
+        self.unique_items += len({key for job in jobs for key in job.keys})
+        self.wait_seconds += sum(start - job.submitted for job in jobs)
+        for job in jobs:
+            self._submit(job, futures)
+            try:
+                job.results = [futures[key].result() for key in job.keys]
+            except Exception as e:
+                job.error = e
+            job.event.set()
+
+    def _submit(self, job: _Job, futures: Dict[Hashable, Future]):
+        """
+        Adds the futures of the job items not submitted yet: running on the pool or, without it, already done.
+        """
+        for key, item in zip(job.keys, job.items):
+            if key in futures:
+                continue
+            if self._pool is not None:
+                futures[key] = self._pool.submit(self.process, item)
+                continue
+            future = futures[key] = Future()
+            try:
+                future.set_result(self.process(item))
+            except Exception as e:
+                future.set_exception(e)
+
+    def stats(self) -> dict:
+        return {'window': self.window,
+                'workers': self.workers,
+                'batches': self.batches,
+                'requests': self.requests,
+                'items': self.items,
+                'uniqueItems': self.unique_items,
+                'meanBatchSize': round(self.items / self.batches, 2) if self.batches else 0,
+                'meanWaitSeconds': round(self.wait_seconds / self.requests, 4) if self.requests else 0}
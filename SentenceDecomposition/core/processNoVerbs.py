@@ -1,3 +1,6 @@
+import re
+
+from ConjunctsHandler import ConjunctsHandler
 from auxiliary_functions import *
 
 suffixes = {'age', 'ance', 'ence', 'ion', 'ment', 'ness', 'ery'}
@@ -7,18 +10,11 @@ TEAM = ['team', 'department', 'agency']
 ACTIVITY = ['campaigns', 'strategy']
 
 
-def processNoVerbs(doc, indices):
+def processNoVerbs(ctx, indices):
+    doc = ctx.doc
     verbs = []
     prep = ''
-    token_ = doc[indices[-1]]
-    kw_span = doc[indices[0]:indices[1] + 1]
-    main_tok = token_
-    # if all(map(lambda x: x in token_.subtree, kw_span)):
-    #     main_tok = token_
-    if kw_span[0] == token_.head:
-        main_tok = kw_span[0]
-    elif kw_span[-1] != token_ and kw_span[-1] == token_.head and kw_span[-1] == kw_span[0].head:
-        main_tok = kw_span[-1]
+    main_tok, kw_span = ctx.main_tok_from_indices(indices)
     if doc[0].text == 'if':  # or (kw_root.dep_=='nsubj' and kw_root.head.pos_=='AUX'):
         return 'junk', verbs, prep
     if main_tok.text in ROLES or (len(doc) > main_tok.i + 1 and doc[main_tok.i + 1].text in ROLES) \
@@ -30,14 +26,14 @@ def processNoVerbs(doc, indices):
     if main_tok.dep_ == 'nsubj':
         return 'subject', verbs, prep
     if main_tok.dep_ == 'conj':
-        main_tok = get_main_token(doc, main_tok, kw_span)
+        main_tok = ctx.main_token(main_tok, kw_span)
     if main_tok.dep_ == 'ROOT':
         root_lefts = list(map(lambda x: x.dep_, doc[:main_tok.i]))
         if 'amod' in root_lefts or 'nmod' in root_lefts:
             verb_candidates = [token for token in doc[:main_tok.i] if token.dep_ in ('amod', 'nmod')]
-            if any([get_synsets(cand) for cand in verb_candidates]):
+            if any([ConjunctsHandler.get_synsets(cand) for cand in verb_candidates]):
                 for cand in verb_candidates:
-                    if get_synsets(cand) and cand.text not in str(kw_span) + str(main_tok):
+                    if ConjunctsHandler.get_synsets(cand) and cand.text not in str(kw_span) + str(main_tok):
                         verbs.append(cand.text.strip('-'))
                 return 'extracted object', verbs, prep
     if main_tok.head.pos_ == 'ADP':
@@ -0,0 +1,93 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, NamedTuple
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    mimetype: str
+    etag: str
+    expires: float
+    status: int = 200
+    dropped_rows: int = 0
+
+
+def make_etag(body: bytes, output_format: str = 'json') -> str:
+    """
+    Returns the validator of the response body in the given output format.
+    """
+    sha = hashlib.sha1(output_format.encode())
+    sha.update(b'|')
+    sha.update(body)
+    return sha.hexdigest()
+
+
+class ResponseCache:
+    """
+    In-process LRU cache of serialized responses, each stored with its ETag for ttl seconds. The least recently
+    used responses are evicted when there are more than max_entries of them or their bodies take more than
+    max_bytes; the bodies longer than max_entry_bytes aren't cached.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 256, max_bytes: int = 64 * 1024 ** 2,
+                 max_entry_bytes: int = 8 * 1024 ** 2):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.too_large = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, key: Hashable) -> CachedResponse | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires < time.time():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, body: bytes, mimetype: str, etag: str, dropped_rows: int = 0) -> CachedResponse:
+        entry = CachedResponse(body, mimetype, etag, time.time() + self.ttl, dropped_rows=dropped_rows)
+        if not self.enabled:
+            return entry
+        if len(body) > self.max_entry_bytes:
+            self.too_large += 1
+            return entry
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+        return entry
+
+    def _remove(self, key: Hashable):
+        self._bytes -= len(self._entries.pop(key).body)
+
+    def stats(self) -> dict:
+        return {'entries': len(self._entries),
+                'bytes': self._bytes,
+                'maxBytes': self.max_bytes,
+                'tooLarge': self.too_large,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'notModified': self.not_modified}
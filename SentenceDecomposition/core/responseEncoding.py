@@ -0,0 +1,132 @@
+import json
+import threading
+import zlib
+from typing import Iterable, Iterator, List
+
+from compactRows import SentenceRows
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP = 'gzip'
+ZSTD = 'zstd'
+# in the order of preference for the equal qualities of Accept-Encoding
+ENCODINGS = (ZSTD, GZIP) if zstandard is not None else (GZIP,)
+
+
+def dumps(obj) -> bytes:
+    """
+    Serializes the object to compact JSON bytes, with orjson if it is installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, separators=(',', ':'), default=str).encode()
+
+
+def rows_json(sentence_rows: Iterable[SentenceRows]) -> bytes:
+    """
+    Returns the {"list": [...]} response body with the full rows of the given sentences, serialized without
+    building the SentenceDecompositionDoc models.
+    """
+    return dumps({'list': [dict_ for rows in sentence_rows for dict_ in rows.to_dicts()]})
+
+
+def iter_rows_json(sentence_rows: Iterable[SentenceRows], chunk_rows: int = 1000) -> Iterator[bytes]:
+    """
+    Yields the same body as rows_json in pieces of about chunk_rows rows.
+    """
+    yield b'{"list":['
+    sep = b''
+    batch = []
+    for rows in sentence_rows:
+        batch.extend(rows.to_dicts())
+        if len(batch) >= chunk_rows:
+            yield sep + dumps(batch)[1:-1]
+            sep = b','
+            batch = []
+    if batch:
+        yield sep + dumps(batch)[1:-1]
+    yield b']}'
+
+
+class ResponseEncoder:
+    """
+    Compresses the response bodies with the best of the encodings (zstd if zstandard is installed, gzip) accepted
+    by the client. The bodies shorter than min_bytes are sent as is; the responses of stream_rows rows and more
+    are serialized and compressed piece by piece while they are sent.
+    """
+
+    def __init__(self, min_bytes: int = 1024, stream_rows: int = 5000, gzip_level: int = 5, zstd_level: int = 3):
+        self.min_bytes = min_bytes
+        self.stream_rows = stream_rows
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+        self._lock = threading.Lock()
+        self.responses = {encoding: 0 for encoding in ENCODINGS + ('identity',)}
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def negotiate(self, accept_encodings) -> str | None:
+        """
+        Returns the encoding for the Accept-Encoding header parsed by werkzeug (request.accept_encodings), or None.
+        """
+        encoding = max(ENCODINGS, key=accept_encodings.quality)
+        return encoding if accept_encodings.quality(encoding) > 0 else None
+
+    def _compressobj(self, encoding: str):
+        if encoding == ZSTD:
+            return zstandard.ZstdCompressor(level=self.zstd_level).compressobj()
+        return zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)  # wbits 31 - the gzip container
+
+    def encode(self, body: bytes, encoding: str | None) -> bytes:
+        if encoding is None:
+            self._count('identity', len(body), len(body))
+            return body
+        compressor = self._compressobj(encoding)
+        encoded = compressor.compress(body) + compressor.flush()
+        self._count(encoding, len(body), len(encoded))
+        return encoded
+
+    def encode_stream(self, chunks: Iterable[bytes], encoding: str | None) -> Iterator[bytes]:
+        if encoding is None:
+            size = 0
+            for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+            self._count('identity', size, size)
+            return
+        compressor = self._compressobj(encoding)
+        size_in = size_out = 0
+        for chunk in chunks:
+            size_in += len(chunk)
+            encoded = compressor.compress(chunk)
+            if encoded:
+                size_out += len(encoded)
+                yield encoded
+        encoded = compressor.flush()
+        size_out += len(encoded)
+        yield encoded
+        self._count(encoding, size_in, size_out)
+
+    def should_stream(self, sentence_rows: List[SentenceRows]) -> bool:
+        return self.stream_rows > 0 and sum(len(rows) for rows in sentence_rows) >= self.stream_rows
+
+    def _count(self, encoding: str, size_in: int, size_out: int):
+        with self._lock:
+            self.responses[encoding] += 1
+            self.bytes_in += size_in
+            self.bytes_out += size_out
+
+    def stats(self) -> dict:
+        return {'encodings': list(ENCODINGS),
+                'orjson': orjson is not None,
+                'responses': dict(self.responses),
+                'bytesIn': self.bytes_in,
+                'bytesOut': self.bytes_out,
+                'ratio': round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else 0}
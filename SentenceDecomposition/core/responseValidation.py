@@ -0,0 +1,68 @@
+import random
+import threading
+import time
+from typing import Any, Callable
+
+FULL = 'full'
+SAMPLED = 'sampled'
+CONSTRUCTION = 'construction'
+
+
+class ValidationPolicy:
+    """
+    Decides which responses are validated against the response schema: every one ('full'), a random sample_rate
+    fraction of them ('sampled') or none ('construction' - the rows are checked only when the
+    SentenceDecompositionDoc models are built from them). Keeps the time and the failures of the validations.
+    """
+
+    def __init__(self, mode: str = FULL, sample_rate: float = 0.01, seed: int | None = None):
+        if mode not in (FULL, SAMPLED, CONSTRUCTION):
+            raise ValueError(f"ValidationPolicy - wrong mode: {mode}")
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.validated = 0
+        self.skipped = 0
+        self.failures = 0
+        self.seconds = 0.0
+
+    def should_validate(self) -> bool:
+        if self.mode == FULL:
+            validate = True
+        elif self.mode == SAMPLED:
+            with self._lock:
+                validate = self._random.random() < self.sample_rate
+        else:
+            validate = False
+        if not validate:
+            with self._lock:
+                self.skipped += 1
+        return validate
+
+    def run(self, validate: Callable[[], Any], failed: Callable[[Any], bool]) -> Any:
+        """
+        Returns the result of validate(); the call is counted as failed if it raises or failed(result) is True.
+        """
+        start = time.perf_counter()
+        try:
+            result = validate()
+        except Exception:
+            self._count(start, True)
+            raise
+        self._count(start, failed(result))
+        return result
+
+    def _count(self, start: float, failed: bool):
+        with self._lock:
+            self.validated += 1
+            self.failures += failed
+            self.seconds += time.perf_counter() - start
+
+    def stats(self) -> dict:
+        return {'mode': self.mode,
+                'sampleRate': self.sample_rate if self.mode == SAMPLED else None,
+                'validated': self.validated,
+                'skipped': self.skipped,
+                'failures': self.failures,
+                'meanSeconds': round(self.seconds / self.validated, 6) if self.validated else 0}
@@ -0,0 +1,151 @@
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, List
+
+from oneforce_logger import OneForceLogger
+
+logger = OneForceLogger('SD-result-store')
+
+CORE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def rules_fingerprint(core_dir: str = CORE_DIR) -> str:
+    """
+    Returns the hash of the sources of the rule modules, so that stored results are invalidated by any rule change.
+    """
+    sha = hashlib.sha1()
+    for path in sorted(glob.glob(os.path.join(core_dir, '*.py'))):
+        with open(path, 'rb') as f:
+            sha.update(f.read())
+    return sha.hexdigest()
+
+
+class ResultStore:
+    """
+    Persistent store of analyze_sentence outputs shared by all the worker processes of a node.
+
+    The results live in an SQLite database in WAL mode, so any number of processes can read it concurrently while
+    one of them writes. The keys are hashes of the sentence content, its keyword spans and the rules fingerprint;
+    the values are zlib-compressed JSON rows. When the database outgrows max_bytes, the least recently used
+    results are evicted.
+    """
+    ACCESS_UPDATE_INTERVAL = 3600
+    RECOUNT_EVERY = 1000
+
+    def __init__(self, path: str, max_bytes: int = 1024 ** 3, fingerprint: str | None = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.fingerprint = fingerprint if fingerprint is not None else rules_fingerprint()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        conn = self._connection()
+        with conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS results '
+                         '(key BLOB PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)')
+        self._size = self._count_size()
+
+    @classmethod
+    def from_env(cls) -> 'ResultStore | None':
+        path = os.environ.get('SD_RESULT_STORE_PATH')
+        if not path:
+            return None
+        try:
+            return cls(path, max_bytes=int(os.environ.get('SD_RESULT_STORE_MAX_MB', 1024)) * 1024 ** 2)
+        except (sqlite3.Error, OSError) as e:
+            logger.error(f"ResultStore - can't open {path}: {e}")
+            return None
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA mmap_size={self.max_bytes}')
+            self._local.conn = conn
+        return conn
+
+    def _count_size(self) -> int:
+        return self._connection().execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+
+    def make_key(self, *parts) -> bytes:
+        sha = hashlib.sha256(self.fingerprint.encode())
+        sha.update(json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str).encode())
+        return sha.digest()
+
+    def get(self, key: bytes) -> List[Dict] | None:
+        try:
+            conn = self._connection()
+            row = conn.execute('SELECT value, accessed FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            now = time.time()
+            if now - row[1] > self.ACCESS_UPDATE_INTERVAL:
+                conn.execute('UPDATE results SET accessed = ? WHERE key = ?', (now, key))
+            self.hits += 1
+            return json.loads(zlib.decompress(row[0]))
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            logger.error(f"ResultStore - get failed: {e}")
+            return None
+
+    def put(self, key: bytes, rows: List[Dict]):
+        value = zlib.compress(json.dumps(rows, separators=(',', ':'), default=str).encode())
+        try:
+            self._connection().execute('INSERT OR REPLACE INTO results (key, value, size, accessed) '
+                                       'VALUES (?, ?, ?, ?)', (key, value, len(value), time.time()))
+        except sqlite3.Error as e:
+            logger.error(f"ResultStore - put failed: {e}")
+            return
+        with self._lock:
+            self._puts += 1
+            self._size += len(value)
+            if self._puts % self.RECOUNT_EVERY == 0:
+                self._size = self._count_size()
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """
+        Deletes the least recently used results until the store shrinks to 90% of max_bytes.
+        """
+        target = int(self.max_bytes * 0.9)
+        conn = self._connection()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            size = conn.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+            while size > target:
+                oldest = conn.execute('SELECT key, size FROM results ORDER BY accessed LIMIT 500').fetchall()
+                if not oldest:
+                    break
+                for key, value_size in oldest:
+                    if size <= target:
+                        break
+                    conn.execute('DELETE FROM results WHERE key = ?', (key,))
+                    size -= value_size
+                    self.evicted += 1
+            conn.execute('COMMIT')
+            self._size = size
+        except sqlite3.Error as e:
+            logger.error(f"ResultStore - eviction failed: {e}")
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+
+    def stats(self) -> Dict[str, int | str]:
+        return {'path': self.path,
+                'sizeBytes': self._size,
+                'maxBytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evicted': self.evicted}
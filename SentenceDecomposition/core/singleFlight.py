@@ -0,0 +1,67 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error', 'duration', 'waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.duration = 0.0
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent computations: the first caller with a key runs the function, the callers that
+    come with the same key while it is running wait for it and get the same result (or exception).
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+        self.saved_seconds = 0.0
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+            else:
+                call.waiters += 1
+                leader = False
+
+        if not leader:
+            call.event.wait()
+            with self._lock:
+                self.coalesced += 1
+                self.saved_seconds += call.duration
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        start = time.perf_counter()
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            call.duration = time.perf_counter() - start
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+    def stats(self) -> dict:
+        return {'inFlight': len(self._calls),
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+                'savedSeconds': round(self.saved_seconds, 3)}